@@ -0,0 +1,130 @@
+# batching.py
+import asyncio
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row scoring calls into one vectorized call.
+
+    Rows submitted within `window_ms` of the first queued row (or until
+    `max_batch_size` rows are waiting) are stacked and scored together;
+    each caller gets back its own result. When traffic is light (queue
+    empty and the previous batch held a single row) the window is skipped,
+    so an idle service adds no latency.
+
+    A row may name its own predict_fn (e.g. the model version its request
+    started on); rows are only stacked with rows for the same function,
+    so a model swap never mixes versions within one call.
+    """
+
+    def __init__(self, predict_fn=None, window_ms: float = 2.0, max_batch_size: int = 64):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+        self._requests = 0
+        self._batches = 0
+        self._last_batch_size = 0
+        self._max_batch_seen = 0
+        self._batch_size_histogram = {}
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    async def submit(self, row: np.ndarray, predict_fn=None):
+        """
+        Queue one (1, n_features) row and wait for its prediction.
+        """
+        self._ensure_worker()
+
+        future = self._loop.create_future()
+        await self._queue.put((row, future, predict_fn or self.predict_fn))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self._requests,
+            "batches": self._batches,
+            "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+            "last_batch_size": self._last_batch_size,
+            "max_batch_size": self._max_batch_seen,
+            "batch_size_histogram": dict(sorted(self._batch_size_histogram.items())),
+            "window_ms": self.window * 1000,
+            "max_batch_limit": self.max_batch_size
+        }
+
+    # -------------------------
+    # Worker
+    # -------------------------
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+
+        # (Re)bind to the running loop, e.g. after a test client restarts it
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+
+        if self._queue.empty() and self._last_batch_size <= 1:
+            return batch
+
+        deadline = self._loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _predict(self, predict_fn, group):
+        rows = np.vstack([row for row, _ in group])
+
+        try:
+            # Inference runs off the event loop
+            results = await self._loop.run_in_executor(None, predict_fn, rows)
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(group, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+
+            groups = {}
+            for row, future, predict_fn in batch:
+                groups.setdefault(predict_fn, []).append((row, future))
+
+            for predict_fn, group in groups.items():
+                await self._predict(predict_fn, group)
+
+            size = len(batch)
+            self._requests += size
+            self._batches += 1
+            self._last_batch_size = size
+            self._max_batch_seen = max(self._max_batch_seen, size)
+
+            # Histogram keys are power-of-two upper bounds (1, 2, 4, ...)
+            bucket = 1 << (size - 1).bit_length()
+            self._batch_size_histogram[bucket] = self._batch_size_histogram.get(bucket, 0) + 1
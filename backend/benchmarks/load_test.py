@@ -0,0 +1,379 @@
+# Drive the FastAPI app with a weighted mix of requests at rising
+# concurrency and report throughput, latency percentiles, error rates
+# and peak RSS per scenario.
+#
+# Transports:
+#   asgi      in-process (httpx.ASGITransport), no sockets
+#   loopback  uvicorn on 127.0.0.1 in this process, real HTTP
+#   --url     an already running server (RSS is not measured)
+#
+# Run from backend/:
+#   python -m benchmarks.load_test
+#   python -m benchmarks.load_test --scenario mixed --concurrency 1,8,32 --json run.json
+#   python -m benchmarks.load_test --compare baseline.json
+import os
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+import httpx
+import psutil
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DATA_PATH = os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn_v2.csv")
+
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+REQUESTS_PER_LEVEL = 200
+
+# Peak RSS is sampled this often while a level runs
+RSS_SAMPLE_SECONDS = 0.05
+
+CHAT_QUERIES = [
+    "What drives churn?",
+    "Give me a summary of the dataset",
+    "How many customers are likely to churn?",
+    "Describe the customer segments"
+]
+
+# -------------------------
+# Scenarios (request kind -> weight)
+# -------------------------
+SCENARIOS = {
+    "predict": {"predict": 1},
+    "explain": {"explain_global": 1, "explain_customer": 4},
+    "chat": {"chat": 1},
+    # Uploads invalidate every derived result while reads are in flight
+    "mixed": {
+        "predict": 4,
+        "explain_global": 1,
+        "explain_customer": 3,
+        "chat": 2,
+        "upload": 1
+    }
+}
+
+
+class RequestFactory:
+    """
+    Builds the request for each kind from the sample dataset.
+    """
+
+    def __init__(self, data_path=DATA_PATH, seed=42):
+        with open(data_path, "rb") as f:
+            self.csv_bytes = f.read()
+        self.filename = os.path.basename(data_path)
+        self.customer_ids = pd.read_csv(data_path)["customer_id"].astype(str).unique()
+        self.rng = np.random.default_rng(seed)
+
+    def upload(self):
+        return "POST", "/upload-csv", {
+            "files": {"file": (self.filename, self.csv_bytes, "text/csv")}
+        }
+
+    def build(self, kind):
+        if kind == "upload":
+            return self.upload()
+        if kind == "predict":
+            return "POST", "/predict-churn", {}
+        if kind == "explain_global":
+            return "GET", "/explain/global", {}
+        if kind == "explain_customer":
+            customer_id = self.rng.choice(self.customer_ids)
+            return "GET", f"/explain/customer/{customer_id}", {}
+        if kind == "chat":
+            return "POST", "/chat", {"json": {"query": str(self.rng.choice(CHAT_QUERIES))}}
+        raise ValueError(f"Unknown request kind: {kind}")
+
+# -------------------------
+# Memory sampling
+# -------------------------
+class RssSampler:
+    """
+    Peak resident memory of a process and its children (e.g. the
+    process pool), sampled on a background thread.
+    """
+
+    def __init__(self, pid=None, interval=RSS_SAMPLE_SECONDS):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def rss(self) -> int:
+        total = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+# -------------------------
+# Load generation
+# -------------------------
+async def run_level(client, factory, mix, concurrency, n_requests):
+    """
+    Closed loop: `concurrency` clients each send their next request as
+    soon as the previous one completes, until n_requests are sent.
+    """
+    kinds = list(mix)
+    weights = np.array([mix[k] for k in kinds], dtype=float)
+    plan = factory.rng.choice(kinds, size=n_requests, p=weights / weights.sum())
+
+    results = []
+    next_index = iter(range(n_requests))
+
+    async def worker():
+        for i in next_index:
+            kind = plan[i]
+            method, path, kwargs = factory.build(kind)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            results.append((kind, status, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def summarize(results, elapsed) -> dict:
+    latencies = np.array([r[2] for r in results]) * 1000
+    statuses = [r[1] for r in results]
+
+    # 429s are admission control doing its job: reported, not errors
+    rejected = sum(s == 429 for s in statuses)
+    errors = sum(s is None or (s >= 400 and s != 429) for s in statuses)
+
+    def percentiles(values):
+        if values.size == 0:
+            return {"p50": None, "p95": None, "p99": None}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+    by_kind = {}
+    for kind in sorted({r[0] for r in results}):
+        kind_latencies = np.array([r[2] for r in results if r[0] == kind]) * 1000
+        by_kind[kind] = {"requests": int(kind_latencies.size), **percentiles(kind_latencies)}
+
+    return {
+        "requests": len(results),
+        "seconds": elapsed,
+        "throughput_rps": len(results) / elapsed if elapsed else None,
+        **percentiles(latencies),
+        "error_rate": errors / len(results) if results else 0.0,
+        "rejected_rate": rejected / len(results) if results else 0.0,
+        "by_kind": by_kind
+    }
+
+
+async def run_scenarios(client, scenarios, levels, n_requests, sampler_pid):
+    factory = RequestFactory()
+
+    # Every scenario reads from an uploaded dataset
+    method, path, kwargs = factory.upload()
+    response = await client.request(method, path, **kwargs)
+    response.raise_for_status()
+
+    report = []
+    for name in scenarios:
+        for concurrency in levels:
+            if sampler_pid is None:
+                results, elapsed = await run_level(
+                    client, factory, SCENARIOS[name], concurrency, n_requests
+                )
+                peak_rss = None
+            else:
+                with RssSampler(sampler_pid) as sampler:
+                    results, elapsed = await run_level(
+                        client, factory, SCENARIOS[name], concurrency, n_requests
+                    )
+                peak_rss = sampler.peak / 2**20
+
+            row = {
+                "scenario": name,
+                "concurrency": concurrency,
+                **summarize(results, elapsed),
+                "peak_rss_mb": peak_rss
+            }
+            report.append(row)
+            print_row(row)
+
+    return report
+
+# -------------------------
+# Transports
+# -------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LoopbackServer:
+    """
+    uvicorn serving the app on 127.0.0.1 from a background thread.
+    """
+
+    def __init__(self, app):
+        import uvicorn
+
+        self.port = free_port()
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=self.port, log_level="warning"
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{self.port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def load_test(transport, url, scenarios, levels, n_requests, timeout):
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+
+    if transport == "url":
+        async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+            return await run_scenarios(client, scenarios, levels, n_requests, None)
+
+    # Imported here: loading main loads and warms the models
+    from main import app
+
+    if transport == "asgi":
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://loadtest",
+            timeout=timeout
+        ) as client:
+            return await run_scenarios(client, scenarios, levels, n_requests, os.getpid())
+
+    with LoopbackServer(app) as base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+            return await run_scenarios(client, scenarios, levels, n_requests, os.getpid())
+
+# -------------------------
+# Output
+# -------------------------
+def fmt(value, spec=".1f"):
+    return "-" if value is None else format(value, spec)
+
+
+def print_header():
+    print(
+        f"{'scenario':<10} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'errors':>7} {'429s':>6} {'peak MB':>8}"
+    )
+
+
+def print_row(row):
+    print(
+        f"{row['scenario']:<10} {row['concurrency']:>5} {fmt(row['throughput_rps']):>8} "
+        f"{fmt(row['p50']):>8} {fmt(row['p95']):>8} {fmt(row['p99']):>8} "
+        f"{row['error_rate']:>7.1%} {row['rejected_rate']:>6.1%} {fmt(row['peak_rss_mb']):>8}",
+        flush=True
+    )
+
+
+def print_comparison(report, baseline):
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+
+    print("\nAgainst baseline (current / baseline)")
+    print(f"{'scenario':<10} {'conc':>5} {'req/s':>8} {'p95':>8} {'p99':>8} {'peak MB':>8}")
+
+    def ratio(new, old):
+        return "-" if not new or not old else f"{new / old:.2f}x"
+
+    for row in report:
+        old = previous.get((row["scenario"], row["concurrency"]))
+        if old is None:
+            continue
+        print(
+            f"{row['scenario']:<10} {row['concurrency']:>5} "
+            f"{ratio(row['throughput_rps'], old['throughput_rps']):>8} "
+            f"{ratio(row['p95'], old['p95']):>8} {ratio(row['p99'], old['p99']):>8} "
+            f"{ratio(row['peak_rss_mb'], old['peak_rss_mb']):>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the FastAPI app")
+    parser.add_argument("--transport", choices=["asgi", "loopback"], default="asgi")
+    parser.add_argument("--url", help="Test a running server instead (e.g. http://127.0.0.1:8000)")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Repeatable; default: all")
+    parser.add_argument("--concurrency", default=",".join(map(str, CONCURRENCY_LEVELS)),
+                        help="Comma-separated levels, run in rising order")
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_LEVEL,
+                        help="Requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--label", help="Build label stored in the JSON report")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Print ratios against an earlier --json report")
+    args = parser.parse_args()
+
+    levels = sorted({int(level) for level in args.concurrency.split(",")})
+    if levels[0] < 1:
+        parser.error("concurrency levels must be at least 1")
+
+    scenarios = args.scenario or list(SCENARIOS)
+    transport = "url" if args.url else args.transport
+
+    print(f"Load test ({transport}, {args.requests} requests per level)")
+    print_header()
+
+    report = asyncio.run(load_test(
+        transport, args.url, scenarios, levels, args.requests, args.timeout
+    ))
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "label": args.label,
+                "transport": transport,
+                "requests_per_level": args.requests,
+                "cpu_workers": os.environ.get("CPU_WORKERS"),
+                "results": report
+            }, f, indent=2)
+        print(f"\nResults saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
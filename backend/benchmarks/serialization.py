@@ -0,0 +1,77 @@
+# Compare the old response path (to_dict + jsonable_encoder + json.dumps,
+# i.e. what FastAPI did for a dict return value) against responses.py.
+#
+# Run from backend/:  python -m benchmarks.serialization
+import json
+import time
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+
+from responses import dataframe_response
+
+ROW_COUNTS = [1_000, 10_000, 100_000]
+REPEATS = 3
+
+
+def scored_frame(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    prob = rng.random(n_rows)
+    return pd.DataFrame({
+        "customer_id": [f"C{i:07d}" for i in range(n_rows)],
+        "churn_probability": prob,
+        "churn_label": (prob >= 0.5).astype(int),
+        "model_version": "random_forest_v1"
+    })
+
+
+def fake_request(query: str = "") -> Request:
+    return Request({
+        "type": "http",
+        "query_string": query.encode(),
+        "headers": []
+    })
+
+
+def legacy_path(df: pd.DataFrame) -> bytes:
+    payload = {
+        "status": "success",
+        "message": "Churn prediction completed",
+        "data": df.to_dict(orient="records")
+    }
+    return json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def best_ms(fn) -> tuple:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        body = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), len(body)
+
+
+print("Response Serialization Benchmark")
+print("--------------------------------")
+print(f"{'rows':>8} {'path':<10} {'ms':>10} {'bytes':>12} {'speedup':>8}")
+
+for n_rows in ROW_COUNTS:
+    df = scored_frame(n_rows)
+
+    legacy_ms, legacy_bytes = best_ms(lambda: legacy_path(df))
+    paths = {
+        "legacy": (legacy_ms, legacy_bytes),
+        "records": best_ms(lambda: dataframe_response(fake_request(), df, "x").body),
+        "columnar": best_ms(
+            lambda: dataframe_response(fake_request("format=columnar"), df, "x").body
+        )
+    }
+
+    for name, (ms, size) in paths.items():
+        print(f"{n_rows:>8} {name:<10} {ms:>10.1f} {size:>12} {legacy_ms / ms:>7.1f}x")
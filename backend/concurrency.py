@@ -0,0 +1,175 @@
+# concurrency.py
+import os
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import Depends, HTTPException
+
+import workers
+
+# -------------------------
+# Process pool for CPU-bound stages
+# -------------------------
+# 0 disables the pool and runs stages in the calling thread
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", min(4, os.cpu_count() or 1)))
+
+_POOL = None
+
+# spawn: forking a threaded server process is unsafe
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+# Model versions new workers preload, as JSON in shared memory: the pool
+# starts workers lazily, so each initializer reads the value current at
+# its own start rather than at pool creation (see set_worker_versions)
+_WORKER_VERSIONS = _MP_CONTEXT.Array("c", 512)
+
+
+def get_pool():
+    global _POOL
+    if _POOL is None and CPU_WORKERS > 0:
+        _POOL = ProcessPoolExecutor(
+            max_workers=CPU_WORKERS,
+            mp_context=_MP_CONTEXT,
+            initializer=workers.init_worker,
+            initargs=(_WORKER_VERSIONS,)
+        )
+    return _POOL
+
+
+def set_worker_versions(versions):
+    """
+    Model versions workers started from now on load in their initializer,
+    including workers of an already running pool.
+    """
+    _WORKER_VERSIONS.value = json.dumps(list(versions)).encode()
+
+
+def worker_versions():
+    raw = _WORKER_VERSIONS.value
+    return tuple(json.loads(raw)) if raw else None
+
+
+def warm_workers(versions):
+    """
+    Load a model version into the running pool ahead of a swap.
+
+    Best effort: the pool hands one warm-up task to each idle worker, but
+    a busy pool may run two on the same worker; the others then load the
+    version on their first task.
+    """
+    if _POOL is None:
+        return
+    for future in [submit_cpu(workers.warm_models, versions) for _ in range(CPU_WORKERS)]:
+        future.result()
+
+
+def run_cpu(fn, *args):
+    """
+    Run a workers.* stage in the process pool and block for its result.
+
+    Called from sync handlers, which already sit in FastAPI's thread pool:
+    the thread waits without holding the GIL while the work runs in
+    another process.
+    """
+    global _POOL
+
+    pool = get_pool()
+    if pool is None:
+        return fn(*args)
+
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM); start a fresh pool on the next call
+        if _POOL is pool:
+            _POOL = None
+        raise
+
+
+def submit_cpu(fn, *args):
+    """
+    Submit one task to the process pool and return its Future, for
+    callers that fan work out in chunks (e.g. ml/parallel_shap.py).
+    Requires the pool (CPU_WORKERS > 0).
+    """
+    global _POOL
+
+    pool = get_pool()
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        if _POOL is pool:
+            _POOL = None
+        raise
+
+
+def pool_stats() -> dict:
+    return {
+        "workers": CPU_WORKERS,
+        "started": _POOL is not None,
+        "preloaded_versions": worker_versions()
+    }
+
+# -------------------------
+# Admission control
+# -------------------------
+class AdmissionLimiter:
+    """
+    Per-endpoint concurrency cap. Requests beyond the cap are rejected
+    immediately with 429 + Retry-After instead of queueing.
+    """
+
+    def __init__(self, name: str, limit: int, retry_after: int = 1):
+        self.name = name
+        self.limit = int(os.environ.get(f"MAX_CONCURRENT_{name.upper()}", limit))
+        self.retry_after = retry_after
+
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    async def __call__(self):
+        # Runs on the event loop, so the counters need no lock
+        if self.active >= self.limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many concurrent {self.name} requests, retry later",
+                headers={"Retry-After": str(self.retry_after)}
+            )
+
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "admitted": self.admitted,
+            "rejected": self.rejected
+        }
+
+
+LIMITERS = {
+    "predict_churn": AdmissionLimiter("predict_churn", limit=4),
+    "predict_segments": AdmissionLimiter("predict_segments", limit=4),
+    "explain_global": AdmissionLimiter("explain_global", limit=2),
+    "explain_customer": AdmissionLimiter("explain_customer", limit=8),
+    "chat": AdmissionLimiter("chat", limit=8),
+    "at_risk": AdmissionLimiter("at_risk", limit=8),
+    "groupby": AdmissionLimiter("groupby", limit=8),
+    "simulate": AdmissionLimiter("simulate", limit=4)
+}
+
+
+def admit(name: str):
+    """
+    Route dependency enforcing the named endpoint's concurrency limit.
+    """
+    return Depends(LIMITERS[name])
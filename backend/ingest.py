@@ -0,0 +1,148 @@
+# ingest.py
+import gzip
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from ml.predict import REQUIRED_COLUMNS, OPTIONAL_COLUMNS
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .csv.zst uploads
+    zstandard = None
+
+# Only these columns are ever read from an upload
+SCHEMA_COLUMNS = REQUIRED_COLUMNS | OPTIONAL_COLUMNS
+
+# Rows parsed per CSV chunk while a sketch is being built
+CSV_CHUNK_ROWS = 100_000
+
+# Longest suffix first, so ".csv.gz" wins over ".gz"
+SUPPORTED_FORMATS = {
+    ".csv.gz": "csv.gz",
+    ".csv.zst": "csv.zst",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "arrow",
+    ".arrow": "arrow",
+    ".ipc": "arrow"
+}
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def detect_format(filename: str) -> str:
+    name = filename.lower()
+    for suffix, fmt in SUPPORTED_FORMATS.items():
+        if name.endswith(suffix):
+            return fmt
+    raise UnsupportedFormat(
+        f"Unsupported file type; expected one of {sorted(SUPPORTED_FORMATS)}"
+    )
+
+
+def _schema_subset(names) -> list:
+    # Missing columns are left for validation to report
+    return [name for name in names if name in SCHEMA_COLUMNS]
+
+# -------------------------
+# Readers
+# -------------------------
+def _read_csv(stream, sketch=None) -> pd.DataFrame:
+    usecols = SCHEMA_COLUMNS.__contains__
+    if sketch is None:
+        return pd.read_csv(stream, usecols=usecols)
+
+    # Each chunk is sketched while it is still hot, in the parsing pass
+    chunks = []
+    for chunk in pd.read_csv(stream, usecols=usecols, chunksize=CSV_CHUNK_ROWS):
+        sketch.update(chunk)
+        chunks.append(chunk)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _read_parquet(fileobj) -> pd.DataFrame:
+    parquet_file = pq.ParquetFile(fileobj)
+    columns = _schema_subset(parquet_file.schema_arrow.names)
+
+    # Column chunks outside the schema are never read or decoded
+    table = parquet_file.read(columns=columns)
+    return _to_pandas(table)
+
+
+def _read_arrow(fileobj) -> pd.DataFrame:
+    # Feather v2 is the Arrow IPC file format; plain IPC streams also work
+    try:
+        names = pa.ipc.open_file(fileobj).schema.names
+    except pa.ArrowInvalid:
+        fileobj.seek(0)
+        reader = pa.ipc.open_stream(fileobj)
+        columns = _schema_subset(reader.schema.names)
+        return _to_pandas(reader.read_all().select(columns))
+
+    # The file footer locates each column, so others are skipped
+    fileobj.seek(0)
+    table = feather.read_table(
+        fileobj, columns=_schema_subset(names), memory_map=False
+    )
+    return _to_pandas(table)
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    # Hand buffers over column by column instead of consolidating into
+    # 2-D blocks, which would copy every numeric column once more
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+
+    # Arrow nulls in string columns arrive as None; the pipeline imputers
+    # (like pd.read_csv) expect NaN
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].fillna(np.nan)
+    return df
+
+
+def read_upload(fileobj, filename: str, sketch=None) -> pd.DataFrame:
+    """
+    Load an uploaded dataset, keeping only the schema columns.
+
+    Parameters
+    ----------
+    fileobj :
+        Binary, seekable file object (e.g. UploadFile.file)
+    filename : str
+        Used only to pick the format from its suffix
+    sketch : ml.sketches.DatasetSketch, optional
+        Updated with the loaded rows (chunk by chunk for CSV)
+
+    Raises
+    ------
+    UnsupportedFormat
+        If the suffix is not supported, or its codec is not installed.
+    """
+    fmt = detect_format(filename)
+
+    if fmt == "csv":
+        return _read_csv(fileobj, sketch)
+
+    if fmt == "csv.gz":
+        # Decompressed incrementally while the parser consumes it
+        with gzip.GzipFile(fileobj=fileobj, mode="rb") as stream:
+            return _read_csv(stream, sketch)
+
+    if fmt == "csv.zst":
+        if zstandard is None:
+            raise UnsupportedFormat("zstd uploads require the zstandard package")
+        with zstandard.ZstdDecompressor().stream_reader(fileobj) as stream:
+            return _read_csv(stream, sketch)
+
+    df = _read_parquet(fileobj) if fmt == "parquet" else _read_arrow(fileobj)
+
+    # Columnar data is already in memory; one vectorized pass per column
+    if sketch is not None:
+        sketch.update(df)
+    return df
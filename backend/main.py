@@ -1,67 +1,318 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import os
+import hmac
+from fastapi import (
+    FastAPI, UploadFile, File, HTTPException, Body, Request, Response, Depends,
+    BackgroundTasks, Query
+)
+import numpy as np
 import pandas as pd
 
-from storage import CACHE
-from model_loader import load_churn_model, load_segmentation_model
+from storage import (
+    CACHE, set_dataset, get_derived, peek_derived, prune_derived, SINGLE_FLIGHT_STATS
+)
+from batching import MicroBatcher
+from responses import dataframe_response, json_response, dataset_etag, etag_matches
+from concurrency import (
+    run_cpu, submit_cpu, admit, pool_stats, set_worker_versions, warm_workers,
+    LIMITERS, CPU_WORKERS
+)
+import workers
+from ingest import read_upload, UnsupportedFormat
+from model_loader import load_reference_sketch
+from model_registry import (
+    ModelBundle, active_bundle, set_active_bundle, read_active_versions,
+    begin_activation, finish_activation, artifact_path, list_versions,
+    ACTIVATION, KINDS
+)
+from shadow import active_shadow, start_shadow, stop_shadow
 
-from ml.predict import predict_churn
-from ml.predict_segment import predict_segments
+from ml.predict import validate_record, DEFAULT_THRESHOLD
+from ml.validation import validate_dataframe
+from ml.sketches import DatasetSketch, population_stability
 
-import joblib
-import pandas as pd
-
-from ml.explainability import explain_customer
+from ml.explainability import top_contributors, explain_customer, EXPLAIN_METHODS
+from ml.explanation_store import (
+    build_explanation_store, lookup_explanation, stored_contributors, has_explanations
+)
+from ml.parallel_shap import chunked_shap, global_importance_frame
+from ml.threshold_index import build_threshold_index, count_above, threshold_curve
+from ml.fast_encoding import encode_record
 
 from pydantic import BaseModel
 from ml.chatbot.chatbot_logic import chatbot_response
+from ml.insight_cube import build_insight_cube
+from ml.analytics import (
+    build_columnar_store, groupby_metrics, query_shape, top_k_at_risk,
+    filter_mask, METRICS
+)
 
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
-from fastapi import HTTPException
-import shap
-import numpy as np
-import pandas as pd
+# -------------------------
+# Models (model_registry.py)
+# -------------------------
+# Loaded and warmed at startup. Swapped as a whole by /admin/models/activate;
+# each request captures the bundle once (active_bundle()) and passes it
+# down, and derived results are cached per bundle.versions
+set_active_bundle(ModelBundle(*read_active_versions()))
+active_bundle().warm()
+
+# New pool workers preload the served versions
+set_worker_versions(active_bundle().versions)
+
+# Training-data sketch for drift checks (None if never generated)
+REFERENCE_SKETCH = load_reference_sketch()
+
+# Concurrent /score calls share one vectorized forest traversal
+SCORE_BATCHER = MicroBatcher(
+    window_ms=float(os.environ.get("SCORE_BATCH_WINDOW_MS", 2)),
+    max_batch_size=int(os.environ.get("SCORE_BATCH_MAX_SIZE", 64))
+)
+
+# Candidate churn version scored in shadow from startup (see /admin/shadow)
+if os.environ.get("SHADOW_CHURN_VERSION"):
+    start_shadow(os.environ["SHADOW_CHURN_VERSION"])
+
+# Explain every customer in the background after each upload, keeping
+# only the top contributors per row; explain calls then become lookups
+PRECOMPUTE_EXPLANATIONS = os.environ.get("PRECOMPUTE_EXPLANATIONS", "0") == "1"
+EXPLANATION_STORE_TOP_N = int(os.environ.get("EXPLANATION_STORE_TOP_N", 10))
 
 # -------------------------
-# Load models once at startup
+# Scoring step (cached per uploaded dataset and model version)
 # -------------------------
-CHURN_MODEL = load_churn_model()
-SEGMENT_MODEL = load_segmentation_model()
+# Heavy stages run in the process pool (concurrency.run_cpu)
+def get_churn_predictions(models):
+    return get_derived("churn", lambda: run_cpu(
+        workers.churn_predictions, models.versions, CACHE["dataframe"]
+    ), model_version=models.versions)
+
+
+def get_segment_predictions(models):
+    return get_derived("segments", lambda: run_cpu(
+        workers.segment_predictions, models.versions, CACHE["dataframe"]
+    ), model_version=models.versions)
+
 
-def compute_global_explainability(df, model_pipeline):
-    import shap
-    import numpy as np
-    import pandas as pd
+def global_importance_frames(models, result) -> dict:
+    return {
+        "encoded": global_importance_frame(models.feature_names, result["mean_abs"]),
+        "grouped": global_importance_frame(
+            models.feature_groups["names"], result["grouped_mean_abs"]
+        )
+    }
 
-    X = df.drop(columns=["customer_id", "churn"], errors="ignore")
 
-    preprocessing = model_pipeline.named_steps["preprocessing"]
-    classifier = model_pipeline.named_steps["classifier"]
+def shap_submit(models):
+    # Pool workers explain the bundle's version; None runs in-process
+    if CPU_WORKERS == 0:
+        return None
+    return lambda fn, *args: submit_cpu(workers.with_models, models.versions, fn, *args)
 
-    X_processed = preprocessing.transform(X)
-    column_transformer = preprocessing.named_steps["preprocessor"]
-    feature_names = column_transformer.get_feature_names_out()
 
-    explainer = shap.TreeExplainer(classifier)
-    shap_values = explainer.shap_values(X_processed)
+def compute_global_explainability(models):
+    # The precomputed store already holds the global sums
+    store = ready_explanation_store(models)
+    if store is not None:
+        return global_importance_frames(models, store)
 
-    if isinstance(shap_values, list):
-        shap_values = shap_values[1]
+    # Row chunks of the cached feature matrix are explained across the
+    # pool, from shared memory; only per-feature sums come back
+    result = chunked_shap(
+        get_churn_features(models),
+        submit=shap_submit(models),
+        n_workers=max(1, CPU_WORKERS),
+        group_matrix=models.feature_groups["matrix"],
+        classifier=models.classifier
+    )
+    return global_importance_frames(models, result)
 
-    if shap_values.ndim == 3:
-        shap_values = shap_values[:, :, 1]
 
-    mean_abs_shap = np.abs(shap_values).mean(axis=0)
+def get_global_explainability(models, grouped=False):
+    frames = get_derived(
+        "global_explain",
+        lambda: compute_global_explainability(models),
+        model_version=models.versions
+    )
+    return frames["grouped" if grouped else "encoded"]
 
-    return (
-        pd.DataFrame({
-            "feature": feature_names,
-            "mean_abs_shap": mean_abs_shap
-        })
-        .sort_values("mean_abs_shap", ascending=False)
-        .reset_index(drop=True)
+
+def get_insight_cube(models):
+    return get_derived("insight_cube", lambda: build_insight_cube(
+        df=CACHE["dataframe"],
+        churn_df=get_churn_predictions(models),
+        segments_df=get_segment_predictions(models),
+        global_explain_df=get_global_explainability(models),
+        global_grouped_df=get_global_explainability(models, grouped=True)
+    ), model_version=models.versions)
+
+
+def precompute_dataset(models):
+    """
+    Upload / model swap background task: score the dataset and build the
+    chat insight cube (plus, if enabled, the explanation store) so /chat
+    only reads results.
+    """
+    if CACHE["dataframe"] is None:
+        return
+
+    # Built first: the global explanation then reuses its sums
+    if PRECOMPUTE_EXPLANATIONS:
+        get_explanation_store(models)
+    get_insight_cube(models)
+
+
+def get_churn_features(models):
+    return get_derived("churn_features", lambda: run_cpu(
+        workers.churn_features, models.versions, CACHE["dataframe"]
+    ), model_version=models.versions)
+
+
+def compute_explanation_store(models):
+    # Workers reduce each chunk to its rows' top contributors, so only
+    # (n_rows, top_n) uint16 / float32 arrays come back
+    result = chunked_shap(
+        get_churn_features(models),
+        submit=shap_submit(models),
+        n_workers=max(1, CPU_WORKERS),
+        top_n=EXPLANATION_STORE_TOP_N,
+        group_matrix=models.feature_groups["matrix"],
+        classifier=models.classifier
+    )
+    store = build_explanation_store(
+        CACHE["dataframe"]["customer_id"].to_numpy(),
+        result["top_indices"],
+        result["top_values"],
+        result["grouped_top_indices"],
+        result["grouped_top_values"]
+    )
+    store["mean_abs"] = result["mean_abs"]
+    store["grouped_mean_abs"] = result["grouped_mean_abs"]
+    return store
+
+
+def get_explanation_store(models):
+    return get_derived(
+        "explanation_store",
+        lambda: compute_explanation_store(models),
+        model_version=models.versions
+    )
+
+
+def ready_explanation_store(models):
+    # Never waits: callers fall back to on-demand SHAP until it is built
+    return peek_derived("explanation_store", model_version=models.versions)
+
+
+def explain_customer_offloaded(models, customer_id, method="shap", top_n=5, grouped=False):
+    store = ready_explanation_store(models)
+    if method == "shap" and store is not None and has_explanations(store, top_n, grouped):
+        names = models.feature_groups["names"] if grouped else models.feature_names
+        return lookup_explanation(store, customer_id, names, top_n, grouped)
+
+    df = CACHE["dataframe"]
+    rows = df[df["customer_id"] == customer_id]
+
+    # Path contributions are one traversal of the compiled forest;
+    # cheaper here than a round trip to the pool
+    if method == "path":
+        return explain_customer(
+            customer_id, rows, models.churn_model, method=method, grouped=grouped
+        )
+
+    # Only the customer's rows are shipped to the worker
+    return run_cpu(
+        workers.customer_explanation, models.versions, customer_id, rows, grouped
+    )
+
+
+def get_columnar_store(models):
+    return get_derived("columnar_store", lambda: build_columnar_store(
+        df=CACHE["dataframe"],
+        churn_df=get_churn_predictions(models),
+        segments_df=get_segment_predictions(models)
+    ), model_version=models.versions)
+
+
+def get_threshold_index(models):
+    def build():
+        store = get_columnar_store(models)
+        df = CACHE["dataframe"]
+
+        # Unlabeled or unparseable churn stays NaN and is left out of
+        # precision/recall rather than counted as a negative
+        y_true = None
+        if "churn" in df.columns:
+            y_true = pd.to_numeric(df["churn"], errors="coerce").to_numpy(dtype=np.float64)
+
+        return build_threshold_index(
+            store["churn_probability"],
+            segment_codes=store["codes"]["segment_label"],
+            segment_levels=store["levels"]["segment_label"],
+            y_true=y_true
+        )
+
+    return get_derived("threshold_index", build, model_version=models.versions)
+
+def shadow_dataset(models, predictions_df):
+    """
+    Hand a scored dataset to the shadow candidate, if one is running.
+
+    Only cached live results are passed along; the shadow never starts
+    pool work that would compete with live traffic. A candidate sharing
+    the live preprocessing waits until the live features are cached
+    (a later call submits the dataset).
+    """
+    shadow = active_shadow()
+    if shadow is None:
+        return
+
+    version, frame = CACHE["version"], CACHE["dataframe"]
+
+    features = peek_derived("churn_features", model_version=models.versions)
+    if features is None and shadow.shares_features(models):
+        return
+
+    segments_df = peek_derived("segments", model_version=models.versions)
+    if CACHE["version"] != version:
+        return
+
+    shadow.submit_dataset(
+        key=(version, models.versions),
+        live=models,
+        frame=frame,
+        live_probability=predictions_df["churn_probability"].to_numpy(),
+        features=features,
+        segments=(
+            segments_df["segment_label"].to_numpy() if segments_df is not None else None
+        )
     )
 
+# -------------------------
+# Conditional requests
+# -------------------------
+def current_etag(request: Request, models=None) -> str:
+    # Validators change with the dataset and with every model swap
+    models = models or active_bundle()
+    return dataset_etag(request, CACHE["version"], models.versions)
+
+
+def not_modified(request: Request):
+    """
+    Answer 304 before any model work when the client's copy is current.
+    Listed ahead of admission control so revalidations are never throttled.
+    """
+    if CACHE["dataframe"] is None:
+        return
+
+    etag = current_etag(request)
+    if etag_matches(request, etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+
+
+CONDITIONAL = Depends(not_modified)
+
 # -------------------------
 # App
 # -------------------------
@@ -82,80 +333,338 @@ def health_check():
     }
 
 # -------------------------
-# Upload CSV
+# Runtime metrics
 # -------------------------
-@app.post("/upload-csv")
-async def upload_csv(file: UploadFile = File(...)):
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
+@app.get("/metrics")
+def metrics_api():
+    return {
+        "status": "success",
+        "data": {
+            "score_batcher": SCORE_BATCHER.stats(),
+            "process_pool": pool_stats(),
+            "admission": {name: limiter.stats() for name, limiter in LIMITERS.items()},
+            "single_flight": SINGLE_FLIGHT_STATS,
+            "models": active_bundle().describe()
+        }
+    }
+
+# -------------------------
+# Admin authentication
+# -------------------------
+# Bearer token required by the state-changing /admin routes; unset
+# disables them (CORS allows any origin, so they must never be open)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN"
+        )
+
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        token.encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or missing admin token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+ADMIN = Depends(require_admin)
+
+# -------------------------
+# Model registry (load, warm, then swap without a restart)
+# -------------------------
+class ActivateModelsRequest(BaseModel):
+    churn_version: str | None = None
+    segment_version: str | None = None
+
+
+def activate_models(versions: tuple):
+    """
+    Background task: build and warm the new bundle beside the active one,
+    then swap it in. Requests already running keep the bundle they
+    captured; results cached for the old versions are dropped.
+    """
+    try:
+        bundle = ModelBundle(*versions)
+        bundle.warm()
+        warm_workers(versions)
+    except Exception as e:
+        finish_activation(error=f"{type(e).__name__}: {e}")
+        return
+
+    set_worker_versions(versions)
+    finish_activation(bundle)
+    prune_derived(versions)
+    precompute_dataset(bundle)
+
+
+class ShadowRequest(BaseModel):
+    churn_version: str
+
+
+@app.get("/admin/shadow")
+def shadow_api():
+    shadow = active_shadow()
+    return {
+        "status": "success",
+        "data": shadow.stats() if shadow is not None else None
+    }
+
+
+@app.post("/admin/shadow", status_code=201, dependencies=[ADMIN])
+def start_shadow_api(request: ShadowRequest):
+    if request.churn_version == active_bundle().churn_version:
+        raise HTTPException(
+            status_code=400, detail="The candidate version is already live"
+        )
+
+    try:
+        shadow = start_shadow(request.churn_version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {
+        "status": "success",
+        "message": f"Shadow scoring with churn model {shadow.version}",
+        "data": shadow.stats()
+    }
+
+
+@app.delete("/admin/shadow", dependencies=[ADMIN])
+def stop_shadow_api():
+    shadow = stop_shadow()
+    if shadow is None:
+        raise HTTPException(status_code=404, detail="No shadow model running")
+
+    # Final comparison, for the record
+    return {
+        "status": "success",
+        "message": f"Stopped shadow scoring with churn model {shadow.version}",
+        "data": shadow.stats()
+    }
+
+
+@app.get("/admin/models")
+def models_api():
+    return {
+        "status": "success",
+        "data": {
+            "active": active_bundle().describe(),
+            "available": {kind: list_versions(kind) for kind in KINDS},
+            "activation": ACTIVATION
+        }
+    }
+
+
+@app.post("/admin/models/activate", status_code=202, dependencies=[ADMIN])
+def activate_models_api(
+    request: ActivateModelsRequest,
+    background_tasks: BackgroundTasks,
+    response: Response
+):
+    current = active_bundle()
+    versions = (
+        request.churn_version or current.churn_version,
+        request.segment_version or current.segment_version
+    )
+
+    try:
+        for kind, version in zip(KINDS, versions):
+            artifact_path(kind, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if versions == current.versions:
+        response.status_code = 200
+        return {
+            "status": "success",
+            "message": "Requested versions are already active",
+            "data": current.describe()
+        }
+
+    if not begin_activation(versions):
+        raise HTTPException(status_code=409, detail="A model activation is already running")
+
+    background_tasks.add_task(activate_models, versions)
+
+    return {
+        "status": "accepted",
+        "message": "Loading models; poll /admin/models for progress",
+        "data": dict(zip(KINDS, versions))
+    }
+
+# -------------------------
+# Upload dataset (CSV, compressed CSV, Parquet, Feather / Arrow IPC)
+# -------------------------
+@app.post("/upload-csv")
+async def upload_csv(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     try:
-        df = pd.read_csv(file.file)
+        # Parsing large files must not stall the event loop
+        sketch = DatasetSketch()
+        df = await run_in_threadpool(read_upload, file.file, file.filename, sketch)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
-        raise HTTPException(status_code=400, detail="Failed to read CSV file")
+        raise HTTPException(status_code=400, detail="Failed to read uploaded file")
 
     if df.empty:
-        raise HTTPException(status_code=400, detail="CSV file is empty")
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
 
-    CACHE["dataframe"] = df
-    CACHE["filename"] = file.filename
+    df, report = await run_in_threadpool(
+        validate_dataframe, df, active_bundle().vocabularies
+    )
+    if not report["valid"]:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Dataset failed validation", "validation": report}
+        )
+
+    set_dataset(df, file.filename, validation=report, sketch=sketch)
+
+    # Runs in the threadpool after the response is sent
+    background_tasks.add_task(precompute_dataset, active_bundle())
 
     return {
         "status": "success",
-        "message": "CSV uploaded successfully",
+        "message": "Dataset uploaded successfully",
         "data": {
             "filename": file.filename,
             "row_count": df.shape[0],
-            "column_count": df.shape[1]
+            "column_count": df.shape[1],
+            "validation": report
         }
     }
 
+# -------------------------
+# Dataset summary / drift (answered from the upload sketches)
+# -------------------------
+@app.get("/dataset/summary", dependencies=[CONDITIONAL])
+def dataset_summary_api(request: Request, top_n: int = 5):
+    if CACHE["dataframe"] is None:
+        raise HTTPException(status_code=400, detail="No CSV uploaded")
+
+    return json_response(request, {
+        "status": "success",
+        "message": "Dataset summary generated",
+        "data": {
+            "filename": CACHE["filename"],
+            **CACHE["sketch"].summary(top_n=top_n)
+        }
+    }, etag=current_etag(request))
+
+
+@app.get("/dataset/drift", dependencies=[CONDITIONAL])
+def dataset_drift_api(request: Request, bins: int = 10):
+    if CACHE["dataframe"] is None:
+        raise HTTPException(status_code=400, detail="No CSV uploaded")
+
+    if REFERENCE_SKETCH is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Reference sketch not found; run ml/train_refined.py"
+        )
+
+    if not 2 <= bins <= 100:
+        raise HTTPException(status_code=400, detail="bins must be between 2 and 100")
+
+    drift = population_stability(REFERENCE_SKETCH, CACHE["sketch"], bins=bins)
+
+    return json_response(request, {
+        "status": "success",
+        "message": "Drift computed against the training data",
+        "data": {
+            "reference_rows": REFERENCE_SKETCH.rows,
+            "current_rows": CACHE["sketch"].rows,
+            "drifted_columns": sorted(
+                col for col, stats in drift.items() if stats["status"] != "stable"
+            ),
+            "columns": drift
+        }
+    }, etag=current_etag(request))
+
 # -------------------------
 # Predict churn
 # -------------------------
-@app.post("/predict-churn")
-def predict_churn_api():
+@app.post("/predict-churn", dependencies=[CONDITIONAL, admit("predict_churn")])
+def predict_churn_api(request: Request):
     if CACHE["dataframe"] is None:
         raise HTTPException(status_code=400, detail="No CSV uploaded")
 
+    models = active_bundle()
+    etag = current_etag(request, models)
+
     try:
-        predictions_df = predict_churn(
-            df=CACHE["dataframe"],
-            model_pipeline=CHURN_MODEL
-        )
+        predictions_df = get_churn_predictions(models)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    shadow_dataset(models, predictions_df)
+
+    return dataframe_response(
+        request, predictions_df, "Churn prediction completed", etag=etag
+    )
+
+# -------------------------
+# Score a single record (no DataFrame, no upload)
+# -------------------------
+@app.post("/score")
+async def score_api(record: dict = Body(...)):
+    models = active_bundle()
+
+    try:
+        validate_record(record)
+        row = encode_record(models.encoding_spec, record)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    churn_prob = float(await SCORE_BATCHER.submit(row, predict_fn=models.score))
+
+    shadow = active_shadow()
+    if shadow is not None:
+        shadow.submit_record(models, record, row, churn_prob)
+
     return {
         "status": "success",
-        "message": "Churn prediction completed",
-        "data": predictions_df.to_dict(orient="records")
+        "message": "Customer scored",
+        "data": {
+            "customer_id": str(record["customer_id"]),
+            "churn_probability": churn_prob,
+            "churn_label": int(churn_prob >= DEFAULT_THRESHOLD),
+            "model_version": models.churn_version
+        }
     }
 
 # -------------------------
 # Predict segments
 # -------------------------
-@app.post("/predict-segments")
-def predict_segments_api():
+@app.post("/predict-segments", dependencies=[CONDITIONAL, admit("predict_segments")])
+def predict_segments_api(request: Request):
     if CACHE["dataframe"] is None:
         raise HTTPException(status_code=400, detail="No CSV uploaded")
 
+    models = active_bundle()
+    etag = current_etag(request, models)
+
     try:
-        segments_df = predict_segments(
-            df=CACHE["dataframe"],
-            model_artifact=SEGMENT_MODEL
-        )
+        segments_df = get_segment_predictions(models)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    return {
-        "status": "success",
-        "message": "Segmentation completed",
-        "data": segments_df.to_dict(orient="records")
-    }
+    return dataframe_response(
+        request, segments_df, "Segmentation completed", etag=etag
+    )
 
-@app.get("/explain/global")
-def global_explain_api():
+@app.get("/explain/global", dependencies=[CONDITIONAL, admit("explain_global")])
+def global_explain_api(request: Request, grouped: bool = False):
     # 1. Ensure CSV is uploaded
     if CACHE["dataframe"] is None:
         raise HTTPException(
@@ -163,63 +672,44 @@ def global_explain_api():
             detail="Upload CSV before requesting explainability"
         )
 
-    df = CACHE["dataframe"]
-
-    # 2. Prepare features
-    X = df.drop(columns=["customer_id", "churn"], errors="ignore")
-
-    # 3. Extract pipeline components
-    preprocessing = CHURN_MODEL.named_steps["preprocessing"]
-    classifier = CHURN_MODEL.named_steps["classifier"]
-
-    # 4. Transform data
-    X_processed = preprocessing.transform(X)
+    models = active_bundle()
+    etag = current_etag(request, models)
 
-    column_transformer = preprocessing.named_steps["preprocessor"]
-    feature_names = column_transformer.get_feature_names_out()
+    # 2. SHAP global importance (computed once per dataset)
+    global_df = get_global_explainability(models, grouped=grouped)
 
-    # 5. SHAP
-    explainer = shap.TreeExplainer(classifier)
-    shap_values = explainer.shap_values(X_processed)
-
-    # Binary classifier safety
-    if isinstance(shap_values, list):
-        shap_values = shap_values[1]
-
-    if shap_values.ndim == 3:
-        shap_values = shap_values[:, :, 1]
-
-    # 6. Aggregate global importance
-    mean_abs_shap = np.abs(shap_values).mean(axis=0)
-
-    global_df = (
-        pd.DataFrame({
-            "feature": feature_names,
-            "mean_abs_shap": mean_abs_shap
-        })
-        .sort_values("mean_abs_shap", ascending=False)
-        .reset_index(drop=True)
+    return dataframe_response(
+        request, global_df, "Global churn drivers retrieved", etag=etag
     )
 
-    return {
-        "status": "success",
-        "message": "Global churn drivers retrieved",
-        "data": global_df.to_dict(orient="records")
-    }
-
-@app.get("/explain/customer/{customer_id}")
-def customer_explain_api(customer_id: str):
+@app.get(
+    "/explain/customer/{customer_id}",
+    dependencies=[CONDITIONAL, admit("explain_customer")]
+)
+def customer_explain_api(
+    customer_id: str,
+    request: Request,
+    method: str = "shap",
+    grouped: bool = False
+):
     if CACHE["dataframe"] is None:
         raise HTTPException(
             status_code=400,
             detail="No CSV uploaded"
         )
 
+    if method not in EXPLAIN_METHODS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"method must be one of {list(EXPLAIN_METHODS)}"
+        )
+
+    models = active_bundle()
+    etag = current_etag(request, models)
+
     try:
-        explanation = explain_customer(
-            customer_id=customer_id,
-            df=CACHE["dataframe"],
-            model_pipeline=CHURN_MODEL
+        explanation = explain_customer_offloaded(
+            models, customer_id, method=method, grouped=grouped
         )
     except Exception as e:
         raise HTTPException(
@@ -227,25 +717,18 @@ def customer_explain_api(customer_id: str):
             detail=str(e)
         )
 
-    return {
+    return json_response(request, {
         "status": "success",
         "message": f"Explainability generated for customer {customer_id}",
-        "data": explanation
-    }
+        "data": explanation.to_dict()
+    }, etag=etag)
 
 class ChatRequest(BaseModel):
     query: str
     customer_selected: bool = False
     selected_customer_id: str | None = None
 
-GLOBAL_EXPLAIN_PATH = "ml_models/explainability/global_feature_importance.csv"
-
-try:
-    GLOBAL_EXPLAIN_DF = pd.read_csv(GLOBAL_EXPLAIN_PATH)
-except FileNotFoundError:
-    GLOBAL_EXPLAIN_DF = None
-
-@app.post("/chat")
+@app.post("/chat", dependencies=[admit("chat")])
 def chat_api(request: ChatRequest):
     if CACHE["dataframe"] is None:
         raise HTTPException(
@@ -254,58 +737,26 @@ def chat_api(request: ChatRequest):
         )
 
     # -------------------------
-    # Build cached outputs
+    # Read cached outputs
     # -------------------------
-    try:
-        churn_df = predict_churn(
-            df=CACHE["dataframe"],
-            model_pipeline=CHURN_MODEL
-        )
+    models = active_bundle()
 
-        segments_df = predict_segments(
-            df=CACHE["dataframe"],
-            model_artifact=SEGMENT_MODEL
-        )
-
-        # Segment counts
-        segment_counts = (
-            segments_df["segment_label"]
-            .value_counts()
-            .to_dict()
-        )
-
-        # Segment churn rates
-        merged = churn_df.merge(
-            segments_df,
-            on="customer_id"
-        )
+    try:
+        # Built by the upload / activation background task; a request
+        # arriving mid-build waits on that build rather than starting one
+        cube = get_insight_cube(models)
 
-        segment_churn = (
-            merged.groupby("segment_label")["churn_label"]
-            .mean()
-            .round(2)
-            .to_dict()
-        )
-        global_explain_df = compute_global_explainability(
-        df=CACHE["dataframe"],
-        model_pipeline=CHURN_MODEL
-        )
         cached_outputs = {
-            "churn": churn_df,
-            "global_explain": global_explain_df,  # ✅ FIXED
+            "insight_cube": cube,
             "local_explain": None,
-            "segment_counts": segment_counts,
-            "segment_churn": segment_churn,
             "segment_descriptions": {},
-            "dataset_summary": f"{len(churn_df)} customers analyzed"
+            "dataset_summary": CACHE["sketch"].summary()
         }
 
         # Local explainability (only if requested)
         if request.customer_selected and request.selected_customer_id:
-            cached_outputs["local_explain"] = explain_customer(
-                customer_id=request.selected_customer_id,
-                df=CACHE["dataframe"],
-                model_pipeline=CHURN_MODEL
+            cached_outputs["local_explain"] = explain_customer_offloaded(
+                models, request.selected_customer_id
             )
 
         response_text = chatbot_response(
@@ -326,6 +777,348 @@ def chat_api(request: ChatRequest):
         "response": response_text
     }
 
+# -------------------------
+# Grouped analytics
+# -------------------------
+# Distinct query shapes memoized per dataset (least recently used dropped)
+MAX_GROUPBY_QUERIES = int(os.environ.get("MAX_GROUPBY_QUERIES", 256))
+
+
+class GroupByRequest(BaseModel):
+    group_by: list[str]
+    filters: dict[str, str | int | list[str | int]] = {}
+    metrics: list[str] = METRICS
+
+
+@app.post("/analytics/groupby", dependencies=[admit("groupby")])
+def analytics_groupby_api(request: GroupByRequest):
+    if CACHE["dataframe"] is None:
+        raise HTTPException(status_code=400, detail="No CSV uploaded")
+
+    models = active_bundle()
+    store = get_columnar_store(models)
+    shape = query_shape(request.group_by, request.filters, request.metrics)
+
+    try:
+        # Memoized per query shape until the next upload, up to
+        # MAX_GROUPBY_QUERIES shapes
+        records = get_derived(
+            "groupby",
+            lambda: groupby_metrics(
+                store,
+                group_by=request.group_by,
+                filters=request.filters,
+                metrics=request.metrics
+            ),
+            params=shape,
+            model_version=models.versions,
+            max_entries=MAX_GROUPBY_QUERIES
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "status": "success",
+        "message": "Grouped churn analytics computed",
+        "data": records
+    }
+
+# -------------------------
+# Top-K at-risk customers
+# -------------------------
+# Upper bounds on the ranking size and contributors per customer
+MAX_AT_RISK_K = int(os.environ.get("MAX_AT_RISK_K", 1000))
+MAX_TOP_CONTRIBUTORS = 20
+
+
+@app.get("/customers/at-risk", dependencies=[CONDITIONAL, admit("at_risk")])
+def at_risk_customers_api(
+    request: Request,
+    k: int = Query(10, ge=1, le=MAX_AT_RISK_K),
+    segment: int | None = None,
+    region: str | None = None,
+    contract_type: str | None = None,
+    payment_method: str | None = None,
+    include_contributors: bool = False,
+    top_n: int = Query(3, ge=1, le=MAX_TOP_CONTRIBUTORS),
+    method: str = "shap",
+    grouped: bool = False
+):
+    if CACHE["dataframe"] is None:
+        raise HTTPException(status_code=400, detail="No CSV uploaded")
+
+    if method not in EXPLAIN_METHODS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"method must be one of {list(EXPLAIN_METHODS)}"
+        )
+
+    models = active_bundle()
+    etag = current_etag(request, models)
+    store = get_columnar_store(models)
+
+    filters = {
+        col: value
+        for col, value in [
+            ("segment_label", segment),
+            ("region", region),
+            ("contract_type", contract_type),
+            ("payment_method", payment_method)
+        ]
+        if value is not None
+    }
+
+    rows = top_k_at_risk(store, k, filters)
+
+    data = [
+        {
+            "customer_id": store["customer_ids"][i],
+            "churn_probability": float(store["churn_probability"][i]),
+            "segment_label": store["levels"]["segment_label"][store["codes"]["segment_label"][i]]
+        }
+        for i in rows
+    ]
+
+    store = ready_explanation_store(models)
+
+    if include_contributors and len(rows) and method == "shap" and (
+        store is not None and has_explanations(store, top_n, grouped)
+    ):
+        names = models.feature_groups["names"] if grouped else models.feature_names
+        for record, row in zip(data, rows):
+            record["top_contributors"] = stored_contributors(
+                store, row, names, top_n, grouped
+            )
+
+    # SHAP only for the k selected rows
+    elif include_contributors and len(rows):
+        X_rows = (
+            CACHE["dataframe"]
+            .iloc[rows]
+            .drop(columns=["customer_id", "churn"], errors="ignore")
+        )
+        if method == "path":
+            # One traversal of the compiled forest; no pool round trip
+            contributors = top_contributors(
+                X_rows, models.churn_model, top_n=top_n, method=method, grouped=grouped
+            )
+        else:
+            contributors = run_cpu(
+                workers.row_contributors, models.versions, X_rows, top_n, method, grouped
+            )
+        for record, contribs in zip(data, contributors):
+            record["top_contributors"] = contribs
+
+    return json_response(request, {
+        "status": "success",
+        "message": f"Top {len(data)} at-risk customers retrieved",
+        "data": data
+    }, etag=etag)
+
+# -------------------------
+# Threshold analysis
+# -------------------------
+@app.get("/churn/threshold", dependencies=[CONDITIONAL])
+def churn_threshold_api(
+    request: Request,
+    t: float = DEFAULT_THRESHOLD,
+    segment: int | None = None
+):
+    if CACHE["dataframe"] is None:
+        raise HTTPException(status_code=400, detail="No CSV uploaded")
+
+    models = active_bundle()
+    etag = current_etag(request, models)
+    index = get_threshold_index(models)
+
+    if segment is not None and segment not in index["segments"]:
+        raise HTTPException(status_code=404, detail=f"Segment {segment} not found")
+
+    data = {
+        "threshold": t,
+        "total": int(index["sorted"].size),
+        "count": count_above(index, t)
+    }
+
+    if segment is not None:
+        data["segment"] = segment
+        data["count"] = count_above(index, t, segment=segment)
+    else:
+        data["segments"] = {
+            level: count_above(index, t, segment=level)
+            for level in index["segments"]
+        }
+
+    return json_response(request, {
+        "status": "success",
+        "message": f"Customers at or above churn probability {t}",
+        "data": data
+    }, etag=etag)
+
+
+# Most thresholds a single curve request may evaluate (step 0.001 over [0, 1])
+MAX_CURVE_POINTS = 1001
+
+
+@app.get("/churn/threshold-curve", dependencies=[CONDITIONAL])
+def churn_threshold_curve_api(
+    request: Request,
+    start: float = 0.0,
+    stop: float = 1.0,
+    step: float = 0.05
+):
+    if CACHE["dataframe"] is None:
+        raise HTTPException(status_code=400, detail="No CSV uploaded")
+
+    if not (0 <= start <= stop <= 1) or not step > 0:
+        raise HTTPException(
+            status_code=400,
+            detail="Thresholds need 0 <= start <= stop <= 1 and step > 0"
+        )
+
+    n_points = int(np.floor((stop - start) / step + 0.5)) + 1
+    if n_points > MAX_CURVE_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Threshold range has {n_points} points; at most {MAX_CURVE_POINTS} allowed"
+        )
+
+    models = active_bundle()
+    etag = current_etag(request, models)
+    thresholds = np.round(start + step * np.arange(n_points), 6)
+    curve = threshold_curve(get_threshold_index(models), thresholds)
+
+    data = []
+    for i, t in enumerate(thresholds):
+        point = {
+            "threshold": float(t),
+            "flagged": int(curve["flagged"][i]),
+            "segments": {
+                level: int(counts[i]) for level, counts in curve["segments"].items()
+            }
+        }
+        if "precision" in curve:
+            # NaN (no labeled row flagged / no positives) is not valid JSON
+            for metric in ("precision", "recall"):
+                value = curve[metric][i]
+                point[metric] = None if np.isnan(value) else float(value)
+        data.append(point)
+
+    return json_response(request, {
+        "status": "success",
+        "message": "Threshold curve computed",
+        # Rows with a 0/1 churn label behind precision/recall; None when
+        # there are none and the curve has counts only
+        "labeled_rows": curve.get("labeled"),
+        "data": data
+    }, etag=etag)
+
+# -------------------------
+# What-if simulation
+# -------------------------
+class SimulationRequest(BaseModel):
+    customer_ids: list[str] | None = None
+    filters: dict[str, str | int | list[str | int]] = {}
+    # bool is kept as bool (not coerced to 1) so it is rejected as non-numeric
+    scenarios: list[dict[str, str | bool | int | float | None]]
+
+
+# Each simulation scores customers x scenarios rows and returns one
+# entry per pair, so both are capped
+MAX_SIMULATION_SCENARIOS = int(os.environ.get("MAX_SIMULATION_SCENARIOS", 20))
+MAX_SIMULATION_CUSTOMERS = int(os.environ.get("MAX_SIMULATION_CUSTOMERS", 5000))
+
+
+@app.post("/simulate", dependencies=[admit("simulate")])
+def simulate_api(request: SimulationRequest):
+    if CACHE["dataframe"] is None:
+        raise HTTPException(status_code=400, detail="No CSV uploaded")
+
+    if not request.scenarios:
+        raise HTTPException(status_code=400, detail="At least one scenario is required")
+
+    if len(request.scenarios) > MAX_SIMULATION_SCENARIOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_SIMULATION_SCENARIOS} scenarios per request"
+        )
+
+    models = active_bundle()
+    store = get_columnar_store(models)
+
+    # -------------------------
+    # Resolve customer selection
+    # -------------------------
+    try:
+        mask = filter_mask(store, request.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if request.customer_ids is not None:
+        missing = [c for c in request.customer_ids if c not in store["row_by_customer"]]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Customers not found: {missing}")
+        rows = np.array(
+            [store["row_by_customer"][c] for c in request.customer_ids],
+            dtype=np.intp
+        )
+        rows = rows[mask[rows]]
+    else:
+        rows = np.flatnonzero(mask)
+
+    if rows.size == 0:
+        raise HTTPException(status_code=400, detail="Selection matched no customers")
+
+    if rows.size > MAX_SIMULATION_CUSTOMERS:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Selection matched {rows.size} customers; at most "
+                f"{MAX_SIMULATION_CUSTOMERS} allowed, narrow the filters"
+            )
+        )
+
+    # -------------------------
+    # Score every scenario in one batch, in the process pool
+    # -------------------------
+    try:
+        new_prob = run_cpu(
+            workers.simulation,
+            models.versions,
+            models.encoding_spec,
+            CACHE["dataframe"].iloc[rows],
+            np.asarray(get_churn_features(models)[rows]),
+            request.scenarios
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    old_prob = store["churn_probability"][rows]
+    customer_ids = store["customer_ids"][rows]
+
+    data = []
+    for overrides, scenario_prob in zip(request.scenarios, new_prob):
+        delta = scenario_prob - old_prob
+        data.append({
+            "overrides": overrides,
+            "mean_delta": float(delta.mean()),
+            "customers": [
+                {
+                    "customer_id": cid,
+                    "old_probability": float(old),
+                    "new_probability": float(new),
+                    "delta": float(d)
+                }
+                for cid, old, new, d in zip(customer_ids, old_prob, scenario_prob, delta)
+            ]
+        })
+
+    return {
+        "status": "success",
+        "message": f"Simulated {len(data)} scenarios for {rows.size} customers",
+        "data": data
+    }
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:5173", "*"],
@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+
+from ml.preprocessing_refined import CATEGORICAL_FEATURES
+
+# -------------------------
+# Query vocabulary
+# -------------------------
+GROUPABLE_COLUMNS = CATEGORICAL_FEATURES + [
+    "senior_citizen",
+    "segment_label",
+    "churn_label"
+]
+
+METRICS = [
+    "count",
+    "churn_rate",
+    "mean_probability",
+    "revenue_at_risk"
+]
+
+
+def build_columnar_store(
+    df: pd.DataFrame,
+    churn_df: pd.DataFrame,
+    segments_df: pd.DataFrame
+) -> dict:
+    """
+    Build a columnar copy of a scored dataset for fast grouped queries.
+
+    Categoricals are stored as int32 codes over sorted levels (missing
+    values get their own trailing code), numeric measures as NumPy arrays.
+
+    Returns
+    -------
+    dict
+        codes, levels, level_index, churn_probability, churn_label,
+        revenue_at_risk, customer_ids, row_by_customer
+    """
+
+    scored = {
+        "segment_label": segments_df["segment_label"].to_numpy(),
+        "churn_label": churn_df["churn_label"].to_numpy()
+    }
+
+    codes = {}
+    levels = {}
+
+    for col in GROUPABLE_COLUMNS:
+        if col in scored:
+            values = scored[col]
+        elif col in df.columns:
+            values = df[col].to_numpy()
+        else:
+            continue
+
+        col_codes, uniques = pd.factorize(values, sort=True)
+        col_levels = [
+            level.item() if hasattr(level, "item") else level
+            for level in uniques
+        ]
+
+        missing = col_codes < 0
+        if missing.any():
+            col_codes[missing] = len(col_levels)
+            col_levels.append(None)
+
+        codes[col] = col_codes.astype(np.int32)
+        levels[col] = col_levels
+
+    churn_probability = churn_df["churn_probability"].to_numpy(dtype=np.float64)
+
+    monthly_charges = (
+        pd.to_numeric(df["monthly_charges"], errors="coerce")
+        .fillna(0.0)
+        .to_numpy(dtype=np.float64)
+        if "monthly_charges" in df.columns
+        else np.zeros(len(df))
+    )
+
+    customer_ids = churn_df["customer_id"].to_numpy()
+
+    # First occurrence wins, matching explain_customer's row lookup
+    row_by_customer = {}
+    for i, cid in enumerate(customer_ids):
+        row_by_customer.setdefault(cid, i)
+
+    return {
+        "n_rows": len(customer_ids),
+        "codes": codes,
+        "levels": levels,
+        # str keys so "1" and 1 both resolve for numeric levels
+        "level_index": {
+            col: {str(level): code for code, level in enumerate(col_levels)}
+            for col, col_levels in levels.items()
+        },
+        "churn_probability": churn_probability,
+        "churn_label": churn_df["churn_label"].to_numpy(dtype=np.int8),
+        "revenue_at_risk": monthly_charges * churn_probability,
+        "customer_ids": customer_ids,
+        "row_by_customer": row_by_customer
+    }
+
+
+def filter_mask(store: dict, filters: dict | None) -> np.ndarray:
+    """
+    Boolean row mask for {column: value or [values]} equality filters.
+    """
+    mask = np.ones(store["n_rows"], dtype=bool)
+
+    for col, values in (filters or {}).items():
+        if col not in store["codes"]:
+            raise ValueError(f"Unknown filter column: {col}")
+
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+
+        index = store["level_index"][col]
+        wanted = [index[str(v)] for v in values if str(v) in index]
+
+        mask &= np.isin(store["codes"][col], wanted)
+
+    return mask
+
+
+def query_shape(group_by, filters, metrics) -> tuple:
+    """
+    Hashable, order-insensitive key for memoizing a groupby query.
+    """
+    return (
+        tuple(group_by),
+        tuple(sorted(
+            (col, tuple(sorted(
+                str(v) for v in (vals if isinstance(vals, (list, tuple, set)) else [vals])
+            )))
+            for col, vals in (filters or {}).items()
+        )),
+        tuple(metrics)
+    )
+
+
+def groupby_metrics(
+    store: dict,
+    group_by: list,
+    filters: dict | None = None,
+    metrics: list | None = None
+) -> list:
+    """
+    Grouped churn metrics over the columnar store.
+
+    Group codes are combined into one mixed-radix int64 key, so every
+    metric is a single np.bincount over the filtered rows.
+
+    Returns
+    -------
+    list[dict]
+        One record per non-empty group, ordered by group levels.
+    """
+    metrics = list(metrics or METRICS)
+
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {unknown}")
+
+    unknown = [c for c in group_by if c not in store["codes"]]
+    if unknown:
+        raise ValueError(f"Unknown group-by columns: {unknown}")
+
+    mask = filter_mask(store, filters)
+
+    # -------------------------
+    # Mixed-radix group key
+    # -------------------------
+    key = np.zeros(int(mask.sum()), dtype=np.int64)
+    for col in group_by:
+        key = key * len(store["levels"][col]) + store["codes"][col][mask]
+
+    group_keys, inverse = np.unique(key, return_inverse=True)
+    n_groups = len(group_keys)
+
+    count = np.bincount(inverse, minlength=n_groups)
+
+    values = {}
+    if "count" in metrics:
+        values["count"] = count
+    if "churn_rate" in metrics:
+        values["churn_rate"] = np.bincount(
+            inverse, weights=store["churn_label"][mask], minlength=n_groups
+        ) / count
+    if "mean_probability" in metrics:
+        values["mean_probability"] = np.bincount(
+            inverse, weights=store["churn_probability"][mask], minlength=n_groups
+        ) / count
+    if "revenue_at_risk" in metrics:
+        values["revenue_at_risk"] = np.bincount(
+            inverse, weights=store["revenue_at_risk"][mask], minlength=n_groups
+        )
+
+    # -------------------------
+    # Decode keys back to levels
+    # -------------------------
+    decoded = {}
+    remaining = group_keys.copy()
+    for col in reversed(group_by):
+        cardinality = len(store["levels"][col])
+        remaining, col_codes = np.divmod(remaining, cardinality)
+        decoded[col] = col_codes
+
+    records = []
+    for g in range(n_groups):
+        record = {
+            col: store["levels"][col][decoded[col][g]]
+            for col in group_by
+        }
+        for metric, arr in values.items():
+            record[metric] = arr[g].item()
+        records.append(record)
+
+    return records
+
+
+def top_k_at_risk(store: dict, k: int, filters: dict | None = None) -> np.ndarray:
+    """
+    Row indices of the k highest churn probabilities after filtering.
+
+    Uses np.argpartition over the cached probability array, so only the
+    selected k rows are ever sorted or materialized.
+
+    Returns
+    -------
+    np.ndarray
+        Row positions, highest probability first.
+    """
+    candidates = np.flatnonzero(filter_mask(store, filters))
+    if k <= 0 or candidates.size == 0:
+        return candidates[:0]
+
+    probs = store["churn_probability"][candidates]
+
+    if k < candidates.size:
+        top = np.argpartition(-probs, k - 1)[:k]
+    else:
+        top = np.arange(candidates.size)
+
+    order = np.argsort(-probs[top], kind="stable")
+    return candidates[top[order]]
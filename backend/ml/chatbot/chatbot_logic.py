@@ -32,13 +32,18 @@ def chatbot_response(
     # -------------------------
     # Churn
     # -------------------------
+    cube = cached_outputs["insight_cube"]
+
     if intent == "CHURN_OVERVIEW":
-        return churn_overview_template(cached_outputs["churn"])
+        return churn_overview_template(cube)
 
     if intent == "CHURN_DRIVERS":
-        if cached_outputs.get("global_explain") is None:
+        if not cube.get("global_drivers"):
             return "Churn drivers are not available yet."
-        return churn_drivers_template(cached_outputs["global_explain"])
+        # One entry per business feature reads better than one-hot columns
+        return churn_drivers_template(
+            cube, grouped=bool(cube.get("global_drivers_grouped"))
+        )
 
     if intent == "CHURN_CUSTOMER":
         if not customer_selected or not selected_customer_id:
@@ -61,14 +66,10 @@ def chatbot_response(
         return segment_explain_template(segment_id, segment_desc)
 
     if intent in ("SEGMENT_DISTRIBUTION", "SEGMENT_OVERVIEW"):
-        return segment_distribution_template(
-            cached_outputs["segment_counts"]
-        )
+        return segment_distribution_template(cube)
 
     if intent == "SEGMENT_CHURN":
-        return segment_churn_template(
-            cached_outputs["segment_churn"]
-        )
+        return segment_churn_template(cube)
 
     # -------------------------
     # Dataset
@@ -1,6 +1,6 @@
-def churn_overview_template(churn_df):
-    total = len(churn_df)
-    high_risk = (churn_df["churn_label"] == 1).sum()
+def churn_overview_template(cube):
+    total = cube["total_customers"]
+    high_risk = cube["high_risk_count"]
     pct = round((high_risk / total) * 100, 1) if total else 0
 
     return (
@@ -10,13 +10,14 @@ def churn_overview_template(churn_df):
     )
 
 
-def churn_drivers_template(global_explain_df, top_n=3):
-    top_features = (
-        global_explain_df
-        .sort_values("mean_abs_shap", ascending=False)
-        .head(top_n)["feature"]
-        .tolist()
-    )
+def churn_drivers_template(cube, top_n=3, grouped=False):
+    # Drivers are stored already ranked by mean_abs_shap; grouped ones are
+    # raw business features (contract_type rather than its one-hot columns)
+    drivers = cube["global_drivers_grouped"] if grouped else cube["global_drivers"]
+    top_features = [
+        driver["feature"].replace("_", " ") if grouped else driver["feature"]
+        for driver in drivers[:top_n]
+    ]
 
     return (
         "Several factors strongly influence churn risk.\n\n"
@@ -51,22 +52,57 @@ def segment_explain_template(segment_id, segment_descriptions):
     )
 
 
-def segment_distribution_template(segment_counts):
+def segment_distribution_template(cube):
+    segment_counts = dict(sorted(
+        ((seg, stats["count"]) for seg, stats in cube["segments"].items()),
+        key=lambda item: item[1],
+        reverse=True
+    ))
+
     return (
         "Customers are distributed across multiple segments.\n\n"
         f"Segment sizes: {segment_counts}."
     )
 
 
-def segment_churn_template(segment_churn):
+def segment_churn_template(cube):
+    segment_churn = {
+        seg: round(stats["churn_rate"], 2)
+        for seg, stats in cube["segments"].items()
+    }
+
     return (
         "Churn varies across customer segments.\n\n"
         f"Segment-level churn rates: {segment_churn}."
     )
 
 
-def dataset_summary_template(summary):
-    return (
+def dataset_summary_template(summary, top_n=3):
+    # summary is DatasetSketch.summary(): row_count, numeric, categorical
+    numeric = summary["numeric"]
+    medians = [
+        f"{col.replace('_', ' ')} {stats['quantiles']['p50']:.1f}"
+        for col, stats in numeric.items()
+        if col in ("tenure_months", "monthly_charges")
+        and stats["quantiles"]["p50"] is not None
+    ]
+
+    null_rates = {
+        col: stats["null_rate"]
+        for kind in ("numeric", "categorical")
+        for col, stats in summary[kind].items()
+        if stats["null_rate"] > 0
+    }
+    most_missing = sorted(null_rates, key=null_rates.get, reverse=True)[:top_n]
+
+    text = (
         "Here is a summary of the uploaded dataset.\n\n"
-        f"{summary}"
+        f"It contains {summary['row_count']} customer records."
     )
+    if medians:
+        text += f" Median {', median '.join(medians)}."
+    if most_missing:
+        text += " Columns with the most missing values: " + ", ".join(
+            f"{col} ({null_rates[col]:.0%})" for col in most_missing
+        ) + "."
+    return text
@@ -0,0 +1,223 @@
+import os
+import copy
+import numpy as np
+import pandas as pd
+import joblib
+
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+# The helpers RandomForestClassifier itself uses for oob_score_
+from sklearn.ensemble._forest import _generate_unsampled_indices, _get_n_samples_bootstrap
+from sklearn.metrics import roc_auc_score, f1_score
+
+from ml.train_baseline import split_dataset
+
+# -------------------------
+# Paths
+# -------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DATA_PATH = os.path.join(
+    BASE_DIR, "..", "ml_data", "sample_customer_churn_v2.csv"
+)
+MODEL_PATH = os.path.join(
+    BASE_DIR, "..", "ml_models", "final_churn_model.pkl"
+)
+OUTPUT_DIR = os.path.join(
+    BASE_DIR, "..", "ml_models", "compressed"
+)
+
+# -------------------------
+# Candidate settings
+# -------------------------
+TOP_K_TREES = [25, 50, 100]
+DEPTH_LIMITS = [6, 10]
+DEPTH_LIMITED_N_ESTIMATORS = 100
+STUDENT_N_ESTIMATORS = 50
+STUDENT_MAX_DEPTH = 8
+
+
+# -------------------------
+# Out-of-bag predictions of the teacher
+# -------------------------
+def oob_tree_probabilities(forest, X_train_processed) -> tuple:
+    """
+    Per-tree positive-class probabilities on the forest's training rows,
+    with the mask of rows each tree never saw (its out-of-bag rows).
+
+    Returns
+    -------
+    tuple
+        (n_trees, n_rows) probabilities and (n_trees, n_rows) OOB mask
+    """
+    if not forest.bootstrap:
+        raise ValueError("Out-of-bag rows need a forest trained with bootstrap=True")
+
+    n_rows = X_train_processed.shape[0]
+    n_bootstrap = _get_n_samples_bootstrap(n_rows, forest.max_samples)
+    X = np.asarray(X_train_processed, dtype=np.float32)
+
+    probs = np.stack([tree.predict_proba(X)[:, 1] for tree in forest.estimators_])
+
+    oob = np.zeros(probs.shape, dtype=bool)
+    for t, tree in enumerate(forest.estimators_):
+        oob[t, _generate_unsampled_indices(tree.random_state, n_rows, n_bootstrap)] = True
+
+    return probs, oob
+
+
+def oob_probability(probs, oob, y) -> np.ndarray:
+    """
+    The ensemble's OOB probability per training row (sklearn's
+    oob_decision_function_); rows no tree left out keep their label.
+    """
+    counts = oob.sum(axis=0)
+    sums = np.where(oob, probs, 0.0).sum(axis=0)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), y)
+
+
+def rank_trees(probs, oob, y) -> np.ndarray:
+    """
+    Trees ordered by leave-one-tree-out OOB Brier contribution: a tree
+    contributes when removing it makes the OOB ensemble worse. Only
+    training rows are used, so the validation split stays unseen.
+    """
+    counts = oob.sum(axis=0)
+    sums = np.where(oob, probs, 0.0).sum(axis=0)
+    with_all = sums / np.maximum(counts, 1)
+
+    # Vectorized over all trees at once: (n_trees, n_rows)
+    counts_without = counts[None, :] - oob
+    without_tree = (sums[None, :] - np.where(oob, probs, 0.0)) / np.maximum(counts_without, 1)
+
+    # Rows left out by this tree and at least one other
+    scored = oob & (counts_without > 0)
+    change = np.where(
+        scored,
+        (without_tree - y[None, :]) ** 2 - (with_all[None, :] - y[None, :]) ** 2,
+        0.0
+    )
+    contribution = change.sum(axis=1) / y.size
+
+    return np.argsort(-contribution, kind="stable")
+
+
+def build_candidates(model, X_train, y_train) -> dict:
+    preprocessing = model.named_steps["preprocessing"]
+    forest = model.named_steps["classifier"]
+
+    y_train_arr = y_train.to_numpy()
+    probs, oob = oob_tree_probabilities(forest, preprocessing.transform(X_train))
+
+    candidates = {}
+
+    # -------------------------
+    # 1. Top-k trees by OOB contribution
+    # -------------------------
+    tree_ranking = rank_trees(probs, oob, y_train_arr)
+    n_trees = len(forest.estimators_)
+
+    for k in TOP_K_TREES:
+        if k >= n_trees:
+            continue
+
+        pruned = copy.deepcopy(model)
+        pruned_forest = pruned.named_steps["classifier"]
+        pruned_forest.estimators_ = [
+            pruned_forest.estimators_[i] for i in tree_ranking[:k]
+        ]
+        pruned_forest.n_estimators = k
+
+        candidates[f"top{k}_trees"] = pruned
+
+    # -------------------------
+    # 2. Depth-limited retrains
+    # -------------------------
+    for depth in DEPTH_LIMITS:
+        shallow = clone(model)
+        shallow.set_params(
+            classifier__max_depth=depth,
+            classifier__n_estimators=DEPTH_LIMITED_N_ESTIMATORS
+        )
+        shallow.fit(X_train, y_train)
+
+        candidates[f"depth{depth}"] = shallow
+
+    # -------------------------
+    # 3. Student distilled from the forest's probabilities
+    # -------------------------
+    # The target is the teacher's out-of-bag probability: on its own
+    # training rows a fully grown forest nearly reproduces the labels.
+    # Soft labels are expressed through sample weights: every training row
+    # appears once as class 0 (weight 1 - p) and once as class 1 (weight p),
+    # so the student's leaf frequencies regress onto the teacher's probability
+    # while remaining a plain RandomForestClassifier (drop-in for the API and
+    # TreeExplainer).
+    teacher_prob = oob_probability(probs, oob, y_train_arr)
+
+    X_distill = pd.concat([X_train, X_train], ignore_index=True)
+    y_distill = np.concatenate([
+        np.zeros(len(X_train), dtype=int),
+        np.ones(len(X_train), dtype=int)
+    ])
+    w_distill = np.concatenate([1.0 - teacher_prob, teacher_prob])
+
+    student = clone(model)
+    student.set_params(
+        classifier=RandomForestClassifier(
+            n_estimators=STUDENT_N_ESTIMATORS,
+            max_depth=STUDENT_MAX_DEPTH,
+            min_samples_leaf=2,
+            random_state=42,
+            n_jobs=-1
+        )
+    )
+    student.fit(X_distill, y_distill, classifier__sample_weight=w_distill)
+
+    candidates["distilled"] = student
+
+    return candidates
+
+
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Same split as training; the validation rows are only used to report
+    split = split_dataset(pd.read_csv(DATA_PATH))
+    X_val, y_val = split["X_val"], split["y_val"]
+
+    model = joblib.load(MODEL_PATH)
+    candidates = build_candidates(model, split["X_train"], split["y_train"])
+
+    # -------------------------
+    # Save candidates + quick summary
+    # -------------------------
+    print("Forest Compression Candidates")
+    print("-----------------------------")
+    print(f"{'candidate':<16}{'trees':>7}{'nodes':>9}{'AUC':>8}{'F1':>8}")
+
+    for name, candidate in [("production", model)] + list(candidates.items()):
+        candidate_forest = candidate.named_steps["classifier"]
+        n_nodes = sum(t.tree_.node_count for t in candidate_forest.estimators_)
+
+        y_prob = candidate.predict_proba(X_val)[:, 1]
+        y_pred = (y_prob >= 0.5).astype(int)
+
+        print(
+            f"{name:<16}{len(candidate_forest.estimators_):>7}{n_nodes:>9}"
+            f"{roc_auc_score(y_val, y_prob):>8.3f}{f1_score(y_val, y_pred):>8.3f}"
+        )
+
+        if name == "production":
+            continue
+
+        joblib.dump(
+            candidate,
+            os.path.join(OUTPUT_DIR, f"final_churn_model_{name}.pkl")
+        )
+
+    print(f"\nCandidates saved to: {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
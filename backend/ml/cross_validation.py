@@ -0,0 +1,180 @@
+import time
+
+import numpy as np
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+from ml.predict import DEFAULT_THRESHOLD
+
+METRICS = ("roc_auc", "precision", "recall", "f1")
+
+# Bootstrap resamples are drawn in blocks of at most this many
+# (resample, row) cells, bounding memory on large prediction arrays
+BOOTSTRAP_BLOCK_CELLS = 4_000_000
+
+# -------------------------
+# Vectorized metrics (one row per resample)
+# -------------------------
+def rank_auc(y_true: np.ndarray, y_score: np.ndarray) -> np.ndarray:
+    """
+    ROC-AUC per row of (n_samples, n_rows) label / score matrices, via the
+    Mann-Whitney rank statistic (ties get average ranks). NaN where a row
+    has a single class.
+    """
+    y_true = np.atleast_2d(y_true).astype(bool)
+    ranks = rankdata(np.atleast_2d(y_score), axis=1)
+
+    n_pos = y_true.sum(axis=1)
+    n_neg = y_true.shape[1] - n_pos
+    pos_rank_sum = np.where(y_true, ranks, 0.0).sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (pos_rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+def classification_metrics(y_true, y_score, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """
+    AUC, precision, recall and F1 for each row of (n_samples, n_rows)
+    label / score matrices (a 1-D pair is one row). Undefined ratios are
+    0, as in sklearn's zero_division=0.
+    """
+    y_true = np.atleast_2d(y_true).astype(bool)
+    y_score = np.atleast_2d(y_score)
+    y_pred = y_score >= threshold
+
+    tp = (y_true & y_pred).sum(axis=1)
+    fp = (~y_true & y_pred).sum(axis=1)
+    fn = (y_true & ~y_pred).sum(axis=1)
+
+    def ratio(num, den):
+        return np.divide(num, den, out=np.zeros(num.shape), where=den > 0)
+
+    return {
+        "roc_auc": rank_auc(y_true, y_score),
+        "precision": ratio(tp, tp + fp),
+        "recall": ratio(tp, tp + fn),
+        "f1": ratio(2 * tp, 2 * tp + fp + fn)
+    }
+
+
+def bootstrap_intervals(
+    y_true: np.ndarray,
+    y_score: np.ndarray,
+    n_boot: int = 1000,
+    confidence: float = 0.95,
+    threshold: float = DEFAULT_THRESHOLD,
+    seed: int = 42
+) -> dict:
+    """
+    Percentile bootstrap confidence intervals for METRICS.
+
+    All resamples are scored at once: row indices are drawn as an
+    (n_boot, n_rows) matrix and every metric is computed along axis 1.
+
+    Returns
+    -------
+    dict
+        metric -> {estimate, low, high, std}; resamples with one class
+        are left out of the AUC interval
+    """
+    y_true = np.asarray(y_true)
+    y_score = np.asarray(y_score, dtype=np.float64)
+    n_rows = y_true.size
+
+    rng = np.random.default_rng(seed)
+    block = max(1, BOOTSTRAP_BLOCK_CELLS // max(1, n_rows))
+
+    samples = {metric: [] for metric in METRICS}
+    for start in range(0, n_boot, block):
+        idx = rng.integers(0, n_rows, size=(min(block, n_boot - start), n_rows))
+        for metric, values in classification_metrics(
+            y_true[idx], y_score[idx], threshold
+        ).items():
+            samples[metric].append(values)
+
+    estimate = classification_metrics(y_true, y_score, threshold)
+    tail = (1 - confidence) / 2 * 100
+
+    intervals = {}
+    for metric in METRICS:
+        values = np.concatenate(samples[metric])
+        low, high = np.nanpercentile(values, [tail, 100 - tail])
+        intervals[metric] = {
+            "estimate": float(estimate[metric][0]),
+            "low": float(low),
+            "high": float(high),
+            "std": float(np.nanstd(values))
+        }
+    return intervals
+
+# -------------------------
+# Cross-validation
+# -------------------------
+def fit_fold(template, X, y, fold: int, train_idx, test_idx) -> dict:
+    """
+    Fit an unfitted clone of the pipeline on one fold and score its
+    held-out rows. Runs in a pool worker.
+    """
+    model = clone(template)
+
+    start = time.perf_counter()
+    model.fit(X.iloc[train_idx], y.iloc[train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_prob = model.predict_proba(X.iloc[test_idx])[:, 1]
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        "fold": fold,
+        "test_idx": test_idx,
+        "y_prob": y_prob,
+        "train_rows": int(len(train_idx)),
+        "test_rows": int(len(test_idx)),
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds
+    }
+
+
+def cross_validate(template, X, y, n_splits: int = 5, submit=None, seed: int = 42) -> dict:
+    """
+    Stratified k-fold CV of a pipeline configuration.
+
+    Parameters
+    ----------
+    template : sklearn estimator
+        Cloned (unfitted) per fold
+    submit : callable, optional
+        fn(*args) -> Future, e.g. ProcessPoolExecutor.submit; None fits
+        the folds one after another in this process
+
+    Returns
+    -------
+    dict
+        folds (per-fold metrics and timings, in fold order) and oof_prob,
+        the out-of-fold probability for every row
+    """
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    splits = list(splitter.split(X, y))
+
+    if submit is None:
+        results = [fit_fold(template, X, y, i, tr, te) for i, (tr, te) in enumerate(splits)]
+    else:
+        futures = [submit(fit_fold, template, X, y, i, tr, te) for i, (tr, te) in enumerate(splits)]
+        results = [future.result() for future in futures]
+
+    y_true = np.asarray(y)
+    oof_prob = np.empty(len(y_true), dtype=np.float64)
+
+    folds = []
+    for result in results:
+        test_idx = result.pop("test_idx")
+        y_prob = result.pop("y_prob")
+        oof_prob[test_idx] = y_prob
+
+        metrics = classification_metrics(y_true[test_idx], y_prob)
+        result["metrics"] = {metric: float(values[0]) for metric, values in metrics.items()}
+        folds.append(result)
+
+    return {"folds": folds, "oof_prob": oof_prob}
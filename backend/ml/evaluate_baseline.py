@@ -2,7 +2,6 @@ import os
 import pandas as pd
 import joblib
 
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
     accuracy_score,
     precision_score,
@@ -11,6 +10,8 @@ from sklearn.metrics import (
     classification_report
 )
 
+from ml.train_baseline import split_dataset
+
 # -------------------------
 # Paths (robust)
 # -------------------------
@@ -19,48 +20,39 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn.csv")
 MODEL_PATH = os.path.join(BASE_DIR, "..", "ml_models", "baseline_churn_model.pkl")
 
+
 # -------------------------
-# Load data
+# Metrics
 # -------------------------
-df = pd.read_csv(DATA_PATH)
+def baseline_metrics(model, X_val, y_val) -> dict:
+    y_pred = model.predict(X_val)
+    y_prob = model.predict_proba(X_val)[:, 1]
 
-X = df.drop(columns=["churn", "customer_id"])
-y = df["churn"]
+    return {
+        "accuracy": accuracy_score(y_val, y_pred),
+        "precision": precision_score(y_val, y_pred),
+        "recall": recall_score(y_val, y_pred),
+        "roc_auc": roc_auc_score(y_val, y_prob)
+    }
 
-# Same split strategy as training
-X_train, X_val, y_train, y_val = train_test_split(
-    X,
-    y,
-    test_size=0.2,
-    random_state=42,
-    stratify=y
-)
 
-# -------------------------
-# Load trained model
-# -------------------------
-model = joblib.load(MODEL_PATH)
+def main():
+    # Same split strategy as training
+    split = split_dataset(pd.read_csv(DATA_PATH))
 
-# -------------------------
-# Predictions
-# -------------------------
-y_pred = model.predict(X_val)
-y_prob = model.predict_proba(X_val)[:, 1]
+    model = joblib.load(MODEL_PATH)
+    metrics = baseline_metrics(model, split["X_val"], split["y_val"])
 
-# -------------------------
-# Metrics
-# -------------------------
-accuracy = accuracy_score(y_val, y_pred)
-precision = precision_score(y_val, y_pred)
-recall = recall_score(y_val, y_pred)
-roc_auc = roc_auc_score(y_val, y_prob)
+    print("Baseline Model Evaluation Metrics")
+    print("---------------------------------")
+    print(f"Accuracy : {metrics['accuracy']:.3f}")
+    print(f"Precision: {metrics['precision']:.3f}")
+    print(f"Recall   : {metrics['recall']:.3f}")
+    print(f"ROC-AUC  : {metrics['roc_auc']:.3f}")
+
+    print("\nClassification Report")
+    print(classification_report(split["y_val"], model.predict(split["X_val"])))
 
-print("Baseline Model Evaluation Metrics")
-print("---------------------------------")
-print(f"Accuracy : {accuracy:.3f}")
-print(f"Precision: {precision:.3f}")
-print(f"Recall   : {recall:.3f}")
-print(f"ROC-AUC  : {roc_auc:.3f}")
 
-print("\nClassification Report")
-print(classification_report(y_val, y_pred))
+if __name__ == "__main__":
+    main()
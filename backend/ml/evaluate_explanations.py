@@ -0,0 +1,114 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import joblib
+
+from ml.preprocessing_refined import build_inference_pipeline
+from ml.explainability import feature_contributions
+from ml.fast_forest import predict_positive
+from ml.tree_contributions import get_compiled_forest, path_contributions
+
+# -------------------------
+# Paths
+# -------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DATA_PATHS = [
+    os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn.csv"),
+    os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn_v2.csv")
+]
+MODEL_PATH = os.path.join(
+    BASE_DIR, "..", "ml_models", "final_churn_model.pkl"
+)
+
+# Size of the "top reasons" list compared between methods
+TOP_K = 5
+
+# Single-customer latency is averaged over this many rows
+LATENCY_ROWS = 20
+
+# bias + contributions must reproduce the forest's probability
+ADDITIVITY_TOLERANCE = 1e-9
+
+
+def top_k_sets(contributions: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-np.abs(contributions), axis=1, kind="stable")[:, :k]
+
+
+def per_row_ms(fn, X: np.ndarray) -> float:
+    rows = X[:LATENCY_ROWS]
+    start = time.perf_counter()
+    for i in range(rows.shape[0]):
+        fn(rows[i:i + 1])
+    return (time.perf_counter() - start) * 1000 / rows.shape[0]
+
+# -------------------------
+# Load model
+# -------------------------
+model = build_inference_pipeline(joblib.load(MODEL_PATH))
+preprocessing = model.named_steps["preprocessing"]
+classifier = model.named_steps["classifier"]
+
+compiled = get_compiled_forest(classifier)
+
+print("Local Explanations: Path Contributions vs Exact TreeSHAP")
+print("--------------------------------------------------------")
+
+for data_path in DATA_PATHS:
+    X = pd.read_csv(data_path).drop(columns=["customer_id", "churn"], errors="ignore")
+    X_processed = preprocessing.transform(X)
+
+    # Warm both caches (TreeExplainer build, forest already compiled)
+    feature_contributions(X_processed[:1], classifier, "shap")
+
+    # -------------------------
+    # Agreement
+    # -------------------------
+    exact = feature_contributions(X_processed, classifier, "shap")
+    bias, approx = path_contributions(compiled, X_processed)
+
+    exact_top = top_k_sets(exact, TOP_K)
+    approx_top = top_k_sets(approx, TOP_K)
+
+    overlap = np.mean([
+        len(set(a) & set(b)) / TOP_K for a, b in zip(exact_top, approx_top)
+    ])
+    top1_match = np.mean(exact_top[:, 0] == approx_top[:, 0])
+
+    # Same sign on the features both methods rank in their top k
+    sign_agreement = np.mean([
+        np.mean(np.sign(exact[i, shared]) == np.sign(approx[i, shared]))
+        for i in range(exact.shape[0])
+        if (shared := np.intersect1d(exact_top[i], approx_top[i])).size
+    ])
+
+    additivity = np.abs(
+        bias + approx.sum(axis=1) - predict_positive(compiled, X_processed)
+    ).max()
+
+    # -------------------------
+    # Latency
+    # -------------------------
+    shap_ms = per_row_ms(lambda row: feature_contributions(row, classifier, "shap"), X_processed)
+    path_ms = per_row_ms(lambda row: path_contributions(compiled, row), X_processed)
+
+    start = time.perf_counter()
+    feature_contributions(X_processed, classifier, "shap")
+    shap_batch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    path_contributions(compiled, X_processed)
+    path_batch_s = time.perf_counter() - start
+
+    print(f"\n{os.path.basename(data_path)} ({len(X)} rows)")
+    print(f"  top-{TOP_K} overlap           : {overlap:.1%}")
+    print(f"  top-1 match             : {top1_match:.1%}")
+    print(f"  sign agreement (top-{TOP_K})  : {sign_agreement:.1%}")
+    print(f"  max additivity error    : {additivity:.2e}")
+    print(f"  exact SHAP              : {shap_ms:.1f} ms/customer, {shap_batch_s:.2f} s batch")
+    print(f"  path contributions      : {path_ms:.1f} ms/customer, {path_batch_s:.2f} s batch")
+    print(f"  speedup (per customer)  : {shap_ms / path_ms:.1f}x")
+
+    if additivity > ADDITIVITY_TOLERANCE:
+        raise SystemExit("Path contributions do not add up to the forest prediction")
@@ -1,8 +1,15 @@
 import os
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import joblib
+import shap
 
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
     roc_auc_score,
     precision_score,
@@ -11,6 +18,9 @@ from sklearn.metrics import (
     classification_report
 )
 
+from ml.cross_validation import cross_validate, bootstrap_intervals, METRICS
+from ml.train_baseline import split_dataset
+
 # -------------------------
 # Paths
 # -------------------------
@@ -22,51 +32,232 @@ DATA_PATH = os.path.join(
 MODEL_PATH = os.path.join(
     BASE_DIR, "..", "ml_models", "final_churn_model.pkl"
 )
+CANDIDATE_DIR = os.path.join(
+    BASE_DIR, "..", "ml_models", "compressed"
+)
+CV_REPORT_PATH = os.path.join(
+    BASE_DIR, "..", "ml_models", "cv_report.json"
+)
 
-# -------------------------
-# Load data
-# -------------------------
-df = pd.read_csv(DATA_PATH)
+LATENCY_REPEATS = 5
 
-X = df.drop(columns=["churn", "customer_id"])
-y = df["churn"]
+# CV folds are fitted across this many processes
+N_WORKERS = int(os.environ.get("CV_WORKERS", os.cpu_count() or 1))
 
-# -------------------------
-# Hold-out split
-# -------------------------
-X_train, X_val, y_train, y_val = train_test_split(
-    X,
-    y,
-    test_size=0.2,
-    random_state=42,
-    stratify=y
-)
+
+def load_data():
+    df = pd.read_csv(DATA_PATH)
+
+    X = df.drop(columns=["churn", "customer_id"])
+    y = df["churn"]
+    return X, y
 
 # -------------------------
-# Load trained pipeline
+# Hold-out evaluation (default mode)
 # -------------------------
-model = joblib.load(MODEL_PATH)
+def holdout_metrics(model, X_val, y_val) -> dict:
+    y_pred = model.predict(X_val)
+    y_prob = model.predict_proba(X_val)[:, 1]
+
+    return {
+        "roc_auc": roc_auc_score(y_val, y_prob),
+        "precision": precision_score(y_val, y_pred),
+        "recall": recall_score(y_val, y_pred),
+        "f1": f1_score(y_val, y_pred)
+    }
+
+
+def evaluate_holdout():
+    # Hold-out split (same as training)
+    split = split_dataset(pd.read_csv(DATA_PATH))
+    X_val, y_val = split["X_val"], split["y_val"]
+
+    # Load trained pipeline
+    model = joblib.load(MODEL_PATH)
+
+    metrics = holdout_metrics(model, X_val, y_val)
+
+    print("Refined Model Evaluation Metrics")
+    print("--------------------------------")
+    print(f"ROC-AUC  : {metrics['roc_auc']:.3f}")
+    print(f"Precision: {metrics['precision']:.3f}")
+    print(f"Recall   : {metrics['recall']:.3f}")
+    print(f"F1-score : {metrics['f1']:.3f}")
+
+    print("\nClassification Report")
+    print(classification_report(y_val, model.predict(X_val)))
+
+    compare_candidates(X_val, y_val)
 
 # -------------------------
-# Predictions
+# Candidate comparison (see ml/compress_forest.py)
 # -------------------------
-y_pred = model.predict(X_val)
-y_prob = model.predict_proba(X_val)[:, 1]
+def median_latency_ms(fn, repeats=LATENCY_REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def profile_candidate(name, path, X_val, y_val):
+    candidate = joblib.load(path)
+
+    preprocessing = candidate.named_steps["preprocessing"]
+    classifier = candidate.named_steps["classifier"]
+
+    cand_prob = candidate.predict_proba(X_val)[:, 1]
+    cand_pred = (cand_prob >= 0.5).astype(int)
+
+    X_val_processed = preprocessing.transform(X_val)
+    explainer = shap.TreeExplainer(classifier)
+
+    return {
+        "candidate": name,
+        "trees": len(classifier.estimators_),
+        "nodes": sum(t.tree_.node_count for t in classifier.estimators_),
+        "roc_auc": roc_auc_score(y_val, cand_prob),
+        "f1": f1_score(y_val, cand_pred),
+        "size_kb": os.path.getsize(path) / 1024,
+        "predict_ms": median_latency_ms(lambda: candidate.predict_proba(X_val)),
+        "shap_ms": median_latency_ms(
+            lambda: explainer.shap_values(X_val_processed),
+            repeats=1
+        )
+    }
+
+
+def compare_candidates(X_val, y_val):
+    candidate_paths = sorted(
+        glob.glob(os.path.join(CANDIDATE_DIR, "final_churn_model_*.pkl"))
+    )
+
+    if not candidate_paths:
+        print("\nNo compressed candidates found; run ml.compress_forest first.")
+        return
+
+    rows = [profile_candidate("production", MODEL_PATH, X_val, y_val)]
+
+    for path in candidate_paths:
+        name = (
+            os.path.basename(path)
+            .replace("final_churn_model_", "")
+            .replace(".pkl", "")
+        )
+        rows.append(profile_candidate(name, path, X_val, y_val))
+
+    comparison = pd.DataFrame(rows).set_index("candidate")
+
+    print("\nCandidate Comparison (validation split)")
+    print("---------------------------------------")
+    print(comparison.round(3).to_string())
 
 # -------------------------
-# Metrics
+# Cross-validation mode (--cv K)
 # -------------------------
-roc_auc = roc_auc_score(y_val, y_prob)
-precision = precision_score(y_val, y_pred)
-recall = recall_score(y_val, y_pred)
-f1 = f1_score(y_val, y_pred)
-
-print("Refined Model Evaluation Metrics")
-print("--------------------------------")
-print(f"ROC-AUC  : {roc_auc:.3f}")
-print(f"Precision: {precision:.3f}")
-print(f"Recall   : {recall:.3f}")
-print(f"F1-score : {f1:.3f}")
-
-print("\nClassification Report")
-print(classification_report(y_val, y_pred))
+def evaluate_cv(n_splits, n_boot, confidence, n_workers, report_path, seed=42):
+    X, y = load_data()
+
+    # The production configuration, refitted from scratch on every fold
+    template = joblib.load(MODEL_PATH)
+    if n_workers > 1:
+        # Folds already use every worker; avoid nested tree parallelism
+        template.set_params(classifier__n_jobs=1)
+
+    start = time.perf_counter()
+    if n_workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(n_workers, n_splits),
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            cv = cross_validate(template, X, y, n_splits=n_splits, submit=pool.submit, seed=seed)
+    else:
+        cv = cross_validate(template, X, y, n_splits=n_splits, seed=seed)
+    cv_seconds = time.perf_counter() - start
+
+    # Out-of-fold predictions cover every row exactly once
+    start = time.perf_counter()
+    intervals = bootstrap_intervals(
+        y.to_numpy(), cv["oof_prob"], n_boot=n_boot, confidence=confidence, seed=seed
+    )
+    bootstrap_seconds = time.perf_counter() - start
+
+    fold_metrics = pd.DataFrame([fold["metrics"] for fold in cv["folds"]])
+
+    report = {
+        "model_path": os.path.relpath(MODEL_PATH, BASE_DIR),
+        "data_path": os.path.relpath(DATA_PATH, BASE_DIR),
+        "rows": int(len(y)),
+        "positives": int(y.sum()),
+        "n_splits": n_splits,
+        "seed": seed,
+        "workers": n_workers,
+        "folds": cv["folds"],
+        "cv": {
+            metric: {
+                "mean": float(fold_metrics[metric].mean()),
+                "std": float(fold_metrics[metric].std(ddof=1))
+            }
+            for metric in METRICS
+        },
+        "bootstrap": {
+            "resamples": n_boot,
+            "confidence": confidence,
+            "source": "out-of-fold predictions",
+            "metrics": intervals
+        },
+        "timings": {
+            "cv_seconds": cv_seconds,
+            "bootstrap_seconds": bootstrap_seconds,
+            "fit_seconds_total": sum(fold["fit_seconds"] for fold in cv["folds"]),
+            "predict_seconds_total": sum(fold["predict_seconds"] for fold in cv["folds"])
+        }
+    }
+
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Stratified {n_splits}-fold CV ({n_workers} workers)")
+    print("----------------------------------")
+    print(fold_metrics.assign(
+        fit_s=[fold["fit_seconds"] for fold in cv["folds"]],
+        predict_s=[fold["predict_seconds"] for fold in cv["folds"]]
+    ).round(3).to_string())
+
+    print(f"\nOut-of-fold estimates, {confidence:.0%} bootstrap CI ({n_boot} resamples)")
+    for metric, ci in intervals.items():
+        print(f"  {metric:<9}: {ci['estimate']:.3f}  [{ci['low']:.3f}, {ci['high']:.3f}]")
+
+    print(f"\nCV {cv_seconds:.2f}s, bootstrap {bootstrap_seconds:.3f}s")
+    print(f"Report saved to: {report_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the final churn model")
+    parser.add_argument("--cv", type=int, metavar="K",
+                        help="Run stratified K-fold CV instead of the hold-out evaluation")
+    parser.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap resamples")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    parser.add_argument("--report", default=CV_REPORT_PATH)
+    args = parser.parse_args()
+
+    if args.cv is None:
+        evaluate_holdout()
+        return
+
+    if args.cv < 2:
+        parser.error("--cv needs at least 2 folds")
+
+    evaluate_cv(
+        n_splits=args.cv,
+        n_boot=args.bootstrap,
+        confidence=args.confidence,
+        n_workers=args.workers,
+        report_path=args.report
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import joblib
+
+from ml.predict import predict_churn
+from ml.fast_encoding import build_encoding_spec, encode_record
+from ml.fast_forest import compile_forest, predict_positive
+from ml.preprocessing_refined import build_inference_pipeline
+from ml.explainability import get_tree_explainer, positive_class_shap
+
+# -------------------------
+# Paths
+# -------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DATA_PATHS = [
+    os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn.csv"),
+    os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn_v2.csv")
+]
+MODEL_PATH = os.path.join(
+    BASE_DIR, "..", "ml_models", "final_churn_model.pkl"
+)
+
+# Probabilities are averages over trees, so only summation order differs
+PARITY_TOLERANCE = 1e-9
+
+# Rows explained when checking float32 SHAP parity
+SHAP_PARITY_ROWS = 50
+
+# -------------------------
+# Load model + fast-path engines
+# -------------------------
+model = joblib.load(MODEL_PATH)
+
+spec = build_encoding_spec(model.named_steps["preprocessing"])
+compiled = compile_forest(model.named_steps["classifier"])
+
+print("Single-record Scoring: Parity and Latency")
+print("-----------------------------------------")
+
+for data_path in DATA_PATHS:
+    df = pd.read_csv(data_path)
+    reference = predict_churn(df=df, model_pipeline=model)
+
+    # JSON-like records: NaN -> None, as a client would send them
+    records = (
+        df.drop(columns=["churn"], errors="ignore")
+        .astype(object)
+        .where(df.notna(), None)
+        .to_dict(orient="records")
+    )
+
+    # -------------------------
+    # Parity
+    # -------------------------
+    fast_prob = np.array([
+        predict_positive(compiled, encode_record(spec, record))[0]
+        for record in records
+    ])
+
+    max_diff = np.abs(fast_prob - reference["churn_probability"].to_numpy()).max()
+    label_mismatch = int((
+        (fast_prob >= 0.5).astype(int) != reference["churn_label"].to_numpy()
+    ).sum())
+
+    # -------------------------
+    # Latency (single record)
+    # -------------------------
+    sample = records[: min(20, len(records))]
+
+    start = time.perf_counter()
+    for record in sample:
+        model.predict_proba(pd.DataFrame([record]).drop(columns=["customer_id"]))
+    pipeline_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+    start = time.perf_counter()
+    for record in sample:
+        predict_positive(compiled, encode_record(spec, record))
+    fast_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+    print(f"\n{os.path.basename(data_path)} ({len(df)} rows)")
+    print(f"  max |prob diff|   : {max_diff:.2e}")
+    print(f"  label mismatches  : {label_mismatch}")
+    print(f"  pipeline latency  : {pipeline_ms:.2f} ms/record")
+    print(f"  fast-path latency : {fast_ms:.2f} ms/record")
+
+    if max_diff > PARITY_TOLERANCE or label_mismatch:
+        raise SystemExit("Fast scoring path diverges from predict_churn")
+
+# -------------------------
+# float32 inference pipeline parity
+# -------------------------
+float32_model = build_inference_pipeline(model)
+explainer = get_tree_explainer(model.named_steps["classifier"])
+
+print("\nfloat32 Inference Pipeline: Parity and Memory")
+print("---------------------------------------------")
+
+for data_path in DATA_PATHS:
+    X = pd.read_csv(data_path).drop(columns=["customer_id", "churn"], errors="ignore")
+
+    X64 = model.named_steps["preprocessing"].transform(X)
+    X32 = float32_model.named_steps["preprocessing"].transform(X)
+
+    prob_equal = np.array_equal(
+        model.predict_proba(X)[:, 1],
+        float32_model.predict_proba(X)[:, 1]
+    )
+    shap_equal = np.array_equal(
+        positive_class_shap(explainer.shap_values(X64[:SHAP_PARITY_ROWS])),
+        positive_class_shap(explainer.shap_values(X32[:SHAP_PARITY_ROWS]))
+    )
+
+    print(f"\n{os.path.basename(data_path)} ({len(X)} rows)")
+    print(f"  features dtype    : {X64.dtype} -> {X32.dtype}")
+    print(f"  features memory   : {X64.nbytes / 1024:.1f} KB -> {X32.nbytes / 1024:.1f} KB")
+    print(f"  identical probs   : {prob_equal}")
+    print(f"  identical SHAP    : {shap_equal}")
+
+    if not (prob_equal and shap_equal):
+        raise SystemExit("float32 inference pipeline diverges from the float64 model")
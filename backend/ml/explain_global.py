@@ -1,70 +1,97 @@
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import joblib
 import shap
-import numpy as np
 import matplotlib.pyplot as plt
 
+from ml.parallel_shap import chunked_shap, init_shap_worker, global_importance_frame
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 DATA_PATH = os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn_v2.csv")
 MODEL_PATH = os.path.join(BASE_DIR, "..", "ml_models", "final_churn_model.pkl")
 OUTPUT_DIR = os.path.join(BASE_DIR, "..", "ml_models", "explainability")
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# Load data
-df = pd.read_csv(DATA_PATH)
-X = df.drop(columns=["churn", "customer_id"])
-
-# Load pipeline
-pipeline = joblib.load(MODEL_PATH)
-preprocessor = pipeline.named_steps["preprocessing"]
-model = pipeline.named_steps["classifier"]
-
-# Transform data
-X_processed = preprocessor.transform(X)
-column_transformer = preprocessor.named_steps["preprocessor"]
-feature_names = column_transformer.get_feature_names_out()
-
-# SHAP
-explainer = shap.TreeExplainer(model)
-shap_values = explainer.shap_values(X_processed)
-
-# Binary classifier → take positive class
-if isinstance(shap_values, list):
-    shap_values = shap_values[1]
-
-# Handle 3D safely
-if shap_values.ndim == 3:
-    shap_values = shap_values[:, :, 1]
-
-# Aggregate
-mean_abs_shap = np.abs(shap_values).mean(axis=0)
-
-global_importance = pd.DataFrame({
-    "feature": feature_names,
-    "mean_abs_shap": mean_abs_shap
-}).sort_values("mean_abs_shap", ascending=False)
-
-csv_path = os.path.join(OUTPUT_DIR, "global_feature_importance.csv")
-global_importance.to_csv(csv_path, index=False)
-
-print("\nTop 10 Global Churn Drivers")
-print(global_importance.head(10))
-
-# Plot
-plt.figure(figsize=(10, 6))
-shap.summary_plot(
-    shap_values,
-    X_processed,
-    feature_names=feature_names,
-    show=False
-)
-
-plot_path = os.path.join(OUTPUT_DIR, "global_shap_summary.png")
-plt.savefig(plot_path, bbox_inches="tight")
-plt.close()
-
-print(f"\nSaved global importance table to: {csv_path}")
-print(f"Saved SHAP summary plot to: {plot_path}")
+# SHAP row chunks are spread over this many processes
+N_WORKERS = int(os.environ.get("SHAP_WORKERS", os.cpu_count() or 1))
+
+
+def global_shap(X_processed, feature_names, submit=None, n_workers=1, classifier=None) -> dict:
+    """
+    SHAP values for every row and the global importance table.
+
+    submit / classifier as in ml.parallel_shap.chunked_shap: pool
+    workers initialized with the classifier, or None to run in-process
+    with the given classifier.
+    """
+    result = chunked_shap(
+        X_processed,
+        submit=submit,
+        n_workers=n_workers,
+        keep_rows=True,
+        classifier=classifier
+    )
+    return {
+        "values": result["values"],
+        "importance": global_importance_frame(feature_names, result["mean_abs"])
+    }
+
+
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Load data
+    df = pd.read_csv(DATA_PATH)
+    X = df.drop(columns=["churn", "customer_id"])
+
+    # Load pipeline
+    pipeline = joblib.load(MODEL_PATH)
+    preprocessor = pipeline.named_steps["preprocessing"]
+    model = pipeline.named_steps["classifier"]
+
+    # Transform data
+    X_processed = preprocessor.transform(X)
+    column_transformer = preprocessor.named_steps["preprocessor"]
+    feature_names = column_transformer.get_feature_names_out()
+
+    # SHAP (row chunks across processes; per-row values kept for the plot)
+    with ProcessPoolExecutor(
+        max_workers=N_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_shap_worker,
+        initargs=(model,)
+    ) as pool:
+        result = global_shap(
+            X_processed, feature_names, submit=pool.submit, n_workers=N_WORKERS
+        )
+    shap_values = result["values"]
+    global_importance = result["importance"]
+
+    csv_path = os.path.join(OUTPUT_DIR, "global_feature_importance.csv")
+    global_importance.to_csv(csv_path, index=False)
+
+    print("\nTop 10 Global Churn Drivers")
+    print(global_importance.head(10))
+
+    # Plot
+    plt.figure(figsize=(10, 6))
+    shap.summary_plot(
+        shap_values,
+        X_processed,
+        feature_names=feature_names,
+        show=False
+    )
+
+    plot_path = os.path.join(OUTPUT_DIR, "global_shap_summary.png")
+    plt.savefig(plot_path, bbox_inches="tight")
+    plt.close()
+
+    print(f"\nSaved global importance table to: {csv_path}")
+    print(f"Saved SHAP summary plot to: {plot_path}")
+
+
+if __name__ == "__main__":
+    main()
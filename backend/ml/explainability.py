@@ -2,8 +2,77 @@ import pandas as pd
 import shap
 import numpy as np
 
+from ml.id_cache import id_cache
+from ml.tree_contributions import get_compiled_forest, path_contributions
+from ml.feature_groups import get_feature_groups, group_contributions
 
-def explain_customer(customer_id, df, model_pipeline, top_n: int = 5):
+# "shap": exact TreeSHAP; "path": decision-path (Saabas) contributions,
+# approximate but a single traversal per tree
+EXPLAIN_METHODS = ("shap", "path")
+
+# -------------------------
+# Explainer cache (one TreeExplainer per fitted classifier)
+# -------------------------
+get_tree_explainer, release_tree_explainer = id_cache(shap.TreeExplainer)
+
+
+def positive_class_shap(shap_values):
+    """
+    Normalize TreeExplainer output to a (n_samples, n_features) array for
+    the positive class.
+    """
+    if isinstance(shap_values, list):
+        shap_values = shap_values[1]
+
+    if shap_values.ndim == 3:
+        shap_values = shap_values[:, :, 1]
+
+    return shap_values
+
+
+def feature_contributions(X_processed, classifier, method: str = "shap") -> np.ndarray:
+    """
+    (n_samples, n_features) positive-class contributions by `method`.
+    """
+    if method == "shap":
+        return positive_class_shap(
+            get_tree_explainer(classifier).shap_values(X_processed)
+        )
+    if method == "path":
+        _, contributions = path_contributions(
+            get_compiled_forest(classifier), X_processed
+        )
+        return contributions
+    raise ValueError(f"Unknown explanation method: {method}")
+
+
+def _named_contributions(X_processed, model_pipeline, method: str, grouped: bool):
+    """
+    Contributions plus matching feature names, optionally summed per raw
+    feature (see ml.feature_groups).
+    """
+    column_transformer = (
+        model_pipeline.named_steps["preprocessing"].named_steps["preprocessor"]
+    )
+    contributions = feature_contributions(
+        X_processed, model_pipeline.named_steps["classifier"], method
+    )
+
+    if grouped:
+        groups = get_feature_groups(column_transformer)
+        return group_contributions(contributions, groups), groups["names"]
+
+    return contributions, column_transformer.get_feature_names_out()
+
+
+def explain_customer(
+    customer_id,
+    df,
+    model_pipeline,
+    top_n: int = 5,
+    method: str = "shap",
+    grouped: bool = False
+):
     """
     Generate local SHAP explanation for a single customer.
 
@@ -16,6 +85,10 @@ def explain_customer(customer_id, df, model_pipeline, top_n: int = 5):
         Trained churn model pipeline
     top_n : int
         Number of top contributing features to return
+    method : str
+        One of EXPLAIN_METHODS
+    grouped : bool
+        Sum one-hot columns back to their raw feature
 
     Returns
     -------
@@ -35,37 +108,18 @@ def explain_customer(customer_id, df, model_pipeline, top_n: int = 5):
     # -------------------------
     X = row.drop(columns=["customer_id", "churn"], errors="ignore")
 
-    # -------------------------
-    # Extract pipeline components
-    # -------------------------
-    preprocessing_pipeline = model_pipeline.named_steps["preprocessing"]
-    classifier = model_pipeline.named_steps["classifier"]
-
     # -------------------------
     # Transform input
     # -------------------------
-    X_processed = preprocessing_pipeline.transform(X)
+    X_processed = model_pipeline.named_steps["preprocessing"].transform(X)
 
     # -------------------------
-    # Feature names (from ColumnTransformer only)
+    # SHAP (or path) explanation, with encoded or raw feature names
     # -------------------------
-    column_transformer = preprocessing_pipeline.named_steps["preprocessor"]
-    feature_names = column_transformer.get_feature_names_out()
-
-    # -------------------------
-    # SHAP explanation
-    # -------------------------
-    explainer = shap.TreeExplainer(classifier)
-    shap_values = explainer.shap_values(X_processed)
-
-    # Binary classification safety
-    if isinstance(shap_values, list):
-        shap_values = shap_values[1]
-
-    if shap_values.ndim == 3:
-        shap_row = shap_values[0, :, 1]
-    else:
-        shap_row = shap_values[0]
+    contributions, feature_names = _named_contributions(
+        X_processed[:1], model_pipeline, method, grouped
+    )
+    shap_row = contributions[0]
 
     # -------------------------
     # Build DataFrame
@@ -89,3 +143,47 @@ def explain_customer(customer_id, df, model_pipeline, top_n: int = 5):
     )
 
     return local_df
+
+
+def top_contributors(
+    X_rows,
+    model_pipeline,
+    top_n: int = 3,
+    method: str = "shap",
+    grouped: bool = False
+) -> list:
+    """
+    Top SHAP contributors for a small batch of raw rows.
+
+    Parameters
+    ----------
+    X_rows : pd.DataFrame
+        Raw feature rows (customer_id / churn already dropped)
+    model_pipeline : sklearn.pipeline.Pipeline
+    top_n : int
+    method : str
+        One of EXPLAIN_METHODS
+    grouped : bool
+        Sum one-hot columns back to their raw feature
+
+    Returns
+    -------
+    list[list[dict]]
+        Per row: [{"feature", "contribution"}, ...] by |contribution|
+    """
+    X_processed = model_pipeline.named_steps["preprocessing"].transform(X_rows)
+
+    shap_values, feature_names = _named_contributions(
+        X_processed, model_pipeline, method, grouped
+    )
+
+    top_idx = np.argsort(-np.abs(shap_values), axis=1, kind="stable")[:, :top_n]
+
+    return [
+        [
+            {"feature": feature_names[j], "contribution": float(shap_values[i, j])}
+            for j in top_idx[i]
+        ]
+        for i in range(shap_values.shape[0])
+    ]
+
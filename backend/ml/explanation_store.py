@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+
+def build_explanation_store(
+    customer_ids,
+    top_indices: np.ndarray,
+    top_values: np.ndarray,
+    grouped_top_indices: np.ndarray | None = None,
+    grouped_top_values: np.ndarray | None = None
+) -> dict:
+    """
+    Compact per-row explanations for a whole scored dataset.
+
+    Parameters
+    ----------
+    customer_ids : array-like
+        customer_id per row (positional, duplicates allowed)
+    top_indices, top_values : np.ndarray
+        (n_rows, top_n) uint16 feature indices and float32 contributions,
+        ordered by |contribution| (chunked_shap(top_n=...) output)
+    grouped_top_indices, grouped_top_values : np.ndarray, optional
+        The same over contributions summed per raw feature
+
+    Returns
+    -------
+    dict
+        indices, values, grouped_indices, grouped_values, top_n,
+        row_by_customer (first occurrence, the row explain_customer
+        would explain)
+    """
+    customer_ids = np.asarray(customer_ids).astype(str)
+    n_rows = customer_ids.size
+
+    def compact(array, dtype):
+        return None if array is None else np.ascontiguousarray(array, dtype=dtype)
+
+    return {
+        "indices": compact(top_indices, np.uint16),
+        "values": compact(top_values, np.float32),
+        "grouped_indices": compact(grouped_top_indices, np.uint16),
+        "grouped_values": compact(grouped_top_values, np.float32),
+        "top_n": top_indices.shape[1],
+        # Reversed so the first occurrence of a duplicated id wins
+        "row_by_customer": dict(zip(customer_ids[::-1], range(n_rows - 1, -1, -1)))
+    }
+
+
+def has_explanations(store: dict, top_n: int, grouped: bool = False) -> bool:
+    """
+    Whether the store can answer a top_n request without recomputing.
+    """
+    if grouped and store["grouped_indices"] is None:
+        return False
+    return top_n <= store["top_n"]
+
+
+def stored_contributors(
+    store: dict,
+    row: int,
+    feature_names,
+    top_n: int,
+    grouped: bool = False
+) -> list:
+    """
+    [{"feature", "contribution"}, ...] for one row, by |contribution|.
+    feature_names are group names when grouped.
+    """
+    prefix = "grouped_" if grouped else ""
+    indices = store[prefix + "indices"][row, :top_n]
+    values = store[prefix + "values"][row, :top_n]
+
+    return [
+        {"feature": feature_names[j], "contribution": float(v)}
+        for j, v in zip(indices, values)
+    ]
+
+
+def lookup_explanation(
+    store: dict,
+    customer_id,
+    feature_names,
+    top_n: int = 5,
+    grouped: bool = False
+) -> pd.DataFrame:
+    """
+    Stored explanation in the explain_customer output shape.
+
+    Raises
+    ------
+    ValueError
+        If the customer is not in the dataset.
+    """
+    row = store["row_by_customer"].get(str(customer_id))
+    if row is None:
+        raise ValueError(f"Customer {customer_id} not found")
+
+    top = stored_contributors(store, row, feature_names, top_n, grouped)
+
+    return pd.DataFrame({
+        "customer_id": customer_id,
+        "feature": [c["feature"] for c in top],
+        "contributions": [c["contribution"] for c in top]
+    })
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from ml.preprocessing_refined import InteractionFeatureGenerator
+
+
+def build_encoding_spec(preprocessing_pipeline) -> dict:
+    """
+    Extract per-column encoding constants from a fitted churn
+    preprocessing pipeline (feature_engineering -> preprocessor).
+
+    Lets callers encode individual columns straight into the model's
+    feature matrix without running the ColumnTransformer.
+
+    Returns
+    -------
+    dict
+        numeric:     {feature: (output_col, fill, mean, scale)}
+        categorical: {feature: (block_start, block_len, fill, {level: offset})}
+        n_features:  width of the encoded matrix
+    """
+    column_transformer = preprocessing_pipeline.named_steps["preprocessor"]
+    output_indices = column_transformer.output_indices_
+
+    spec = {
+        "numeric": {},
+        "categorical": {},
+        "n_features": sum(
+            s.stop - s.start for s in output_indices.values()
+        )
+    }
+
+    for name, pipeline, columns in column_transformer.transformers_:
+        if name == "remainder":
+            continue
+
+        start = output_indices[name].start
+        imputer = pipeline.named_steps["imputer"]
+
+        if name == "num":
+            scaler = pipeline.named_steps["scaler"]
+            for i, col in enumerate(columns):
+                spec["numeric"][col] = (
+                    start + i,
+                    float(imputer.statistics_[i]),
+                    float(scaler.mean_[i]) if scaler.mean_ is not None else 0.0,
+                    float(scaler.scale_[i]) if scaler.scale_ is not None else 1.0
+                )
+
+        elif name == "cat":
+            encoder = pipeline.named_steps["encoder"]
+            offset = start
+            for i, col in enumerate(columns):
+                categories = encoder.categories_[i]
+                spec["categorical"][col] = (
+                    offset,
+                    len(categories),
+                    imputer.statistics_[i],
+                    {level: j for j, level in enumerate(categories)}
+                )
+                offset += len(categories)
+
+    return spec
+
+
+def affected_features(overridden: set) -> set:
+    """
+    Model input columns that change when the given raw columns change,
+    including engineered features that depend on them.
+    """
+    affected = set(overridden)
+    for feature, inputs in InteractionFeatureGenerator.RATIO_FEATURES.items():
+        if affected.intersection(inputs):
+            affected.add(feature)
+    return affected
+
+
+def encode_columns(spec: dict, frame: pd.DataFrame, X: np.ndarray, features) -> np.ndarray:
+    """
+    Re-encode only `features` of `frame` into the matching columns of X
+    (in place). `frame` must already contain engineered features.
+    """
+    for col in features:
+        if col in spec["numeric"]:
+            out, fill, mean, scale = spec["numeric"][col]
+            values = pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype=np.float64)
+            values = np.where(np.isnan(values), fill, values)
+            X[:, out] = (values - mean) / scale
+
+        elif col in spec["categorical"]:
+            start, width, fill, lookup = spec["categorical"][col]
+            positions = frame[col].fillna(fill).map(lookup).to_numpy(dtype=np.float64)
+
+            # Unknown levels stay all-zero (handle_unknown="ignore")
+            known = ~np.isnan(positions)
+            X[:, start:start + width] = 0.0
+            X[np.flatnonzero(known), start + positions[known].astype(np.intp)] = 1.0
+
+    return X
+
+
+def _as_float(value) -> float:
+    if value is None:
+        return np.nan
+    return float(value)
+
+
+def encode_record(spec: dict, record: dict, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Encode one raw record straight into a (1, n_features) float32 row,
+    without building a DataFrame.
+
+    Arithmetic runs in float64 and is stored as float32, the same rounding
+    the forest applies to the pipeline's float64 output.
+
+    Raises
+    ------
+    ValueError
+        If a numeric field cannot be converted to float, or a categorical
+        value is not hashable.
+    """
+    if out is None:
+        out = np.zeros((1, spec["n_features"]), dtype=np.float32)
+    else:
+        out[:] = 0.0
+
+    values = {}
+    for col in spec["numeric"]:
+        if col in InteractionFeatureGenerator.RATIO_FEATURES:
+            continue
+        try:
+            values[col] = _as_float(record.get(col))
+        except (TypeError, ValueError):
+            raise ValueError(f"{col} must be numeric")
+
+    for feature, (numerator, denominator) in InteractionFeatureGenerator.RATIO_FEATURES.items():
+        den = values.get(denominator, np.nan)
+        values[feature] = (
+            values.get(numerator, np.nan) / den
+            if den != 0 and not np.isnan(den)
+            else np.nan
+        )
+
+    for col, (position, fill, mean, scale) in spec["numeric"].items():
+        value = values[col]
+        if np.isnan(value):
+            value = fill
+        out[0, position] = (value - mean) / scale
+
+    for col, (start, width, fill, lookup) in spec["categorical"].items():
+        value = record.get(col)
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            value = fill
+        try:
+            j = lookup.get(value)
+        except TypeError:
+            raise ValueError(f"{col} must be a string")
+        if j is not None:
+            out[0, start + j] = 1.0
+
+    return out
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+def compile_forest(forest) -> dict:
+    """
+    Flatten a fitted RandomForestClassifier into concatenated node arrays
+    so every tree can be traversed at once with NumPy.
+
+    Leaves point to themselves, so a fixed number of steps (the deepest
+    tree's depth) lands every (row, tree) pair on its leaf.
+
+    Returns
+    -------
+    dict
+        roots, feature, threshold, left, right, value (positive-class
+        probability per node), max_depth
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes)
+
+        is_leaf = tree.children_left == -1
+
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+        class_weights = tree.value[:, 0, :]
+        positive = class_weights[:, 1] / class_weights.sum(axis=1)
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        lefts.append(left)
+        rights.append(right)
+        values.append(positive)
+        roots.append(offset)
+
+        offset += n_nodes
+
+    return {
+        "roots": np.array(roots, dtype=np.intp),
+        "feature": np.concatenate(features).astype(np.intp),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts).astype(np.intp),
+        "right": np.concatenate(rights).astype(np.intp),
+        "value": np.concatenate(values),
+        "max_depth": max(e.tree_.max_depth for e in forest.estimators_)
+    }
+
+
+def predict_positive(compiled: dict, X: np.ndarray) -> np.ndarray:
+    """
+    Positive-class probability for each row of an encoded matrix.
+
+    Intended for small batches (single records); large matrices are
+    cheaper through the classifier's own predict_proba.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    n_rows = X.shape[0]
+
+    nodes = np.broadcast_to(compiled["roots"], (n_rows, compiled["roots"].size))
+    row_idx = np.arange(n_rows)[:, None]
+
+    for _ in range(compiled["max_depth"]):
+        go_left = X[row_idx, compiled["feature"][nodes]] <= compiled["threshold"][nodes]
+        nodes = np.where(go_left, compiled["left"][nodes], compiled["right"][nodes])
+
+    return compiled["value"][nodes].mean(axis=1)
@@ -0,0 +1,63 @@
+import numpy as np
+import scipy.sparse as sp
+
+from ml.id_cache import id_cache
+
+
+def build_feature_groups(column_transformer) -> dict:
+    """
+    Map encoded columns back to the raw features they came from.
+
+    Numeric columns map 1:1; each one-hot block maps to its source
+    categorical.
+
+    Returns
+    -------
+    dict
+        names:  raw feature per group, in encoded-column order
+        index:  (n_encoded,) group of each encoded column
+        matrix: (n_encoded, n_groups) sparse 0/1 indicator, so that
+                contributions @ matrix sums them per raw feature
+    """
+    output_indices = column_transformer.output_indices_
+    names = []
+    index = []
+
+    for name, pipeline, columns in column_transformer.transformers_:
+        if name == "remainder" or output_indices[name].stop == output_indices[name].start:
+            continue
+
+        if name == "cat":
+            widths = [len(c) for c in pipeline.named_steps["encoder"].categories_]
+        else:
+            widths = [1] * len(columns)
+
+        for col, width in zip(columns, widths):
+            index.extend([len(names)] * width)
+            names.append(col)
+
+    index = np.asarray(index, dtype=np.intp)
+    matrix = sp.csr_matrix(
+        (np.ones(index.size), (np.arange(index.size), index)),
+        shape=(index.size, len(names))
+    )
+
+    return {
+        "names": np.asarray(names, dtype=object),
+        "index": index,
+        "matrix": matrix
+    }
+
+
+# -------------------------
+# Feature group cache (one per fitted ColumnTransformer)
+# -------------------------
+get_feature_groups, release_feature_groups = id_cache(build_feature_groups)
+
+
+def group_contributions(contributions: np.ndarray, groups: dict) -> np.ndarray:
+    """
+    (n_rows, n_encoded) contributions -> (n_rows, n_groups), summed per
+    raw feature with one sparse product. Additivity is preserved.
+    """
+    return np.asarray(np.asarray(contributions) @ groups["matrix"])
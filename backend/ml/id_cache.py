@@ -0,0 +1,29 @@
+def id_cache(builder):
+    """
+    Cache builder(obj) per object (by id), for results derived from a
+    fitted estimator.
+
+    Returns
+    -------
+    tuple
+        (get, release): get(obj) builds on first use and returns the
+        cached result; release(obj) drops it, e.g. once a model version
+        is retired.
+    """
+    cache = {}
+
+    def get(obj):
+        key = id(obj)
+        cached = cache.get(key)
+
+        # The object is kept alongside its result so the id stays valid
+        if cached is None or cached[0] is not obj:
+            cached = (obj, builder(obj))
+            cache[key] = cached
+
+        return cached[1]
+
+    def release(obj):
+        cache.pop(id(obj), None)
+
+    return get, release
@@ -0,0 +1,98 @@
+import pandas as pd
+
+# -------------------------
+# Categoricals materialized in the cube
+# -------------------------
+CUBE_CATEGORICALS = [
+    "contract_type",
+    "region",
+    "payment_method"
+]
+
+
+def _group_stats(frame: pd.DataFrame, key: str) -> dict:
+    grouped = frame.groupby(key, sort=True).agg(
+        count=("churn_label", "size"),
+        churn_count=("churn_label", "sum"),
+        mean_probability=("churn_probability", "mean")
+    )
+
+    return {
+        # numpy scalars -> plain Python so the cube stays JSON-friendly
+        (level.item() if hasattr(level, "item") else level): {
+            "count": int(row["count"]),
+            "churn_count": int(row["churn_count"]),
+            "churn_rate": float(row["churn_count"] / row["count"]),
+            "mean_probability": float(row["mean_probability"])
+        }
+        for level, row in grouped.iterrows()
+    }
+
+
+def build_insight_cube(
+    df: pd.DataFrame,
+    churn_df: pd.DataFrame,
+    segments_df: pd.DataFrame,
+    global_explain_df: pd.DataFrame | None = None,
+    global_grouped_df: pd.DataFrame | None = None
+) -> dict:
+    """
+    Materialize the aggregates the chatbot needs for one scored dataset.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw input dataframe (row-aligned with the prediction frames)
+    churn_df : pd.DataFrame
+        Output of predict_churn
+    segments_df : pd.DataFrame
+        Output of predict_segments
+    global_explain_df : pd.DataFrame, optional
+        feature, mean_abs_shap ranking
+    global_grouped_df : pd.DataFrame, optional
+        The same ranking over raw business features (ml.feature_groups)
+
+    Returns
+    -------
+    dict
+        Plain-Python aggregates; answering from it never touches a model.
+    """
+
+    # -------------------------
+    # Align scores with raw categoricals
+    # -------------------------
+    frame = pd.DataFrame({
+        "churn_probability": churn_df["churn_probability"].to_numpy(),
+        "churn_label": churn_df["churn_label"].to_numpy(),
+        "segment_label": segments_df["segment_label"].to_numpy()
+    })
+
+    for col in CUBE_CATEGORICALS:
+        if col in df.columns:
+            frame[col] = df[col].to_numpy()
+
+    # -------------------------
+    # Global drivers
+    # -------------------------
+    def ranked(explain_df):
+        if explain_df is None:
+            return []
+        return (
+            explain_df
+            .sort_values("mean_abs_shap", ascending=False)
+            .to_dict(orient="records")
+        )
+
+    return {
+        "total_customers": int(len(frame)),
+        "high_risk_count": int(frame["churn_label"].sum()),
+        "mean_probability": float(frame["churn_probability"].mean()) if len(frame) else 0.0,
+        "segments": _group_stats(frame, "segment_label"),
+        "by_category": {
+            col: _group_stats(frame, col)
+            for col in CUBE_CATEGORICALS
+            if col in frame.columns
+        },
+        "global_drivers": ranked(global_explain_df),
+        "global_drivers_grouped": ranked(global_grouped_df)
+    }
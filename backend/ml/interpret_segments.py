@@ -16,41 +16,57 @@ MODEL_PATH = os.path.join(
     BASE_DIR, "..", "ml_models", "segmentation_model.pkl"
 )
 
-# -------------------------
-# Load data and model
-# -------------------------
-df = pd.read_csv(DATA_PATH)
-artifact = joblib.load(MODEL_PATH)
 
-pipeline = artifact["pipeline"]
+def summarize_segments(df: pd.DataFrame, segment_labels) -> dict:
+    """
+    Per-segment numeric averages and dominant categorical traits.
 
-# -------------------------
-# Predict segments
-# -------------------------
-df["segment_label"] = pipeline.predict(df)
+    Returns
+    -------
+    dict
+        numeric_means (DataFrame indexed by segment_label) and
+        dominant_categories: segment -> column -> (value, share)
+    """
+    df = df.assign(segment_label=segment_labels)
 
-# -------------------------
-# Numerical feature summary
-# -------------------------
-numeric_summary = (
-    df.groupby("segment_label")[NUMERIC_FEATURES]
-      .mean()
-      .round(2)
-)
+    # -------------------------
+    # Numerical feature summary
+    # -------------------------
+    numeric_means = (
+        df.groupby("segment_label")[NUMERIC_FEATURES]
+          .mean()
+          .round(2)
+    )
 
-print("\n=== Numeric Feature Averages by Segment ===")
-print(numeric_summary)
+    # -------------------------
+    # Categorical feature summary
+    # -------------------------
+    dominant = {}
+    for seg, seg_df in df.groupby("segment_label"):
+        dominant[seg] = {}
+        for col in CATEGORICAL_FEATURES:
+            shares = seg_df[col].value_counts(normalize=True)
+            dominant[seg][col] = (shares.idxmax(), float(shares.max()))
 
-# -------------------------
-# Categorical feature summary
-# -------------------------
-print("\n=== Dominant Categorical Traits by Segment ===")
+    return {"numeric_means": numeric_means, "dominant_categories": dominant}
+
+
+def main():
+    df = pd.read_csv(DATA_PATH)
+    artifact = joblib.load(MODEL_PATH)
+
+    summary = summarize_segments(df, artifact["pipeline"].predict(df))
+
+    print("\n=== Numeric Feature Averages by Segment ===")
+    print(summary["numeric_means"])
+
+    print("\n=== Dominant Categorical Traits by Segment ===")
+
+    for seg, traits in summary["dominant_categories"].items():
+        print(f"\nSegment {seg}")
+        for col, (top_val, pct) in traits.items():
+            print(f"  {col}: {top_val} ({pct:.0%})")
 
-for seg in sorted(df["segment_label"].unique()):
-    print(f"\nSegment {seg}")
-    seg_df = df[df["segment_label"] == seg]
 
-    for col in CATEGORICAL_FEATURES:
-        top_val = seg_df[col].value_counts(normalize=True).idxmax()
-        pct = seg_df[col].value_counts(normalize=True).max()
-        print(f"  {col}: {top_val} ({pct:.0%})")
+if __name__ == "__main__":
+    main()
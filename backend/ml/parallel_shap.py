@@ -0,0 +1,259 @@
+import math
+from concurrent.futures import Future, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from ml.explainability import get_tree_explainer, positive_class_shap
+
+# Upper bound on rows per task: bounds per-task SHAP output memory
+MAX_CHUNK_ROWS = 1024
+
+# Tasks per worker, so a slow chunk does not leave other cores idle
+CHUNKS_PER_WORKER = 4
+
+# -------------------------
+# Worker side
+# -------------------------
+# Classifier explained by shap_chunk in this process; its TreeExplainer is
+# built on first use and cached (see get_tree_explainer)
+_WORKER = {"classifier": None}
+
+
+def init_shap_worker(classifier):
+    """
+    Register the classifier shap_chunk explains in this process.
+    Use as a pool initializer, or call once in-process.
+    """
+    _WORKER["classifier"] = classifier
+
+
+def _attach(source):
+    # An ndarray when run in-process, else a shared memory descriptor
+    if isinstance(source, np.ndarray):
+        return source, None
+
+    name, shape, dtype = source
+    shm = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf), shm
+
+
+def top_by_magnitude(values: np.ndarray, top_n: int):
+    """
+    Per row, the top_n entries by |value| (descending) as
+    (uint16 column indices, float32 values).
+    """
+    top_n = min(top_n, values.shape[1])
+    idx = np.argpartition(-np.abs(values), top_n - 1, axis=1)[:, :top_n]
+    picked = np.take_along_axis(values, idx, axis=1)
+
+    order = np.argsort(-np.abs(picked), axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    picked = np.take_along_axis(picked, order, axis=1)
+
+    return idx.astype(np.uint16), picked.astype(np.float32)
+
+
+def shap_chunk(
+    source,
+    start: int,
+    stop: int,
+    keep_rows: bool = False,
+    top_n: int = 0,
+    group_matrix=None,
+    classifier=None
+):
+    """
+    Positive-class SHAP values for rows [start, stop) of the shared matrix,
+    for the given classifier or else the one init_shap_worker registered.
+
+    Returns
+    -------
+    tuple
+        (start, stop, sum of |SHAP| per feature, per-row values or None,
+        per-row top_n (indices, values) or None, grouped reductions or None)
+
+        Grouped reductions (with group_matrix) are the same sum and top_n
+        computed on contributions summed per raw feature.
+    """
+    X, shm = _attach(source)
+    try:
+        if classifier is None:
+            classifier = _WORKER["classifier"]
+        explainer = get_tree_explainer(classifier)
+        values = positive_class_shap(explainer.shap_values(X[start:stop]))
+    finally:
+        # The view must be dropped before the segment can be closed
+        del X
+        if shm is not None:
+            shm.close()
+
+    grouped = None
+    if group_matrix is not None:
+        grouped_values = np.asarray(values @ group_matrix)
+        grouped = (
+            np.abs(grouped_values).sum(axis=0),
+            top_by_magnitude(grouped_values, top_n) if top_n else None
+        )
+
+    return (
+        start,
+        stop,
+        np.abs(values).sum(axis=0),
+        values if keep_rows else None,
+        top_by_magnitude(values, top_n) if top_n else None,
+        grouped
+    )
+
+
+def _run_inline(fn, *args) -> Future:
+    future = Future()
+    future.set_result(fn(*args))
+    return future
+
+# -------------------------
+# Driver side
+# -------------------------
+def chunked_shap(
+    X: np.ndarray,
+    submit=None,
+    n_workers: int = 1,
+    chunk_rows: int | None = None,
+    keep_rows: bool = False,
+    top_n: int = 0,
+    group_matrix=None,
+    classifier=None
+) -> dict:
+    """
+    Full-dataset SHAP, split into row chunks and reduced as chunks finish.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        Processed feature matrix (dense)
+    submit : callable, optional
+        fn(*args) -> Future, e.g. ProcessPoolExecutor.submit. Its workers
+        must have run init_shap_worker for the classifier to explain.
+        None runs the chunks in this process.
+    n_workers : int
+        Used to size chunks when chunk_rows is not given
+    chunk_rows : int, optional
+        Rows per task
+    keep_rows : bool
+        Also return the (n_rows, n_features) SHAP matrix
+    top_n : int
+        Also return each row's top_n contributors by |SHAP|, reduced
+        inside the workers (see top_by_magnitude)
+    group_matrix : scipy.sparse matrix, optional
+        (n_features, n_groups) indicator from ml.feature_groups; adds the
+        same reductions over contributions summed per raw feature
+    classifier : optional
+        Classifier to explain when running in this process; defaults to
+        the one registered with init_shap_worker
+
+    Returns
+    -------
+    dict
+        sum_abs, mean_abs (per feature), n_rows, values (or None),
+        top_indices / top_values (or None), and with group_matrix
+        grouped_mean_abs, grouped_top_indices / grouped_top_values
+    """
+    X = np.ascontiguousarray(X)
+    n_rows, n_features = X.shape
+
+    if chunk_rows is None:
+        chunk_rows = math.ceil(n_rows / max(1, n_workers * CHUNKS_PER_WORKER))
+    chunk_rows = int(min(max(1, chunk_rows), MAX_CHUNK_ROWS))
+
+    sum_abs = np.zeros(n_features, dtype=np.float64)
+    values = np.empty((n_rows, n_features), dtype=np.float64) if keep_rows else None
+
+    def top_buffers(n_columns):
+        if not top_n:
+            return None, None
+        width = min(top_n, n_columns)
+        return (
+            np.empty((n_rows, width), dtype=np.uint16),
+            np.empty((n_rows, width), dtype=np.float32)
+        )
+
+    top_indices, top_values = top_buffers(n_features)
+
+    grouped_sum_abs = None
+    grouped_top_indices = grouped_top_values = None
+    if group_matrix is not None:
+        grouped_sum_abs = np.zeros(group_matrix.shape[1], dtype=np.float64)
+        grouped_top_indices, grouped_top_values = top_buffers(group_matrix.shape[1])
+
+    shm = None
+    if submit is None:
+        submit, source = (lambda fn, *args: _run_inline(fn, *args, classifier)), X
+    else:
+        # One copy into shared memory; workers map it instead of unpickling
+        shm = shared_memory.SharedMemory(create=True, size=max(1, X.nbytes))
+        np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)[:] = X
+        source = (shm.name, X.shape, X.dtype.str)
+
+    futures = set()
+    try:
+        futures = {
+            submit(
+                shap_chunk, source, start, min(start + chunk_rows, n_rows),
+                keep_rows, top_n, group_matrix
+            )
+            for start in range(0, n_rows, chunk_rows)
+        }
+
+        # Fold chunks in as they finish and drop them, so per-row SHAP
+        # output is never held for more than the chunks still in flight
+        for future in as_completed(futures):
+            futures.discard(future)
+            start, stop, chunk_sum, chunk_values, chunk_top, chunk_grouped = future.result()
+            sum_abs += chunk_sum
+            if keep_rows:
+                values[start:stop] = chunk_values
+            if top_n:
+                top_indices[start:stop], top_values[start:stop] = chunk_top
+            if group_matrix is not None:
+                grouped_sum_abs += chunk_grouped[0]
+                if top_n:
+                    (
+                        grouped_top_indices[start:stop],
+                        grouped_top_values[start:stop]
+                    ) = chunk_grouped[1]
+    finally:
+        # On failure, chunks not yet started are dropped
+        for future in futures:
+            future.cancel()
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    def mean(total):
+        if total is None or not n_rows:
+            return total
+        return total / n_rows
+
+    return {
+        "sum_abs": sum_abs,
+        "mean_abs": mean(sum_abs),
+        "n_rows": n_rows,
+        "values": values,
+        "top_indices": top_indices,
+        "top_values": top_values,
+        "grouped_mean_abs": mean(grouped_sum_abs),
+        "grouped_top_indices": grouped_top_indices,
+        "grouped_top_values": grouped_top_values
+    }
+
+
+def global_importance_frame(feature_names, mean_abs_shap) -> pd.DataFrame:
+    return (
+        pd.DataFrame({
+            "feature": feature_names,
+            "mean_abs_shap": mean_abs_shap
+        })
+        .sort_values("mean_abs_shap", ascending=False)
+        .reset_index(drop=True)
+    )
@@ -0,0 +1,593 @@
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import inspect
+import argparse
+import textwrap
+import functools
+import importlib
+import importlib.util
+import importlib.metadata
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+import joblib
+
+from ml.train_baseline import split_dataset, SPLIT_PARAMS
+from ml.train_segmentation import N_CLUSTERS
+
+# -------------------------
+# Paths
+# -------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DATA_PATH = os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn_v2.csv")
+BASELINE_DATA_PATH = os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn.csv")
+
+# Local modules (hashed into stage keys) live under here
+SOURCE_DIR = os.path.dirname(BASE_DIR)
+
+MODEL_DIR = os.path.join(BASE_DIR, "..", "ml_models")
+CACHE_DIR = os.path.join(MODEL_DIR, ".pipeline_cache")
+
+# Installed libraries whose versions are part of every stage key
+LIBRARIES = ("numpy", "pandas", "scipy", "scikit-learn", "joblib", "shap")
+
+# Intermediate stages are spread over this many processes
+N_WORKERS = int(os.environ.get("PIPELINE_WORKERS", os.cpu_count() or 1))
+
+
+# -------------------------
+# Stage definition
+# -------------------------
+class Stage:
+    """
+    One step of the training / evaluation refresh.
+
+    Parameters
+    ----------
+    name : str
+    fn : callable
+        fn(inputs) -> value; inputs maps each dependency argument name to
+        its stage's value, and also holds files and params
+    deps : dict
+        argument name -> upstream stage name
+    files : dict
+        argument name -> input file path (hashed by content)
+    params : dict
+        JSON-serializable settings (part of the cache key)
+    modules : tuple
+        Extra modules whose source the result depends on; those the
+        function imports or references are found automatically
+    outputs : dict
+        name -> path relative to the output dir, written by export
+    export : callable, optional
+        export(value, paths) writes the outputs
+    report : bool
+        The value is a dict of metrics, printed after the run
+    """
+
+    def __init__(self, name, fn, deps=None, files=None, params=None,
+                 modules=(), outputs=None, export=None, report=False):
+        self.name = name
+        self.fn = fn
+        self.deps = deps or {}
+        self.files = files or {}
+        self.params = params or {}
+        self.modules = modules
+        self.outputs = outputs or {}
+        self.export = export
+        self.report = report
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _is_local(module_name: str) -> bool:
+    # Modules of this backend (ml.*, ...), as opposed to installed libraries
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return False
+    if spec is None or not spec.has_location:
+        return False
+    return os.path.abspath(spec.origin).startswith(SOURCE_DIR + os.sep)
+
+
+def _imported_modules(source: str) -> set:
+    names = set()
+    for node in ast.walk(ast.parse(textwrap.dedent(source))):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module)
+            # "from ml import x" may name a submodule
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return {name for name in names if _is_local(name)}
+
+
+@functools.lru_cache(maxsize=None)
+def _module_source(module_name: str) -> str:
+    return inspect.getsource(importlib.import_module(module_name))
+
+
+def code_dependencies(stage: Stage) -> list:
+    """
+    Every local module a stage's result depends on: those its function
+    imports or references, those they import, and so on.
+    """
+    pending = set(stage.modules) | _imported_modules(inspect.getsource(stage.fn))
+    for value in inspect.getclosurevars(stage.fn).globals.values():
+        module = getattr(value, "__module__", None) or getattr(value, "__name__", None)
+        if module and module != __name__ and _is_local(module):
+            pending.add(module)
+
+    seen = set()
+    while pending:
+        module = pending.pop()
+        if module in seen:
+            continue
+        seen.add(module)
+        pending |= _imported_modules(_module_source(module)) - seen
+    return sorted(seen)
+
+
+@functools.lru_cache(maxsize=None)
+def library_versions() -> dict:
+    versions = {}
+    for library in LIBRARIES:
+        try:
+            versions[library] = importlib.metadata.version(library)
+        except importlib.metadata.PackageNotFoundError:
+            versions[library] = None
+    return versions
+
+
+def stage_key(stage: Stage, dep_keys: dict) -> str:
+    """
+    Content address of a stage's result: its code and every local module
+    it depends on, library versions, params, input file contents and the
+    keys of its dependencies. Unchanged inputs always map to the same key.
+    """
+    code = [inspect.getsource(stage.fn)]
+    for module in code_dependencies(stage):
+        code.append(f"# {module}\n{_module_source(module)}")
+
+    description = {
+        "stage": stage.name,
+        "code": _sha256("\n".join(code).encode()),
+        "libraries": library_versions(),
+        "params": stage.params,
+        "files": {arg: file_hash(path) for arg, path in sorted(stage.files.items())},
+        "deps": {arg: dep_keys[dep] for arg, dep in sorted(stage.deps.items())}
+    }
+    return _sha256(json.dumps(description, sort_keys=True).encode())[:20]
+
+# -------------------------
+# Stages
+# -------------------------
+# Thin wrappers: the training / evaluation logic lives in the standalone
+# scripts (ml/train_*.py, ml/evaluate_*.py, ...), which stay runnable
+def read_dataset(inputs):
+    return pd.read_csv(inputs["csv"])
+
+
+def split_data(inputs):
+    return split_dataset(inputs["data"], inputs["split"])
+
+
+def train_baseline(inputs):
+    from ml.train_baseline import train_model
+
+    split = inputs["split"]
+    return train_model(split["X_train"], split["y_train"])
+
+
+def evaluate_baseline(inputs):
+    from ml.evaluate_baseline import baseline_metrics
+
+    split = inputs["split"]
+    return baseline_metrics(inputs["model"], split["X_val"], split["y_val"])
+
+
+def train_refined(inputs):
+    from ml.train_refined import train_model, build_reference_sketch
+
+    split = inputs["split"]
+    return {
+        # Stages already run in parallel workers: one core per fit
+        "model": train_model(split["X_train"], split["y_train"], n_jobs=1),
+        "reference_sketch": build_reference_sketch(split["X_train"]).to_dict()
+    }
+
+
+def export_refined(value, paths):
+    joblib.dump(value["model"], paths["model"])
+    with open(paths["reference_sketch"], "w") as f:
+        json.dump(value["reference_sketch"], f)
+
+
+def evaluate_final(inputs):
+    from ml.evaluate_final import holdout_metrics
+
+    split = inputs["split"]
+    return holdout_metrics(inputs["refined"]["model"], split["X_val"], split["y_val"])
+
+
+def transform_features(inputs):
+    preprocessing = inputs["refined"]["model"].named_steps["preprocessing"]
+    X = inputs["data"].drop(columns=["churn", "customer_id"])
+
+    return {
+        "X": preprocessing.transform(X),
+        "feature_names": preprocessing.named_steps["preprocessor"].get_feature_names_out()
+    }
+
+
+def global_shap(inputs):
+    from ml.explain_global import global_shap as compute_global_shap
+
+    features = inputs["features"]
+    # Already running in a pipeline worker: the chunks run in-process
+    return compute_global_shap(
+        features["X"],
+        features["feature_names"],
+        classifier=inputs["refined"]["model"].named_steps["classifier"]
+    )
+
+
+def export_global_shap(value, paths):
+    value["importance"].to_csv(paths["importance"], index=False)
+
+
+def train_segmentation(inputs):
+    from ml.train_segmentation import train_segmentation as fit_segmentation
+
+    return fit_segmentation(inputs["data"], inputs["n_clusters"])
+
+
+def export_segmentation(value, paths):
+    joblib.dump(value["artifact"], paths["model"])
+    value["segments"].to_csv(paths["segments"], index=False)
+
+
+def interpret_segments(inputs):
+    from ml.interpret_segments import summarize_segments
+
+    # Labels come from the training stage; nothing is re-predicted
+    summary = summarize_segments(
+        inputs["data"],
+        inputs["segmentation"]["segments"]["segment_label"].to_numpy()
+    )
+
+    return {
+        "silhouette": inputs["segmentation"]["silhouette"],
+        "numeric_means": {
+            str(segment): row.to_dict()
+            for segment, row in summary["numeric_means"].iterrows()
+        },
+        "dominant_categories": {
+            str(segment): {
+                col: {"value": str(value), "share": round(share, 3)}
+                for col, (value, share) in traits.items()
+            }
+            for segment, traits in summary["dominant_categories"].items()
+        }
+    }
+
+
+STAGES = [
+    Stage("data", read_dataset, files={"csv": DATA_PATH}),
+    Stage("baseline_data", read_dataset, files={"csv": BASELINE_DATA_PATH}),
+    Stage(
+        "split", split_data,
+        deps={"data": "data"}, params={"split": SPLIT_PARAMS}
+    ),
+    Stage(
+        "baseline_split", split_data,
+        deps={"data": "baseline_data"}, params={"split": SPLIT_PARAMS}
+    ),
+    Stage(
+        "train_baseline", train_baseline,
+        deps={"split": "baseline_split"},
+        outputs={"model": "baseline_churn_model.pkl"},
+        export=lambda value, paths: joblib.dump(value, paths["model"])
+    ),
+    Stage(
+        "evaluate_baseline", evaluate_baseline,
+        deps={"model": "train_baseline", "split": "baseline_split"},
+        report=True
+    ),
+    Stage(
+        "train_refined", train_refined,
+        deps={"split": "split"},
+        outputs={
+            "model": "final_churn_model.pkl",
+            "reference_sketch": "reference_sketch.json"
+        },
+        export=export_refined
+    ),
+    Stage(
+        "evaluate_final", evaluate_final,
+        deps={"refined": "train_refined", "split": "split"},
+        report=True
+    ),
+    Stage(
+        "features", transform_features,
+        deps={"refined": "train_refined", "data": "data"}
+    ),
+    Stage(
+        "global_shap", global_shap,
+        deps={"refined": "train_refined", "features": "features"},
+        outputs={"importance": os.path.join("explainability", "global_feature_importance.csv")},
+        export=export_global_shap
+    ),
+    Stage(
+        "train_segmentation", train_segmentation,
+        deps={"data": "data"},
+        params={"n_clusters": N_CLUSTERS},
+        outputs={"model": "segmentation_model.pkl", "segments": "customer_segments.csv"},
+        export=export_segmentation
+    ),
+    Stage(
+        "interpret_segments", interpret_segments,
+        deps={"segmentation": "train_segmentation", "data": "data"},
+        report=True
+    )
+]
+
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+# -------------------------
+# Cache
+# -------------------------
+def cache_path(cache_dir, name, key) -> str:
+    return os.path.join(cache_dir, f"{name}-{key}.joblib")
+
+
+def _dump_atomic(value, path):
+    # Readers never see a partially written artifact
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(value, tmp)
+    os.replace(tmp, path)
+
+
+def output_paths(stage, output_dir) -> dict:
+    return {
+        name: os.path.join(output_dir, relative)
+        for name, relative in stage.outputs.items()
+    }
+
+
+def export_stage(stage, value, output_dir):
+    paths = output_paths(stage, output_dir)
+    for path in paths.values():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    stage.export(value, paths)
+    return {path: file_hash(path) for path in paths.values()}
+
+
+def run_stage(name, key, dep_keys, cache_dir, output_dir):
+    """
+    Worker entry point: load inputs from the cache, run, store the result
+    (and write the stage's outputs while it is still in memory).
+    """
+    stage = STAGES_BY_NAME[name]
+
+    inputs = {**stage.files, **stage.params}
+    for arg, dep in stage.deps.items():
+        inputs[arg] = joblib.load(cache_path(cache_dir, dep, dep_keys[dep]))
+
+    start = time.perf_counter()
+    value = stage.fn(inputs)
+    seconds = time.perf_counter() - start
+
+    _dump_atomic(value, cache_path(cache_dir, name, key))
+
+    exported = export_stage(stage, value, output_dir) if stage.export else {}
+    return name, seconds, exported
+
+# -------------------------
+# Runner
+# -------------------------
+def select_stages(targets=None) -> list:
+    """
+    The targets plus everything upstream, in declaration (topological) order.
+    """
+    if not targets:
+        return list(STAGES)
+
+    unknown = set(targets) - set(STAGES_BY_NAME)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+
+    needed = set()
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(STAGES_BY_NAME[name].deps.values())
+
+    return [stage for stage in STAGES if stage.name in needed]
+
+
+def run_pipeline(targets=None, force=(), n_workers=N_WORKERS,
+                 output_dir=MODEL_DIR, cache_dir=CACHE_DIR, dry_run=False) -> dict:
+    """
+    Run the selected stages, skipping any whose key is already cached.
+
+    Stages whose dependencies are satisfied run concurrently in a process
+    pool; values travel between stages through the cache. Outputs of
+    cached stages are rewritten only if missing or changed on disk.
+
+    Returns
+    -------
+    dict
+        stage -> {key, status (cached / ran / planned), seconds},
+        and reports for report stages
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    stages = select_stages(targets)
+
+    keys = {}
+    for stage in stages:
+        keys[stage.name] = stage_key(stage, keys)
+
+    def needs_run(stage):
+        return stage.name in force or not os.path.exists(
+            cache_path(cache_dir, stage.name, keys[stage.name])
+        )
+
+    # Recomputed results flow downstream; a cached stage's value is only
+    # loaded when a dependent has to run
+    to_run = set()
+    for stage in stages:
+        if needs_run(stage) or any(dep in to_run for dep in stage.deps.values()):
+            to_run.add(stage.name)
+    summary = {
+        stage.name: {
+            "key": keys[stage.name],
+            "status": ("planned" if dry_run else "ran") if stage.name in to_run else "cached",
+            "seconds": 0.0
+        }
+        for stage in stages
+    }
+    if dry_run:
+        return {"stages": summary, "reports": {}}
+
+    # Which output files this cache last wrote (and their hashes)
+    manifest_path = os.path.join(cache_dir, "exports.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(
+        max_workers=max(1, n_workers),
+        mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        done = {stage.name for stage in stages} - to_run
+        running = {}
+
+        while len(done) < len(stages):
+            for stage in stages:
+                ready = (
+                    stage.name in to_run
+                    and stage.name not in done
+                    and stage.name not in running.values()
+                    and all(dep in done for dep in stage.deps.values())
+                )
+                if ready:
+                    future = pool.submit(
+                        run_stage, stage.name, keys[stage.name],
+                        {dep: keys[dep] for dep in stage.deps.values()},
+                        cache_dir, output_dir
+                    )
+                    running[future] = stage.name
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                running.pop(future)
+                name, seconds, exported = future.result()
+                summary[name]["seconds"] = round(seconds, 3)
+                for path, digest in exported.items():
+                    manifest[path] = {"key": keys[name], "sha256": digest}
+                done.add(name)
+                print(f"  {name:<20} ran in {seconds:.2f}s", flush=True)
+
+    # Cached stages: restore outputs that are missing or were overwritten
+    for stage in stages:
+        if stage.export is None or stage.name in to_run:
+            continue
+
+        stale = any(
+            not os.path.exists(path)
+            or manifest.get(path, {}).get("key") != keys[stage.name]
+            or manifest[path]["sha256"] != file_hash(path)
+            for path in output_paths(stage, output_dir).values()
+        )
+        if stale:
+            value = joblib.load(cache_path(cache_dir, stage.name, keys[stage.name]))
+            for path, digest in export_stage(stage, value, output_dir).items():
+                manifest[path] = {"key": keys[stage.name], "sha256": digest}
+            summary[stage.name]["status"] = "cached (outputs restored)"
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    reports = {
+        stage.name: joblib.load(cache_path(cache_dir, stage.name, keys[stage.name]))
+        for stage in stages
+        if stage.report
+    }
+
+    return {
+        "stages": summary,
+        "reports": reports,
+        "total_seconds": round(time.perf_counter() - start, 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Content-addressed training / evaluation refresh"
+    )
+    parser.add_argument("targets", nargs="*", help="Stages to build (default: all)")
+    parser.add_argument("--force", nargs="*", default=None,
+                        help="Rerun these stages (no names: all selected) even if cached")
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    parser.add_argument("--output-dir", default=MODEL_DIR)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would run")
+    args = parser.parse_args(argv)
+
+    if args.force is None:
+        force = ()
+    elif not args.force:
+        force = {stage.name for stage in select_stages(args.targets)}
+    else:
+        force = set(args.force)
+
+    try:
+        result = run_pipeline(
+            targets=args.targets,
+            force=force,
+            n_workers=args.workers,
+            output_dir=args.output_dir,
+            cache_dir=args.cache_dir,
+            dry_run=args.dry_run
+        )
+    except ValueError as e:
+        sys.exit(str(e))
+
+    print("\nPipeline Stages")
+    print("---------------")
+    for name, info in result["stages"].items():
+        print(f"  {name:<20} {info['key']}  {info['status']:<26} {info['seconds']:.2f}s")
+
+    for name, report in result["reports"].items():
+        print(f"\n{name}")
+        print(json.dumps(report, indent=2, default=float))
+
+    if "total_seconds" in result:
+        print(f"\nTotal: {result['total_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
+import numbers
+
 import pandas as pd
 
+from ml.preprocessing_refined import (
+    NUMERIC_FEATURES, CATEGORICAL_FEATURES, InteractionFeatureGenerator
+)
+
 # -------------------------
 # Expected schema (RAW CSV)
 # -------------------------
@@ -31,20 +37,60 @@ REQUIRED_COLUMNS = {
 
 OPTIONAL_COLUMNS = {"churn"}
 
+# Probability at or above which a customer is labelled as churning
+DEFAULT_THRESHOLD = 0.5
+
+
+def validate_record(record: dict):
+    """
+    Check a single JSON record against the raw schema: every required
+    field present, a non-empty string or integer customer_id, numeric
+    fields numbers and categorical fields strings (None is a missing
+    value for both; booleans are neither).
+    """
+    missing = REQUIRED_COLUMNS - set(record)
+    if missing:
+        raise ValueError(f"Missing required fields: {sorted(missing)}")
+
+    customer_id = record["customer_id"]
+    if isinstance(customer_id, bool) or not isinstance(customer_id, (str, int)):
+        raise ValueError("customer_id must be a string or an integer")
+    if isinstance(customer_id, str) and not customer_id.strip():
+        raise ValueError("customer_id must not be empty")
+
+    for col in NUMERIC_FEATURES:
+        if col in InteractionFeatureGenerator.RATIO_FEATURES:
+            continue
+        value = record[col]
+        if value is not None and (
+            isinstance(value, bool) or not isinstance(value, numbers.Number)
+        ):
+            raise ValueError(f"{col} must be a number")
+
+    for col in CATEGORICAL_FEATURES:
+        value = record[col]
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{col} must be a string")
+
 
 def predict_churn(
     df: pd.DataFrame,
     model_pipeline,
-    model_version: str = "random_forest_v1"
+    model_version: str = "random_forest_v1",
+    threshold: float = DEFAULT_THRESHOLD,
+    validate: bool = True
 ) -> pd.DataFrame:
     """
     Generate churn predictions using a trained sklearn Pipeline.
+
+    Pass validate=False for data already checked by
+    ml.validation.validate_dataframe (e.g. at upload).
     """
 
     # -------------------------
     # Validate input
     # -------------------------
-    if "customer_id" not in df.columns:
+    if validate and "customer_id" not in df.columns:
         raise ValueError("customer_id column is required")
 
     customer_ids = df["customer_id"].astype(str).values
@@ -58,7 +104,7 @@ def predict_churn(
     # Predict via pipeline
     # -------------------------
     churn_prob = model_pipeline.predict_proba(X)[:, 1]
-    churn_label = (churn_prob >= 0.5).astype(int)
+    churn_label = (churn_prob >= threshold).astype(int)
 
     # -------------------------
     # Output schema
@@ -3,7 +3,8 @@ import pandas as pd
 def predict_segments(
     df: pd.DataFrame,
     model_artifact: dict,
-    model_version: str = "kmeans_segmentation_v1"
+    model_version: str = "kmeans_segmentation_v1",
+    validate: bool = True
 ) -> pd.DataFrame:
     """
     Assign customer segments using a trained clustering pipeline.
@@ -16,6 +17,8 @@ def predict_segments(
         Loaded segmentation_model.pkl artifact
     model_version : str
         Version identifier
+    validate : bool
+        False skips the schema checks for data already validated at upload
 
     Returns
     -------
@@ -31,7 +34,7 @@ def predict_segments(
     # -------------------------
     # Preserve customer_id
     # -------------------------
-    if "customer_id" not in df.columns:
+    if validate and "customer_id" not in df.columns:
         raise ValueError("customer_id column is required")
 
     customer_ids = df["customer_id"].values
@@ -1,3 +1,5 @@
+import copy
+
 import numpy as np
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
@@ -44,6 +46,14 @@ CATEGORICAL_FEATURES = [
 # Feature Engineering Step
 # -------------------------
 class InteractionFeatureGenerator(BaseEstimator, TransformerMixin):
+    # engineered feature -> (numerator, denominator); a zero denominator
+    # yields NaN, which the numeric imputer fills
+    RATIO_FEATURES = {
+        "charges_per_month": ("total_charges", "tenure_months"),
+        "tickets_per_month": ("support_tickets_last_6m", "tenure_months"),
+        "usage_per_charge": ("avg_monthly_usage_gb", "monthly_charges")
+    }
+
     def fit(self, X, y=None):
         return self
 
@@ -62,9 +72,8 @@ class InteractionFeatureGenerator(BaseEstimator, TransformerMixin):
             if col not in X.columns:
                 X[col] = np.nan
 
-        X["charges_per_month"] = X["total_charges"] / X["tenure_months"].replace(0, np.nan)
-        X["tickets_per_month"] = X["support_tickets_last_6m"] / X["tenure_months"].replace(0, np.nan)
-        X["usage_per_charge"] = X["avg_monthly_usage_gb"] / X["monthly_charges"].replace(0, np.nan)
+        for feature, (numerator, denominator) in self.RATIO_FEATURES.items():
+            X[feature] = X[numerator] / X[denominator].replace(0, np.nan)
 
         return X
 
@@ -94,3 +103,53 @@ def build_preprocessing_pipeline():
         ("feature_engineering", InteractionFeatureGenerator()),
         ("preprocessor", column_transformer)
     ])
+
+
+# -------------------------
+# float32 Inference Mode
+# -------------------------
+class Float32Cast(BaseEstimator, TransformerMixin):
+    """
+    Stateless cast to float32, appended after scaling at inference time.
+    """
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float32)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(input_features, dtype=object)
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+
+def build_inference_pipeline(model_pipeline):
+    """
+    Copy of a fitted churn pipeline whose preprocessing emits float32.
+
+    Trees compare features as float32, so sklearn would otherwise cast
+    (and copy) the float64 matrix on every predict and SHAP call.
+    Imputation, ratios and scaling still run in float64 and are cast once
+    at the end, the exact rounding the trees apply themselves, so
+    predictions and SHAP values are unchanged. The one-hot block is
+    emitted as float32 directly.
+
+    The classifier is shared with the original, not copied.
+    """
+    preprocessing = copy.deepcopy(model_pipeline.named_steps["preprocessing"])
+    column_transformer = preprocessing.named_steps["preprocessor"]
+
+    for name, pipeline, _ in column_transformer.transformers_:
+        if name == "num":
+            pipeline.steps.append(("float32", Float32Cast()))
+        elif name == "cat":
+            pipeline.named_steps["encoder"].dtype = np.float32
+
+    steps = [
+        (name, preprocessing if name == "preprocessing" else step)
+        for name, step in model_pipeline.steps
+    ]
+    return Pipeline(steps=steps)
@@ -0,0 +1,89 @@
+import numbers
+import numpy as np
+import pandas as pd
+
+from ml.predict import REQUIRED_COLUMNS
+from ml.preprocessing_refined import InteractionFeatureGenerator
+from ml.fast_encoding import affected_features, encode_columns
+
+# Raw columns a scenario is allowed to override
+OVERRIDABLE_COLUMNS = REQUIRED_COLUMNS - {"customer_id"}
+
+
+def _validate_overrides(overrides: dict, spec: dict):
+    unknown = set(overrides) - OVERRIDABLE_COLUMNS
+    if unknown:
+        raise ValueError(f"Cannot override columns: {sorted(unknown)}")
+
+    # Same types as /score: numbers / strings, None for a missing value
+    for col, value in overrides.items():
+        if value is None:
+            continue
+        if col in spec["numeric"] and (
+            isinstance(value, bool) or not isinstance(value, numbers.Number)
+        ):
+            raise ValueError(f"Override for {col} must be numeric")
+        if col in spec["categorical"] and not isinstance(value, str):
+            raise ValueError(f"Override for {col} must be a string")
+
+
+def simulate_scenarios(
+    df: pd.DataFrame,
+    rows: np.ndarray,
+    X_encoded: np.ndarray,
+    scenarios: list,
+    spec: dict,
+    classifier
+) -> np.ndarray:
+    """
+    Score what-if scenarios for a selection of customers.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw dataset the encoded matrix was built from
+    rows : np.ndarray
+        Positional row indices of the selected customers
+    X_encoded : np.ndarray
+        Cached preprocessing output for the whole dataset
+    scenarios : list[dict]
+        Each scenario maps raw column -> override value
+    spec : dict
+        Output of build_encoding_spec for the same pipeline
+    classifier :
+        Fitted classifier of the churn pipeline
+
+    Returns
+    -------
+    np.ndarray
+        (n_scenarios, n_rows) churn probabilities, from one predict call
+    """
+    for overrides in scenarios:
+        _validate_overrides(overrides, spec)
+
+    X_base = np.asarray(X_encoded[rows])
+    raw = df.iloc[rows]
+
+    blocks = []
+    for overrides in scenarios:
+        features = affected_features(set(overrides))
+        engineered = features.intersection(InteractionFeatureGenerator.RATIO_FEATURES)
+
+        # Only the overridden columns and the inputs of dependent
+        # engineered features are copied and re-encoded
+        needed = set(overrides)
+        for feature in engineered:
+            needed.update(InteractionFeatureGenerator.RATIO_FEATURES[feature])
+
+        frame = raw[sorted(needed)].copy()
+        for col, value in overrides.items():
+            frame[col] = np.nan if value is None else value
+
+        if engineered:
+            frame = InteractionFeatureGenerator().transform(frame)
+
+        blocks.append(encode_columns(spec, frame, X_base.copy(), features))
+
+    probabilities = classifier.predict_proba(np.vstack(blocks))[:, 1]
+
+    return probabilities.reshape(len(scenarios), len(rows))
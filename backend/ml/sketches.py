@@ -0,0 +1,359 @@
+import numpy as np
+import pandas as pd
+
+from ml.preprocessing_refined import CATEGORICAL_FEATURES
+from ml.validation import NUMERIC_COLUMNS
+
+# Quantiles reported by dataset summaries
+SUMMARY_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# PSI rule-of-thumb cut-offs
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Floor for empty bins, so PSI stays finite
+_PSI_EPSILON = 1e-4
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative error guarantees (DDSketch).
+
+    Values fall into logarithmic buckets whose width grows with their
+    magnitude. Any quantile comes back within `relative_accuracy` of the
+    exact value. Memory grows with the log of the value range, not with
+    the row count. Two sketches built with the same accuracy merge
+    exactly, so chunks or workers can sketch independently.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    # -------------------------
+    # Building
+    # -------------------------
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+
+        self.count += int(values.size)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.zero_count += int(np.count_nonzero(values == 0))
+
+        for store, magnitudes in (
+            (self.positive, values[values > 0]),
+            (self.negative, -values[values < 0])
+        ):
+            if magnitudes.size:
+                keys, counts = np.unique(
+                    np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                    return_counts=True
+                )
+                for key, count in zip(keys.tolist(), counts.tolist()):
+                    store[key] = store.get(key, 0) + count
+
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+
+        for store, other_store in (
+            (self.positive, other.positive),
+            (self.negative, other.negative)
+        ):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def _bins(self):
+        """
+        Bucket representatives in ascending order, with cumulative counts.
+        """
+        neg_keys = sorted(self.negative, reverse=True)
+        pos_keys = sorted(self.positive)
+
+        values = np.concatenate([
+            -self._representative(np.array(neg_keys, dtype=np.float64)),
+            [0.0] if self.zero_count else [],
+            self._representative(np.array(pos_keys, dtype=np.float64))
+        ])
+        counts = np.array(
+            [self.negative[k] for k in neg_keys]
+            + ([self.zero_count] if self.zero_count else [])
+            + [self.positive[k] for k in pos_keys],
+            dtype=np.int64
+        )
+        return values, np.cumsum(counts)
+
+    def _representative(self, keys: np.ndarray) -> np.ndarray:
+        return 2 * self._gamma ** keys / (self._gamma + 1)
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+
+        values, cumulative = self._bins()
+        ranks = qs * (self.count - 1)
+        positions = np.searchsorted(cumulative, ranks, side="right")
+        return np.clip(values[positions], self.min, self.max)
+
+    def cdf(self, x) -> np.ndarray:
+        """
+        Approximate fraction of values <= x.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if self.count == 0:
+            return np.zeros(x.shape)
+
+        values, cumulative = self._bins()
+        positions = np.searchsorted(values, x, side="right")
+        below = np.concatenate([[0], cumulative])[positions]
+        return below / self.count
+
+    def histogram(self, edges) -> np.ndarray:
+        """
+        Approximate counts per interval: (-inf, e0], (e0, e1], ..., (en, inf).
+        """
+        fractions = np.diff(np.concatenate([[0.0], self.cdf(edges), [1.0]]))
+        return fractions * self.count
+
+    # -------------------------
+    # Serialization
+    # -------------------------
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": {str(k): v for k, v in self.positive.items()},
+            "negative": {str(k): v for k, v in self.negative.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.positive = {int(k): v for k, v in data["positive"].items()}
+        sketch.negative = {int(k): v for k, v in data["negative"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if data["count"]:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+
+class DatasetSketch:
+    """
+    Per-column statistics of a raw dataset, built chunk by chunk.
+
+    Numeric columns get a QuantileSketch, categoricals exact level counts
+    (their vocabularies are small), and every column a null count.
+    Sketches of separate chunks merge into the sketch of their union.
+    """
+
+    def __init__(
+        self,
+        numeric_columns=NUMERIC_COLUMNS,
+        categorical_columns=CATEGORICAL_FEATURES,
+        relative_accuracy: float = 0.01
+    ):
+        self.rows = 0
+        self.nulls = {col: 0 for col in [*numeric_columns, *categorical_columns]}
+        self.numeric = {
+            col: QuantileSketch(relative_accuracy) for col in numeric_columns
+        }
+        self.categorical = {col: {} for col in categorical_columns}
+
+    def update(self, df: pd.DataFrame):
+        self.rows += len(df)
+
+        for col, sketch in self.numeric.items():
+            if col not in df.columns:
+                self.nulls[col] += len(df)
+                continue
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+            self.nulls[col] += int(np.isnan(values).sum())
+            sketch.update(values)
+
+        for col, counts in self.categorical.items():
+            if col not in df.columns:
+                self.nulls[col] += len(df)
+                continue
+            values = df[col]
+            self.nulls[col] += int(values.isna().sum())
+            for level, count in values.value_counts().items():
+                level = str(level)
+                counts[level] = counts.get(level, 0) + int(count)
+
+        return self
+
+    def merge(self, other: "DatasetSketch"):
+        self.rows += other.rows
+        for col, count in other.nulls.items():
+            self.nulls[col] = self.nulls.get(col, 0) + count
+        for col, sketch in other.numeric.items():
+            self.numeric[col].merge(sketch)
+        for col, other_counts in other.categorical.items():
+            counts = self.categorical[col]
+            for level, count in other_counts.items():
+                counts[level] = counts.get(level, 0) + count
+        return self
+
+    def summary(self, top_n: int = 5) -> dict:
+        """
+        Column statistics read straight from the sketches.
+        """
+        def null_rate(col):
+            return self.nulls[col] / self.rows if self.rows else 0.0
+
+        numeric = {}
+        for col, sketch in self.numeric.items():
+            quantiles = sketch.quantiles(SUMMARY_QUANTILES)
+            numeric[col] = {
+                "count": sketch.count,
+                "null_rate": null_rate(col),
+                "mean": sketch.sum / sketch.count if sketch.count else None,
+                "min": sketch.min if sketch.count else None,
+                "max": sketch.max if sketch.count else None,
+                "quantiles": {
+                    f"p{round(q * 100)}": (None if np.isnan(v) else float(v))
+                    for q, v in zip(SUMMARY_QUANTILES, quantiles)
+                }
+            }
+
+        categorical = {}
+        for col, counts in self.categorical.items():
+            top = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+            categorical[col] = {
+                "distinct": len(counts),
+                "null_rate": null_rate(col),
+                "top_levels": dict(top[:top_n])
+            }
+
+        return {
+            "row_count": self.rows,
+            "numeric": numeric,
+            "categorical": categorical
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "nulls": self.nulls,
+            "numeric": {col: s.to_dict() for col, s in self.numeric.items()},
+            "categorical": self.categorical
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DatasetSketch":
+        sketch = cls(numeric_columns=[], categorical_columns=[])
+        sketch.rows = data["rows"]
+        sketch.nulls = dict(data["nulls"])
+        sketch.numeric = {
+            col: QuantileSketch.from_dict(s) for col, s in data["numeric"].items()
+        }
+        sketch.categorical = {
+            col: dict(counts) for col, counts in data["categorical"].items()
+        }
+        return sketch
+
+# -------------------------
+# Drift
+# -------------------------
+def _psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    expected = np.clip(expected, _PSI_EPSILON, None)
+    actual = np.clip(actual, _PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _drift_status(psi: float) -> str:
+    if psi >= PSI_SIGNIFICANT:
+        return "significant"
+    if psi >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+def population_stability(
+    reference: DatasetSketch,
+    current: DatasetSketch,
+    bins: int = 10
+) -> dict:
+    """
+    Population Stability Index of every column, current vs reference.
+
+    Numeric columns are binned at the reference deciles (by default),
+    categoricals by level; missing values form one more bin in both.
+
+    Returns
+    -------
+    dict
+        {column: {psi, status}} with status stable / moderate / significant
+    """
+    drift = {}
+
+    def shares(counts: np.ndarray, nulls: int, rows: int) -> np.ndarray:
+        return np.append(counts, nulls) / rows if rows else np.zeros(len(counts) + 1)
+
+    for col, ref_sketch in reference.numeric.items():
+        if col not in current.numeric:
+            continue
+        cur_sketch = current.numeric[col]
+
+        edges = np.unique(ref_sketch.quantiles(np.arange(1, bins) / bins))
+        edges = edges[~np.isnan(edges)]
+
+        psi = _psi(
+            shares(ref_sketch.histogram(edges), reference.nulls[col], reference.rows),
+            shares(cur_sketch.histogram(edges), current.nulls[col], current.rows)
+        )
+        drift[col] = {"psi": psi, "status": _drift_status(psi)}
+
+    for col, ref_counts in reference.categorical.items():
+        if col not in current.categorical:
+            continue
+        cur_counts = current.categorical[col]
+
+        levels = sorted(set(ref_counts) | set(cur_counts))
+        psi = _psi(
+            shares(
+                np.array([ref_counts.get(level, 0) for level in levels], dtype=np.float64),
+                reference.nulls[col], reference.rows
+            ),
+            shares(
+                np.array([cur_counts.get(level, 0) for level in levels], dtype=np.float64),
+                current.nulls[col], current.rows
+            )
+        )
+        drift[col] = {"psi": psi, "status": _drift_status(psi)}
+
+    return drift
@@ -0,0 +1,115 @@
+import numpy as np
+
+
+def build_threshold_index(
+    churn_probability: np.ndarray,
+    segment_codes: np.ndarray | None = None,
+    segment_levels: list | None = None,
+    y_true: np.ndarray | None = None
+) -> dict:
+    """
+    Sorted probability index for one scored dataset.
+
+    Parameters
+    ----------
+    churn_probability : np.ndarray
+        Scored probabilities (row order irrelevant)
+    segment_codes, segment_levels : optional
+        Codes/levels from the columnar store, for per-segment counts
+    y_true : np.ndarray, optional
+        Actual churn labels, enables precision/recall on the curve. Rows
+        whose label is not 0/1 (NaN for unlabeled) are left out of both.
+
+    Returns
+    -------
+    dict
+        sorted (ascending) probabilities overall and per segment, plus the
+        labeled rows' sorted probabilities and cumulative positive counts
+        needed for precision/recall (None without labeled rows).
+    """
+    order = np.argsort(churn_probability, kind="stable")
+
+    index = {
+        "sorted": churn_probability[order],
+        "segments": {},
+        "labeled_sorted": None,
+        "positives_above": None
+    }
+
+    if segment_codes is not None:
+        for code, level in enumerate(segment_levels):
+            index["segments"][level] = np.sort(
+                churn_probability[segment_codes == code]
+            )
+
+    labeled = None
+    if y_true is not None:
+        y_true = np.asarray(y_true, dtype=np.float64)
+        labeled = np.isin(y_true, (0, 1))
+
+    if labeled is not None and labeled.any():
+        labeled_probs = churn_probability[labeled]
+        labeled_order = np.argsort(labeled_probs, kind="stable")
+        index["labeled_sorted"] = labeled_probs[labeled_order]
+
+        # positives_above[i] = number of true churners at sorted positions >= i
+        sorted_labels = y_true[labeled][labeled_order].astype(np.int64)
+        index["positives_above"] = np.concatenate([
+            np.cumsum(sorted_labels[::-1])[::-1],
+            [0]
+        ])
+
+    return index
+
+
+def count_above(index: dict, threshold: float, segment=None) -> int:
+    """
+    Customers with churn_probability >= threshold, by binary search.
+    """
+    if segment is None:
+        sorted_probs = index["sorted"]
+    else:
+        sorted_probs = index["segments"][segment]
+
+    return int(sorted_probs.size - np.searchsorted(sorted_probs, threshold, side="left"))
+
+
+def threshold_curve(index: dict, thresholds: np.ndarray) -> dict:
+    """
+    Counts (and precision/recall over the labeled rows, when there are
+    any) at every threshold, computed in vectorized searchsorted passes.
+    """
+    sorted_probs = index["sorted"]
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    start = np.searchsorted(sorted_probs, thresholds, side="left")
+    flagged = sorted_probs.size - start
+
+    curve = {
+        "threshold": thresholds,
+        "flagged": flagged,
+        "segments": {
+            level: seg_probs.size - np.searchsorted(seg_probs, thresholds, side="left")
+            for level, seg_probs in index["segments"].items()
+        }
+    }
+
+    positives_above = index["positives_above"]
+    if positives_above is not None:
+        labeled_sorted = index["labeled_sorted"]
+        labeled_start = np.searchsorted(labeled_sorted, thresholds, side="left")
+        labeled_flagged = labeled_sorted.size - labeled_start
+
+        true_positives = positives_above[labeled_start]
+        total_positives = positives_above[0]
+
+        curve["labeled"] = int(labeled_sorted.size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            curve["precision"] = np.where(
+                labeled_flagged > 0, true_positives / labeled_flagged, np.nan
+            )
+            curve["recall"] = np.where(
+                total_positives > 0, true_positives / total_positives, np.nan
+            )
+
+    return curve
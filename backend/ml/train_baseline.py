@@ -13,55 +13,52 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "..", "ml_data", "sample_customer_churn.csv")
 MODEL_PATH = os.path.join(BASE_DIR, "..", "ml_models", "baseline_churn_model.pkl")
 
-df = pd.read_csv(DATA_PATH)
+# Hold-out split shared by every training / evaluation script
+SPLIT_PARAMS = {"test_size": 0.2, "random_state": 42}
 
 
-# -------------------------
-# Load dataset
-# -------------------------
-df = pd.read_csv(DATA_PATH)
-
-X = df.drop(columns=["churn", "customer_id"])
-y = df["churn"]
-
 # -------------------------
 # Train / validation split
 # -------------------------
-X_train, X_val, y_train, y_val = train_test_split(
-    X,
-    y,
-    test_size=0.2,
-    random_state=42,
-    stratify=y
-)
-
-# -------------------------
-# Build preprocessing pipeline
-# -------------------------
-preprocessor = build_preprocessing_pipeline()
+def split_dataset(df: pd.DataFrame, split_params: dict = SPLIT_PARAMS) -> dict:
+    X = df.drop(columns=["churn", "customer_id"])
+    y = df["churn"]
+
+    X_train, X_val, y_train, y_val = train_test_split(
+        X,
+        y,
+        stratify=y,
+        **split_params
+    )
+    return {"X_train": X_train, "X_val": X_val, "y_train": y_train, "y_val": y_val}
 
 # -------------------------
 # Build full model pipeline
 # -------------------------
-model = Pipeline(steps=[
-    ("preprocessing", preprocessor),
-    ("classifier", LogisticRegression(
-        max_iter=1000,
-        class_weight="balanced",
-        random_state=42
-    ))
-])
+def build_model() -> Pipeline:
+    return Pipeline(steps=[
+        ("preprocessing", build_preprocessing_pipeline()),
+        ("classifier", LogisticRegression(
+            max_iter=1000,
+            class_weight="balanced",
+            random_state=42
+        ))
+    ])
 
-# -------------------------
-# Train model
-# -------------------------
-model.fit(X_train, y_train)
 
-# -------------------------
-# Save trained model
-# -------------------------
-joblib.dump(model, MODEL_PATH)
+def train_model(X_train, y_train) -> Pipeline:
+    return build_model().fit(X_train, y_train)
+
+
+def main():
+    split = split_dataset(pd.read_csv(DATA_PATH))
+
+    model = train_model(split["X_train"], split["y_train"])
+
+    joblib.dump(model, MODEL_PATH)
 
-print(f"Baseline churn model saved to: {MODEL_PATH}")
+    print(f"Baseline churn model saved to: {MODEL_PATH}")
 
 
+if __name__ == "__main__":
+    main()
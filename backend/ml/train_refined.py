@@ -1,13 +1,15 @@
 import os
+import json
 import pandas as pd
 import joblib
 
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report, roc_auc_score
 
 from ml.preprocessing_refined import build_preprocessing_pipeline
+from ml.sketches import DatasetSketch
+from ml.train_baseline import split_dataset
 
 # -------------------------
 # Paths
@@ -20,61 +22,83 @@ DATA_PATH = os.path.join(
 MODEL_PATH = os.path.join(
     BASE_DIR, "..", "ml_models", "final_churn_model.pkl"
 )
+REFERENCE_SKETCH_PATH = os.path.join(
+    BASE_DIR, "..", "ml_models", "reference_sketch.json"
+)
 
-# -------------------------
-# Load dataset
-# -------------------------
-df = pd.read_csv(DATA_PATH)
-
-X = df.drop(columns=["churn", "customer_id"])
-y = df["churn"]
+# Parallelism the saved forest keeps for prediction
+N_JOBS = -1
 
-# -------------------------
-# Train / validation split
-# -------------------------
-X_train, X_val, y_train, y_val = train_test_split(
-    X,
-    y,
-    test_size=0.2,
-    random_state=42,
-    stratify=y
-)
 
 # -------------------------
 # Build full pipeline
 # -------------------------
-model = Pipeline(steps=[
-    ("preprocessing", build_preprocessing_pipeline()),
-    ("classifier", RandomForestClassifier(
-        n_estimators=400,
-        max_depth=None,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        class_weight="balanced",
-        random_state=42,
-        n_jobs=-1
-    ))
-])
+def build_model() -> Pipeline:
+    return Pipeline(steps=[
+        ("preprocessing", build_preprocessing_pipeline()),
+        ("classifier", RandomForestClassifier(
+            n_estimators=400,
+            max_depth=None,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            class_weight="balanced",
+            random_state=42,
+            n_jobs=N_JOBS
+        ))
+    ])
 
-# -------------------------
-# Train model
-# -------------------------
-model.fit(X_train, y_train)
 
-# -------------------------
-# Evaluation (sanity check)
-# -------------------------
-y_pred = model.predict(X_val)
-y_prob = model.predict_proba(X_val)[:, 1]
+def train_model(X_train, y_train, n_jobs: int = N_JOBS) -> Pipeline:
+    """
+    Fit the final churn pipeline.
 
-print("Refined Random Forest Evaluation")
-print("--------------------------------")
-print(classification_report(y_val, y_pred))
-print("ROC-AUC:", roc_auc_score(y_val, y_prob))
+    n_jobs only applies to fitting (e.g. 1 inside a process pool); the
+    fitted forest is identical either way and keeps N_JOBS.
+    """
+    model = build_model().set_params(classifier__n_jobs=n_jobs)
+    model.fit(X_train, y_train)
+    return model.set_params(classifier__n_jobs=N_JOBS)
+
+
+def build_reference_sketch(X_train) -> DatasetSketch:
+    # Drift baseline for /dataset/drift
+    return DatasetSketch().update(X_train)
+
+
+def main():
+    split = split_dataset(pd.read_csv(DATA_PATH))
+    X_train, X_val, y_train, y_val = (
+        split["X_train"], split["X_val"], split["y_train"], split["y_val"]
+    )
+
+    model = train_model(X_train, y_train)
+
+    # -------------------------
+    # Evaluation (sanity check)
+    # -------------------------
+    y_pred = model.predict(X_val)
+    y_prob = model.predict_proba(X_val)[:, 1]
+
+    print("Refined Random Forest Evaluation")
+    print("--------------------------------")
+    print(classification_report(y_val, y_pred))
+    print("ROC-AUC:", roc_auc_score(y_val, y_prob))
+
+    # -------------------------
+    # Save final model artifact
+    # -------------------------
+    joblib.dump(model, MODEL_PATH)
+
+    print(f"Final churn model saved to: {MODEL_PATH}")
+
+    # -------------------------
+    # Save reference sketch (drift baseline for /dataset/drift)
+    # -------------------------
+    with open(REFERENCE_SKETCH_PATH, "w") as f:
+        json.dump(build_reference_sketch(X_train).to_dict(), f)
+
+    print(f"Reference sketch saved to: {REFERENCE_SKETCH_PATH}")
 
-# -------------------------
-# Save final model artifact
-# -------------------------
-joblib.dump(model, MODEL_PATH)
 
-print(f"Final churn model saved to: {MODEL_PATH}")
+if __name__ == "__main__":
+    main()
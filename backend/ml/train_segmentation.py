@@ -28,75 +28,78 @@ MODEL_PATH = os.path.join(
     MODEL_DIR, "segmentation_model.pkl"
 )
 
-os.makedirs(MODEL_DIR, exist_ok=True)
+N_CLUSTERS = 4  # can be tuned later
+
 
 # -------------------------
-# Load data
+# Build segmentation pipeline
 # -------------------------
-df = pd.read_csv(DATA_PATH)
+def build_pipeline(n_clusters: int = N_CLUSTERS) -> Pipeline:
+    return Pipeline(steps=[
+        (
+            "preprocessing",
+            build_segmentation_preprocessor(
+                NUMERIC_FEATURES,
+                CATEGORICAL_FEATURES
+            )
+        ),
+        (
+            "clustering",
+            KMeans(
+                n_clusters=n_clusters,
+                random_state=42,
+                n_init=10
+            )
+        )
+    ])
 
-customer_ids = df["customer_id"]
 
-X = df[NUMERIC_FEATURES + CATEGORICAL_FEATURES]
+def train_segmentation(df: pd.DataFrame, n_clusters: int = N_CLUSTERS) -> dict:
+    """
+    Fit the segmentation pipeline and label every customer.
 
-# -------------------------
-# Build segmentation pipeline
-# -------------------------
-N_CLUSTERS = 4  # can be tuned later
+    Returns
+    -------
+    dict
+        artifact (as saved to MODEL_PATH), segments (customer_id,
+        segment_label) and silhouette
+    """
+    X = df[NUMERIC_FEATURES + CATEGORICAL_FEATURES]
 
-pipeline = Pipeline(steps=[
-    (
-        "preprocessing",
-        build_segmentation_preprocessor(
-            NUMERIC_FEATURES,
-            CATEGORICAL_FEATURES
-        )
-    ),
-    (
-        "clustering",
-        KMeans(
-            n_clusters=N_CLUSTERS,
-            random_state=42,
-            n_init=10
-        )
-    )
-])
+    pipeline = build_pipeline(n_clusters)
+    cluster_labels = pipeline.fit_predict(X)
 
-# -------------------------
-# Train segmentation model
-# -------------------------
-cluster_labels = pipeline.fit_predict(X)
+    # Clustering quality
+    X_processed = pipeline.named_steps["preprocessing"].transform(X)
 
-# -------------------------
-# Evaluate clustering quality
-# -------------------------
-X_processed = pipeline.named_steps["preprocessing"].transform(X)
-sil_score = silhouette_score(X_processed, cluster_labels)
+    return {
+        "artifact": {
+            "pipeline": pipeline,
+            "n_clusters": n_clusters,
+            "numeric_features": NUMERIC_FEATURES,
+            "categorical_features": CATEGORICAL_FEATURES
+        },
+        "segments": pd.DataFrame({
+            "customer_id": df["customer_id"],
+            "segment_label": cluster_labels
+        }),
+        "silhouette": silhouette_score(X_processed, cluster_labels)
+    }
 
-print(f"Silhouette Score (K={N_CLUSTERS}): {sil_score:.3f}")
 
-# -------------------------
-# Save segmentation output
-# -------------------------
-segmented_df = pd.DataFrame({
-    "customer_id": customer_ids,
-    "segment_label": cluster_labels
-})
+def main():
+    os.makedirs(MODEL_DIR, exist_ok=True)
 
-segmented_df.to_csv(OUTPUT_PATH, index=False)
+    result = train_segmentation(pd.read_csv(DATA_PATH))
+
+    print(f"Silhouette Score (K={N_CLUSTERS}): {result['silhouette']:.3f}")
+
+    result["segments"].to_csv(OUTPUT_PATH, index=False)
+    joblib.dump(result["artifact"], MODEL_PATH)
+
+    print(f"Segmentation model saved to: {MODEL_PATH}")
+    print(f"Customer segments saved to: {OUTPUT_PATH}")
 
-# -------------------------
-# Save model artifact
-# -------------------------
-joblib.dump(
-    {
-        "pipeline": pipeline,
-        "n_clusters": N_CLUSTERS,
-        "numeric_features": NUMERIC_FEATURES,
-        "categorical_features": CATEGORICAL_FEATURES
-    },
-    MODEL_PATH
-)
 
-print(f"Segmentation model saved to: {MODEL_PATH}")
-print(f"Customer segments saved to: {OUTPUT_PATH}")
+if __name__ == "__main__":
+    main()
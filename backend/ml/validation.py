@@ -0,0 +1,116 @@
+import pandas as pd
+
+from ml.predict import REQUIRED_COLUMNS
+from ml.preprocessing_refined import NUMERIC_FEATURES, InteractionFeatureGenerator
+
+# Raw numeric inputs (engineered ratios are derived, never uploaded)
+NUMERIC_COLUMNS = [
+    col for col in NUMERIC_FEATURES
+    if col not in InteractionFeatureGenerator.RATIO_FEATURES
+]
+
+
+def encoder_vocabularies(*column_transformers) -> dict:
+    """
+    Known levels per categorical column, taken from the fitted one-hot
+    encoders of one or more ColumnTransformers.
+
+    A column encoded by several models keeps only the levels all of them
+    know, so a level unknown to any model is reported.
+    """
+    vocabularies = {}
+
+    for column_transformer in column_transformers:
+        for name, pipeline, columns in column_transformer.transformers_:
+            if name != "cat":
+                continue
+            encoder = pipeline.named_steps["encoder"]
+            for col, categories in zip(columns, encoder.categories_):
+                levels = set(categories.tolist())
+                if col in vocabularies:
+                    levels &= vocabularies[col]
+                vocabularies[col] = levels
+
+    return vocabularies
+
+
+def validate_dataframe(df: pd.DataFrame, vocabularies: dict | None = None):
+    """
+    Check and coerce a raw dataset once, one vectorized pass per column.
+
+    Errors (the dataset is rejected): missing required columns, missing
+    customer_id values, and values that cannot be read as numbers in
+    numeric columns. Warnings (the models handle them): nulls, which are
+    imputed, and category levels unseen in training, which encode as all
+    zeros.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw uploaded data
+    vocabularies : dict, optional
+        Output of encoder_vocabularies; enables the unknown-level check
+
+    Returns
+    -------
+    tuple[pd.DataFrame, dict]
+        The coerced dataframe (numeric columns as numbers) and the report:
+        valid, row_count, missing_columns, errors, columns{col: {dtype,
+        nulls, invalid, unknown_levels}}.
+    """
+    vocabularies = vocabularies or {}
+
+    report = {
+        "valid": True,
+        "row_count": int(len(df)),
+        "missing_columns": sorted(REQUIRED_COLUMNS - set(df.columns)),
+        "errors": [],
+        "columns": {}
+    }
+
+    if report["missing_columns"]:
+        report["errors"].append(
+            f"Missing required columns: {report['missing_columns']}"
+        )
+
+    coerced = {}
+
+    for col in sorted(REQUIRED_COLUMNS.intersection(df.columns)):
+        values = df[col]
+        nulls = values.isna()
+        info = {"dtype": None, "nulls": int(nulls.sum()), "invalid": 0}
+
+        if col in NUMERIC_COLUMNS and not pd.api.types.is_numeric_dtype(values):
+            # Text in a numeric column: non-empty cells that fail to parse
+            numbers = pd.to_numeric(values, errors="coerce")
+            invalid = numbers.isna() & ~nulls
+            info["invalid"] = int(invalid.sum())
+            if info["invalid"]:
+                examples = values[invalid].astype(str).unique()[:5].tolist()
+                report["errors"].append(
+                    f"{col}: {info['invalid']} non-numeric values, e.g. {examples}"
+                )
+            values = coerced[col] = numbers
+
+        if col in vocabularies:
+            counts = values.value_counts()
+            unknown = counts[~counts.index.isin(list(vocabularies[col]))]
+            info["unknown_levels"] = {
+                str(level): int(count) for level, count in unknown.items()
+            }
+
+        info["dtype"] = str(values.dtype)
+        report["columns"][col] = info
+
+    if "customer_id" in report["columns"] and report["columns"]["customer_id"]["nulls"]:
+        report["errors"].append(
+            f"customer_id: {report['columns']['customer_id']['nulls']} missing values"
+        )
+
+    report["valid"] = not report["errors"]
+
+    if coerced:
+        df = df.assign(**coerced)
+
+    return df, report
+
@@ -1,20 +1,46 @@
+import os
+import json
 import joblib
 from pathlib import Path
 
+from ml.sketches import DatasetSketch
+from ml.preprocessing_refined import build_inference_pipeline
+
 BASE_DIR = Path(__file__).resolve().parent
 
 # Paths
-CHURN_MODEL_PATH = BASE_DIR / "ml_models" / "final_churn_model.pkl"
+# CHURN_MODEL_PATH can point at a compressed candidate (ml/compress_forest.py)
+CHURN_MODEL_PATH = Path(os.environ.get(
+    "CHURN_MODEL_PATH",
+    BASE_DIR / "ml_models" / "final_churn_model.pkl"
+))
 SEGMENT_MODEL_PATH = BASE_DIR / "ml_models" / "segmentation_model.pkl"
+# Training-data sketch written by ml/train_refined.py, for drift checks
+REFERENCE_SKETCH_PATH = BASE_DIR / "ml_models" / "reference_sketch.json"
+
+# Versions of the artifacts above; model_registry.py serves other
+# versions from ml_models/registry/. Reported in responses and used to
+# scope cached results.
+CHURN_MODEL_VERSION = os.environ.get("CHURN_MODEL_VERSION", "random_forest_v1")
+SEGMENT_MODEL_VERSION = os.environ.get("SEGMENT_MODEL_VERSION", "kmeans_segmentation_v1")
+
+
+def load_churn_model(path=CHURN_MODEL_PATH):
+    if not Path(path).exists():
+        raise FileNotFoundError(f"Churn model not found: {path}")
+    # Serving always uses the float32 inference mode of the pipeline
+    return build_inference_pipeline(joblib.load(path))
 
 
-def load_churn_model():
-    if not CHURN_MODEL_PATH.exists():
-        raise FileNotFoundError(f"Churn model not found: {CHURN_MODEL_PATH}")
-    return joblib.load(CHURN_MODEL_PATH)
+def load_segmentation_model(path=SEGMENT_MODEL_PATH):
+    if not Path(path).exists():
+        raise FileNotFoundError(f"Segmentation model not found: {path}")
+    return joblib.load(path)
 
 
-def load_segmentation_model():
-    if not SEGMENT_MODEL_PATH.exists():
-        raise FileNotFoundError(f"Segmentation model not found: {SEGMENT_MODEL_PATH}")
-    return joblib.load(SEGMENT_MODEL_PATH)
+def load_reference_sketch():
+    # Optional: drift checks are unavailable without it
+    if not REFERENCE_SKETCH_PATH.exists():
+        return None
+    with open(REFERENCE_SKETCH_PATH) as f:
+        return DatasetSketch.from_dict(json.load(f))
@@ -0,0 +1,400 @@
+# model_registry.py
+#
+# Versioned model artifacts and the bundle of models currently served.
+#
+# Layout: ml_models/registry/<kind>/<version>/model.pkl, kind being
+# "churn" or "segmentation". The baseline versions (model_loader.py)
+# predate the registry and are served from their original paths.
+#
+# A new version is loaded and warmed next to the active one, then
+# swapped in with a single reference assignment: requests capture the
+# bundle once (active_bundle()) and finish on the version they started on.
+import os
+import re
+import json
+import shutil
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from model_loader import (
+    BASE_DIR, CHURN_MODEL_PATH, SEGMENT_MODEL_PATH,
+    CHURN_MODEL_VERSION, SEGMENT_MODEL_VERSION,
+    load_churn_model, load_segmentation_model
+)
+
+from ml.predict import predict_churn
+from ml.predict_segment import predict_segments
+from ml.validation import encoder_vocabularies
+from ml.fast_encoding import build_encoding_spec
+from ml.fast_forest import predict_positive
+from ml.explainability import get_tree_explainer, release_tree_explainer
+from ml.tree_contributions import (
+    get_compiled_forest, release_compiled_forest, path_contributions
+)
+from ml.feature_groups import get_feature_groups, release_feature_groups
+
+# -------------------------
+# Registry layout
+# -------------------------
+REGISTRY_DIR = Path(os.environ.get("MODEL_REGISTRY_DIR", BASE_DIR / "ml_models" / "registry"))
+ARTIFACT_FILE = "model.pkl"
+# Versions activated through the API, so a restart keeps serving them
+ACTIVE_FILE = REGISTRY_DIR / "active.json"
+
+KINDS = ("churn", "segmentation")
+
+BASELINE_VERSIONS = {
+    "churn": CHURN_MODEL_VERSION,
+    "segmentation": SEGMENT_MODEL_VERSION
+}
+BASELINE_PATHS = {
+    "churn": CHURN_MODEL_PATH,
+    "segmentation": SEGMENT_MODEL_PATH
+}
+LOADERS = {
+    "churn": load_churn_model,
+    "segmentation": load_segmentation_model
+}
+
+# Version names double as directory names
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+# Rows scored while warming a bundle
+WARMUP_DATA_PATH = BASE_DIR / "ml_data" / "sample_customer_churn.csv"
+WARMUP_ROWS = 32
+
+# Loaded versions kept per kind and process: the active one plus the
+# one it replaced (requests still running on it, or a rollback)
+KEEP_VERSIONS = 2
+
+
+def check_version(version: str) -> str:
+    if not isinstance(version, str) or not VERSION_PATTERN.match(version):
+        raise ValueError(f"Invalid model version: {version!r}")
+    return version
+
+
+def artifact_path(kind: str, version: str) -> Path:
+    """
+    Path of a version's artifact.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the version is not in the registry.
+    """
+    path = REGISTRY_DIR / kind / check_version(version) / ARTIFACT_FILE
+    if path.exists():
+        return path
+    if version == BASELINE_VERSIONS[kind] and BASELINE_PATHS[kind].exists():
+        return BASELINE_PATHS[kind]
+    raise FileNotFoundError(f"No {kind} model version {version!r} in the registry")
+
+
+def list_versions(kind: str) -> list[str]:
+    versions = set()
+    if BASELINE_PATHS[kind].exists():
+        versions.add(BASELINE_VERSIONS[kind])
+
+    kind_dir = REGISTRY_DIR / kind
+    if kind_dir.is_dir():
+        versions.update(
+            entry.name for entry in kind_dir.iterdir()
+            if (entry / ARTIFACT_FILE).exists()
+        )
+    return sorted(versions)
+
+
+def publish_artifact(kind: str, version: str, source) -> Path:
+    """
+    Copy a trained artifact into the registry under a new version.
+    Versions are immutable: an existing one is never overwritten.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {list(KINDS)}")
+
+    check_version(version)
+    if version in list_versions(kind):
+        raise FileExistsError(f"{kind} model version {version!r} already exists")
+
+    target_dir = REGISTRY_DIR / kind / version
+    target_dir.mkdir(parents=True)
+    # Copied under a temporary name so a partial copy is never listed
+    tmp = target_dir / (ARTIFACT_FILE + ".tmp")
+    shutil.copyfile(source, tmp)
+    os.replace(tmp, target_dir / ARTIFACT_FILE)
+
+    return target_dir / ARTIFACT_FILE
+
+
+def read_active_versions() -> tuple:
+    """
+    (churn, segmentation) versions to serve at startup: the last ones
+    activated, else the baseline ones.
+    """
+    versions = dict(BASELINE_VERSIONS)
+    if ACTIVE_FILE.exists():
+        with open(ACTIVE_FILE) as f:
+            versions.update(json.load(f))
+    return versions["churn"], versions["segmentation"]
+
+
+def write_active_versions(versions: tuple):
+    REGISTRY_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = ACTIVE_FILE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(dict(zip(KINDS, versions)), f)
+    os.replace(tmp, ACTIVE_FILE)
+
+
+def preprocessing_fingerprint(model_pipeline) -> str:
+    """
+    Content hash of a churn pipeline's fitted preprocessing; equal hashes
+    mean identical encoded features.
+    """
+    return joblib.hash(model_pipeline.named_steps["preprocessing"])
+
+# -------------------------
+# Loaded artifacts (per process)
+# -------------------------
+_ARTIFACTS = {}
+_LOAD_LOCK = threading.Lock()
+
+# (kind, version) -> pin count. The active bundle and a shadow candidate
+# pin their artifacts, so loading another version never evicts (and
+# releases the caches of) a model still being served
+_PINNED = Counter()
+
+
+def _release(kind: str, model):
+    # Derived caches are keyed on the estimators' ids
+    if kind == "churn":
+        classifier = model.named_steps["classifier"]
+        release_tree_explainer(classifier)
+        release_compiled_forest(classifier)
+        release_feature_groups(
+            model.named_steps["preprocessing"].named_steps["preprocessor"]
+        )
+
+
+def load_artifact(kind: str, version: str):
+    """
+    Load (once per process) a registered artifact.
+    """
+    key = (kind, version)
+    model = _ARTIFACTS.get(key)
+    if model is not None:
+        return model
+
+    with _LOAD_LOCK:
+        if key not in _ARTIFACTS:
+            _ARTIFACTS[key] = LOADERS[kind](artifact_path(kind, version))
+            _evict(kind, keep=key)
+
+        return _ARTIFACTS[key]
+
+
+def _evict(kind: str, keep=None):
+    # Insertion order is load order: evict the oldest unpinned artifacts
+    # of this kind beyond KEEP_VERSIONS. Caller holds _LOAD_LOCK
+    loaded = [k for k in _ARTIFACTS if k[0] == kind]
+    evictable = [k for k in loaded if not _PINNED[k] and k != keep]
+    for old in evictable[:max(0, len(loaded) - KEEP_VERSIONS)]:
+        _release(kind, _ARTIFACTS.pop(old))
+
+
+def pin_artifact(kind: str, version: str):
+    with _LOAD_LOCK:
+        _PINNED[(kind, version)] += 1
+
+
+def unpin_artifact(kind: str, version: str):
+    with _LOAD_LOCK:
+        key = (kind, version)
+        _PINNED[key] -= 1
+        if _PINNED[key] <= 0:
+            del _PINNED[key]
+        _evict(kind)
+
+
+def load_models(versions: tuple) -> dict:
+    churn_version, segment_version = versions
+    return {
+        "churn": load_artifact("churn", churn_version),
+        "segmentation": load_artifact("segmentation", segment_version)
+    }
+
+# -------------------------
+# Served bundle
+# -------------------------
+class ModelBundle:
+    """
+    The models of one (churn, segmentation) version pair, with everything
+    serving derives from them.
+    """
+
+    def __init__(self, churn_version: str, segment_version: str):
+        self.versions = (churn_version, segment_version)
+        self.churn_version = churn_version
+        self.segment_version = segment_version
+
+        models = load_models(self.versions)
+        self.churn_model = models["churn"]
+        self.segment_model = models["segmentation"]
+
+        preprocessing = self.churn_model.named_steps["preprocessing"]
+        column_transformer = preprocessing.named_steps["preprocessor"]
+        self.classifier = self.churn_model.named_steps["classifier"]
+
+        self.encoding_spec = build_encoding_spec(preprocessing)
+        # Lets a shadow candidate (shadow.py) reuse this bundle's features
+        self.preprocessing_fingerprint = preprocessing_fingerprint(self.churn_model)
+        self.feature_names = column_transformer.get_feature_names_out()
+        # Encoded column -> raw business feature, for grouped explanations
+        self.feature_groups = get_feature_groups(column_transformer)
+        # Shared with /score and path-contribution explanations
+        self.fast_forest = get_compiled_forest(self.classifier)
+        # Category levels both models were trained on, checked per upload
+        self.vocabularies = encoder_vocabularies(
+            column_transformer,
+            self.segment_model["pipeline"].named_steps["preprocessing"]
+        )
+
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+
+    def score(self, X):
+        """
+        Positive-class probability for encoded rows (fast path).
+        """
+        return predict_positive(self.fast_forest, X)
+
+    def warm(self, sample: pd.DataFrame | None = None):
+        """
+        Run every serving path once so the first real request does not
+        pay for lazy initialization (TreeExplainer build, first pass
+        through each pipeline).
+        """
+        get_tree_explainer(self.classifier)
+
+        if sample is None:
+            sample = load_warmup_sample()
+        if sample is None:
+            return
+
+        predict_churn(
+            sample, self.churn_model, model_version=self.churn_version, validate=False
+        )
+        predict_segments(
+            sample, self.segment_model, model_version=self.segment_version, validate=False
+        )
+
+        X = self.churn_model.named_steps["preprocessing"].transform(
+            sample.drop(columns=["customer_id", "churn"], errors="ignore")
+        )
+        self.score(X)
+        get_tree_explainer(self.classifier).shap_values(X[:1])
+        path_contributions(self.fast_forest, X[:1])
+
+    def describe(self) -> dict:
+        return {
+            "churn": self.churn_version,
+            "segmentation": self.segment_version,
+            "loaded_at": self.loaded_at
+        }
+
+
+def load_warmup_sample():
+    if not WARMUP_DATA_PATH.exists():
+        return None
+    return pd.read_csv(WARMUP_DATA_PATH, nrows=WARMUP_ROWS)
+
+# -------------------------
+# Active bundle and activation
+# -------------------------
+_ACTIVE = {"bundle": None}
+
+_ACTIVATION_LOCK = threading.Lock()
+
+ACTIVATION = {
+    # idle | loading | failed
+    "state": "idle",
+    "target": None,
+    "error": None,
+    "started_at": None,
+    "finished_at": None,
+    "swaps": 0
+}
+
+
+def active_bundle() -> ModelBundle:
+    """
+    The bundle to serve with. Capture it once per request.
+    """
+    return _ACTIVE["bundle"]
+
+
+def set_active_bundle(bundle: ModelBundle, persist: bool = False):
+    for kind, version in zip(KINDS, bundle.versions):
+        pin_artifact(kind, version)
+
+    # One reference assignment: readers see the old or the new bundle
+    previous, _ACTIVE["bundle"] = _ACTIVE["bundle"], bundle
+    if persist:
+        write_active_versions(bundle.versions)
+
+    if previous is not None:
+        for kind, version in zip(KINDS, previous.versions):
+            unpin_artifact(kind, version)
+
+
+def begin_activation(versions: tuple) -> bool:
+    """
+    Claim the (single) activation slot; False if one is already running.
+    """
+    with _ACTIVATION_LOCK:
+        if ACTIVATION["state"] == "loading":
+            return False
+        ACTIVATION.update(
+            state="loading",
+            target=dict(zip(KINDS, versions)),
+            error=None,
+            started_at=datetime.now(timezone.utc).isoformat(),
+            finished_at=None
+        )
+        return True
+
+
+def finish_activation(bundle: ModelBundle | None = None, error: str | None = None):
+    """
+    Swap in a warmed bundle, or record why it could not be loaded (the
+    active bundle is then left untouched).
+    """
+    if bundle is not None:
+        set_active_bundle(bundle, persist=True)
+
+    with _ACTIVATION_LOCK:
+        ACTIVATION.update(
+            state="failed" if error else "idle",
+            error=error,
+            finished_at=datetime.now(timezone.utc).isoformat()
+        )
+        if bundle is not None:
+            ACTIVATION["swaps"] += 1
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish a model artifact to the registry")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("version")
+    parser.add_argument("artifact", help="Path to the trained .pkl")
+    args = parser.parse_args()
+
+    path = publish_artifact(args.kind, args.version, args.artifact)
+    print(f"Published {args.kind} {args.version} -> {path}")
@@ -0,0 +1,155 @@
+# responses.py
+import gzip
+import hashlib
+
+import orjson
+import pandas as pd
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
+# Clients opt into the columnar shape with ?format=columnar or this Accept type
+COLUMNAR_MEDIA_TYPE = "application/vnd.invisor.columnar+json"
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+
+def wants_columnar(request: Request) -> bool:
+    fmt = request.query_params.get("format")
+    if fmt is not None:
+        return fmt == "columnar"
+    return COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+
+# -------------------------
+# ETags
+# -------------------------
+def dataset_etag(request: Request, dataset_version, model_version) -> str:
+    """
+    Weak ETag for a dataset-derived response: identical for the same
+    dataset, model, route, query and representation.
+    """
+    parts = [
+        str(dataset_version),
+        str(model_version),
+        request.url.path,
+        "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items())),
+        "columnar" if wants_columnar(request) else "records"
+    ]
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+# -------------------------
+# Compression
+# -------------------------
+def _accepted_encodings(request: Request) -> set:
+    accepted = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.add(name.lower())
+    return accepted
+
+
+def compress_body(request: Request, body: bytes) -> tuple:
+    """
+    Compress with zstd when offered (and installed), else gzip.
+
+    Returns
+    -------
+    tuple
+        (body, content_encoding or None)
+    """
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+
+    accepted = _accepted_encodings(request)
+
+    if zstandard is not None and "zstd" in accepted:
+        return zstandard.ZstdCompressor(level=3).compress(body), "zstd"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=5), "gzip"
+
+    return body, None
+
+# -------------------------
+# Response builders
+# -------------------------
+def json_response(
+    request: Request,
+    payload: dict,
+    media_type: str = "application/json",
+    etag: str | None = None
+) -> Response:
+    """
+    orjson-encode a payload, compress it if the client allows, and attach
+    the ETag when one is given.
+    """
+    body = orjson.dumps(
+        payload,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    )
+    body, encoding = compress_body(request, body)
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if etag is not None:
+        headers["ETag"] = etag
+
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _column_values(series: pd.Series):
+    values = series.to_numpy()
+    # orjson writes numeric arrays natively; only object columns are boxed
+    if values.dtype.kind in "biuf" and values.flags.c_contiguous:
+        return values
+    return values.tolist()
+
+
+def dataframe_response(
+    request: Request,
+    df: pd.DataFrame,
+    message: str,
+    status: str = "success",
+    etag: str | None = None
+) -> Response:
+    """
+    Serialize a result DataFrame straight to JSON bytes with orjson.
+
+    Records shape (default) matches DataFrame.to_dict(orient="records");
+    the columnar shape returns {"column": [...]} and skips per-row dicts.
+    """
+    if wants_columnar(request):
+        data = {col: _column_values(df[col]) for col in df.columns}
+        media_type = COLUMNAR_MEDIA_TYPE
+    else:
+        # tolist() unboxes each column once, in C
+        columns = [df[col].to_numpy().tolist() for col in df.columns]
+        data = [dict(zip(df.columns, row)) for row in zip(*columns)]
+        media_type = "application/json"
+
+    return json_response(
+        request,
+        {"status": status, "message": message, "data": data},
+        media_type=media_type,
+        etag=etag
+    )
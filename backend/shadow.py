@@ -0,0 +1,428 @@
+# shadow.py
+#
+# Shadow scoring: a candidate churn model (a registry version) scores the
+# same traffic as the live model, and agreement metrics accumulate for
+# review before promoting it with /admin/models/activate.
+#
+# Nothing runs on the request path: handlers enqueue what the live model
+# already computed, and a background thread hands batches to a dedicated,
+# low-priority process that holds the candidate and does the scoring, so
+# the API process never spends CPU on it. When the candidate's
+# preprocessing is identical to the live one, it scores the live encoded
+# features directly and only its classifier runs.
+import os
+import queue
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+
+import numpy as np
+
+from model_registry import load_artifact, preprocessing_fingerprint
+
+from ml.predict import DEFAULT_THRESHOLD
+from ml.fast_encoding import build_encoding_spec, encode_record
+from ml.fast_forest import predict_positive
+from ml.tree_contributions import get_compiled_forest
+
+# Jobs waiting for the shadow thread; beyond this they are dropped
+# (and counted) rather than holding memory or slowing requests
+SHADOW_MAX_PENDING = int(os.environ.get("SHADOW_MAX_PENDING", 1024))
+
+# Queued /score rows scored together per candidate call
+SHADOW_MAX_BATCH = 256
+
+# Dataset keys remembered to compare each dataset once
+SHADOW_SEEN_DATASETS = 64
+
+# Added to the shadow process's nice value: it only gets the CPU the API
+# process and the live pool leave idle
+SHADOW_NICENESS = int(os.environ.get("SHADOW_NICENESS", 10))
+
+# spawn: forking a threaded server process is unsafe
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+# Upper edges of the |probability delta| histogram (last bucket: above)
+DELTA_BINS = (0.01, 0.05, 0.1, 0.2, 0.5)
+
+# -------------------------
+# Agreement metrics
+# -------------------------
+class AgreementMetrics:
+    """
+    Running live-vs-candidate agreement, updated in vectorized batches.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.rows = 0
+        self.sum_delta = 0.0
+        self.sum_abs_delta = 0.0
+        self.sum_sq_delta = 0.0
+        self.max_abs_delta = 0.0
+        # live label -> candidate label
+        self.flips = {"0->1": 0, "1->0": 0}
+        self.delta_histogram = np.zeros(len(DELTA_BINS) + 1, dtype=np.int64)
+        self.segments = {}
+
+    def update(self, live: np.ndarray, candidate: np.ndarray, segments=None):
+        delta = candidate - live
+        abs_delta = np.abs(delta)
+
+        live_label = live >= self.threshold
+        candidate_label = candidate >= self.threshold
+
+        self.rows += delta.size
+        self.sum_delta += float(delta.sum())
+        self.sum_abs_delta += float(abs_delta.sum())
+        self.sum_sq_delta += float(np.square(delta).sum())
+        self.max_abs_delta = max(self.max_abs_delta, float(abs_delta.max(initial=0.0)))
+        self.flips["0->1"] += int(np.count_nonzero(candidate_label & ~live_label))
+        self.flips["1->0"] += int(np.count_nonzero(live_label & ~candidate_label))
+        self.delta_histogram += np.bincount(
+            np.searchsorted(DELTA_BINS, abs_delta), minlength=len(DELTA_BINS) + 1
+        )
+
+        if segments is None:
+            return
+
+        levels, codes = np.unique(segments, return_inverse=True)
+        counts = np.bincount(codes, minlength=levels.size)
+        sums = {
+            "live": np.bincount(codes, weights=live, minlength=levels.size),
+            "candidate": np.bincount(codes, weights=candidate, minlength=levels.size),
+            "flips": np.bincount(
+                codes, weights=live_label != candidate_label, minlength=levels.size
+            )
+        }
+
+        for i, level in enumerate(levels.tolist()):
+            seg = self.segments.setdefault(
+                level, {"rows": 0, "live": 0.0, "candidate": 0.0, "flips": 0}
+            )
+            seg["rows"] += int(counts[i])
+            seg["live"] += float(sums["live"][i])
+            seg["candidate"] += float(sums["candidate"][i])
+            seg["flips"] += int(sums["flips"][i])
+
+    def summary(self) -> dict:
+        n = self.rows
+        edges = [f"<={edge}" for edge in DELTA_BINS] + [f">{DELTA_BINS[-1]}"]
+
+        return {
+            "rows": n,
+            "mean_delta": self.sum_delta / n if n else None,
+            "mean_abs_delta": self.sum_abs_delta / n if n else None,
+            "rmse": float(np.sqrt(self.sum_sq_delta / n)) if n else None,
+            "max_abs_delta": self.max_abs_delta,
+            "label_flips": dict(self.flips, total=sum(self.flips.values())),
+            "flip_rate": sum(self.flips.values()) / n if n else None,
+            "abs_delta_histogram": dict(zip(edges, self.delta_histogram.tolist())),
+            "segments": {
+                level: {
+                    "rows": seg["rows"],
+                    "mean_live_probability": seg["live"] / seg["rows"],
+                    "mean_candidate_probability": seg["candidate"] / seg["rows"],
+                    "mean_delta": (seg["candidate"] - seg["live"]) / seg["rows"],
+                    "flip_rate": seg["flips"] / seg["rows"]
+                }
+                for level, seg in sorted(self.segments.items())
+            }
+        }
+
+# -------------------------
+# Shadow process (the candidate model lives only here)
+# -------------------------
+_CANDIDATE = {}
+
+
+def _init_shadow_process():
+    if SHADOW_NICENESS and hasattr(os, "nice"):
+        os.nice(SHADOW_NICENESS)
+
+
+def _load_candidate(version: str) -> str:
+    """
+    Load the candidate into the shadow process; returns its
+    preprocessing fingerprint.
+    """
+    model = load_artifact("churn", version)
+    classifier = model.named_steps["classifier"]
+    # A single core, so it never competes with the API for all of them
+    classifier.set_params(n_jobs=1)
+
+    _CANDIDATE.update(
+        model=model,
+        classifier=classifier,
+        fast_forest=get_compiled_forest(classifier),
+        encoding_spec=build_encoding_spec(model.named_steps["preprocessing"])
+    )
+    return preprocessing_fingerprint(model)
+
+
+def _candidate_rows(X: np.ndarray) -> np.ndarray:
+    # Live encoded /score rows
+    return predict_positive(_CANDIDATE["fast_forest"], X)
+
+
+def _candidate_records(records: list) -> np.ndarray:
+    X = np.vstack([encode_record(_CANDIDATE["encoding_spec"], r) for r in records])
+    return predict_positive(_CANDIDATE["fast_forest"], X)
+
+
+def _candidate_features(X: np.ndarray) -> np.ndarray:
+    # Live encoded dataset features
+    return _CANDIDATE["classifier"].predict_proba(X)[:, 1]
+
+
+def _candidate_frame(frame) -> np.ndarray:
+    # The candidate's own preprocessing
+    X = _CANDIDATE["model"].named_steps["preprocessing"].transform(
+        frame.drop(columns=["customer_id", "churn"], errors="ignore")
+    )
+    return _CANDIDATE["classifier"].predict_proba(X)[:, 1]
+
+# -------------------------
+# Shadow scorer
+# -------------------------
+class ShadowScorer:
+    """
+    Scores live traffic with a candidate churn model in a dedicated
+    low-priority process, fed in batches by a background thread. Metrics
+    are kept per live churn version, so a model swap starts a fresh
+    comparison.
+    """
+
+    def __init__(self, candidate_version: str, threshold: float = DEFAULT_THRESHOLD):
+        self.version = candidate_version
+        self.threshold = threshold
+
+        # One worker: scoring calls run one at a time, in the order queued
+        self._process = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=_MP_CONTEXT,
+            initializer=_init_shadow_process
+        )
+        try:
+            # Raises what loading raises (unknown / invalid version)
+            self.fingerprint = self._process.submit(
+                _load_candidate, candidate_version
+            ).result()
+        except Exception:
+            self._process.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        self.started_at = datetime.now(timezone.utc).isoformat()
+
+        self._metrics = {}
+        self._lock = threading.Lock()
+        # Recently compared datasets, per (dataset version, live versions)
+        self._seen_datasets = OrderedDict()
+
+        # Jobs in / dropped / failed; scored rows by feature source
+        self.counters = {
+            "submitted": 0,
+            "dropped": 0,
+            "failed": 0,
+            "shared_feature_rows": 0,
+            "own_feature_rows": 0
+        }
+
+        # Bounded: at most SHADOW_MAX_PENDING jobs wait for the process
+        self._stop = threading.Event()
+        self._queue = queue.Queue(maxsize=SHADOW_MAX_PENDING)
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+
+    def _count(self, counter: str, n: int = 1):
+        with self._lock:
+            self.counters[counter] += n
+
+    # -------------------------
+    # Request side (never blocks)
+    # -------------------------
+    def shares_features(self, live) -> bool:
+        return live.preprocessing_fingerprint == self.fingerprint
+
+    def submit_record(self, live, record: dict, row: np.ndarray, live_probability: float):
+        """
+        Queue one /score call: the live encoded row, the raw record (for
+        a candidate with its own preprocessing) and the live probability.
+        """
+        self._submit(("record", live, record, row, live_probability))
+
+    def submit_dataset(self, key, live, frame, live_probability: np.ndarray,
+                       features=None, segments=None):
+        """
+        Queue a whole scored dataset, once per key.
+
+        features / segments are the live encoded matrix / segment labels
+        when already cached (None otherwise); the shadow never starts
+        live pipeline work of its own.
+        """
+        with self._lock:
+            if key in self._seen_datasets:
+                return
+            self._seen_datasets[key] = True
+            while len(self._seen_datasets) > SHADOW_SEEN_DATASETS:
+                self._seen_datasets.popitem(last=False)
+        self._submit(("dataset", live, frame, live_probability, features, segments))
+
+    def _submit(self, job):
+        if self._stop.is_set():
+            return
+        try:
+            self._queue.put_nowait(job)
+            self._count("submitted")
+        except queue.Full:
+            self._count("dropped")
+
+    def close(self):
+        """
+        Stop shadow scoring without blocking: the thread and the process
+        exit after their current batch, jobs still queued are discarded.
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        try:
+            # Wakes an idle thread; a full queue means it is busy and
+            # sees the stop flag after this batch
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._process.shutdown(wait=False, cancel_futures=True)
+
+    # -------------------------
+    # Shadow thread (feeds the shadow process)
+    # -------------------------
+    def _call(self, fn, *args) -> np.ndarray:
+        try:
+            return self._process.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # The process died (e.g. out of memory): nothing left to score
+            self.close()
+            raise
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self._queue.get()
+            if job is None:
+                return
+
+            # Drain queued /score rows so they are scored in one call
+            jobs = [job]
+            while len(jobs) < SHADOW_MAX_BATCH:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    break
+                jobs.append(job)
+
+            # Each job fails on its own; the rest of the batch is scored
+            records = [j for j in jobs if j[0] == "record"]
+            if records:
+                try:
+                    self._score_records(records)
+                except Exception:
+                    self._count("failed", len(records))
+
+            for job in jobs:
+                if job[0] != "dataset" or self._stop.is_set():
+                    continue
+                try:
+                    self._score_dataset(*job[1:])
+                except Exception:
+                    self._count("failed")
+
+    def _score_records(self, jobs):
+        # One candidate call per live bundle in the batch (normally one)
+        by_live = {}
+        for _, live, record, row, live_probability in jobs:
+            by_live.setdefault(live, []).append((record, row, live_probability))
+
+        for live, items in by_live.items():
+            if self.shares_features(live):
+                candidate = self._call(_candidate_rows, np.vstack([row for _, row, _ in items]))
+                self._count("shared_feature_rows", len(items))
+            else:
+                candidate = self._call(_candidate_records, [r for r, _, _ in items])
+                self._count("own_feature_rows", len(items))
+
+            live_probability = np.array([p for _, _, p in items], dtype=np.float64)
+            self._record(live, live_probability, candidate)
+
+    def _score_dataset(self, live, frame, live_probability, features, segments):
+        n = live_probability.size
+
+        if self.shares_features(live) and features is not None and features.shape[0] == n:
+            candidate = self._call(_candidate_features, features)
+            self._count("shared_feature_rows", n)
+        else:
+            candidate = self._call(_candidate_frame, frame)
+            self._count("own_feature_rows", n)
+
+        if segments is not None and len(segments) != n:
+            segments = None
+
+        self._record(live, np.asarray(live_probability, dtype=np.float64), candidate, segments)
+
+    def _record(self, live, live_probability, candidate, segments=None):
+        with self._lock:
+            metrics = self._metrics.get(live.churn_version)
+            if metrics is None:
+                metrics = self._metrics[live.churn_version] = AgreementMetrics(self.threshold)
+            metrics.update(live_probability, candidate, segments)
+
+    # -------------------------
+    # Reporting
+    # -------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            comparisons = {
+                version: metrics.summary() for version, metrics in self._metrics.items()
+            }
+            counters = dict(self.counters)
+
+        return {
+            "candidate_version": self.version,
+            "started_at": self.started_at,
+            "threshold": self.threshold,
+            "running": not self._stop.is_set(),
+            "pending": self._queue.qsize(),
+            "niceness": SHADOW_NICENESS,
+            **counters,
+            "by_live_version": comparisons
+        }
+
+# -------------------------
+# Active shadow
+# -------------------------
+_SHADOW = {"scorer": None}
+
+
+def active_shadow() -> ShadowScorer | None:
+    return _SHADOW["scorer"]
+
+
+def start_shadow(candidate_version: str) -> ShadowScorer:
+    """
+    Start shadowing a registry version, replacing any running shadow.
+    """
+    scorer = ShadowScorer(candidate_version)
+    previous, _SHADOW["scorer"] = _SHADOW["scorer"], scorer
+    if previous is not None:
+        previous.close()
+    return scorer
+
+
+def stop_shadow() -> ShadowScorer | None:
+    previous, _SHADOW["scorer"] = _SHADOW["scorer"], None
+    if previous is not None:
+        previous.close()
+    return previous
@@ -1,8 +1,141 @@
 # storage.py
+import threading
+import uuid
+from concurrent.futures import Future
+
 import pandas as pd
 
 # Simple in-memory cache
 CACHE = {
     "dataframe": None,
-    "filename": None
+    "filename": None,
+    # Changes on every upload; derived results are scoped to it
+    "version": None,
+    # Upload-time validation report; a stored dataset always passed it
+    "validation": None,
+    # Column sketches built while the upload was parsed (ml/sketches.py)
+    "sketch": None,
+    "derived": {}
 }
+
+# -------------------------
+# Single-flight bookkeeping
+# -------------------------
+_FLIGHT_LOCK = threading.Lock()
+_IN_FLIGHT = {}
+
+_MISSING = object()
+
+SINGLE_FLIGHT_STATS = {
+    "executed": 0,
+    # duplicate computations avoided by waiting on an in-flight one
+    "coalesced": 0,
+    "coalesced_by_operation": {}
+}
+
+
+def set_dataset(
+    df: pd.DataFrame,
+    filename: str,
+    validation: dict | None = None,
+    sketch=None
+):
+    """
+    Replace the cached dataset and drop everything derived from the old one.
+    """
+    CACHE["dataframe"] = df
+    CACHE["filename"] = filename
+    CACHE["validation"] = validation
+    CACHE["sketch"] = sketch
+    CACHE["version"] = uuid.uuid4().hex[:12]
+    CACHE["derived"] = {}
+
+
+def prune_derived(model_version):
+    """
+    Drop results derived with any other model version (after a swap).
+    Entries are removed in place, so computations still running against
+    the current dataset keep storing into the same dict.
+    """
+    derived = CACHE["derived"]
+    for key in [key for key in list(derived) if key[0] != model_version]:
+        derived.pop(key, None)
+
+
+def peek_derived(operation, params=(), model_version=None):
+    """
+    The derived result if it is already computed, else None (never computes).
+    """
+    return CACHE["derived"].get((model_version, operation, params))
+
+
+def _evict_lru(derived, operation, model_version, max_entries):
+    # Dicts keep insertion order and hits re-insert, so the oldest keys
+    # of this operation are the least recently used
+    keys = [
+        key for key in list(derived)
+        if key[0] == model_version and key[1] == operation
+    ]
+    for key in keys[:-max_entries]:
+        derived.pop(key, None)
+
+
+def get_derived(operation, compute, params=(), model_version=None, max_entries=None):
+    """
+    Return a result derived from the current dataset, computing it once.
+
+    Concurrent callers asking for the same (dataset version, model version,
+    operation, params) while it is being computed wait for that single
+    computation instead of starting their own.
+
+    The dict is captured up front so a result computed while a new upload
+    lands is stored against the dataset it was computed from.
+
+    max_entries bounds how many params of this operation stay cached
+    (least recently used dropped first), for caller-chosen params.
+    """
+    derived = CACHE["derived"]
+    key = (model_version, operation, params)
+
+    result = derived.get(key, _MISSING)
+    if result is not _MISSING:
+        if max_entries is not None:
+            derived.pop(key, None)
+            derived[key] = result
+        return result
+
+    flight_key = (CACHE["version"],) + key
+
+    with _FLIGHT_LOCK:
+        if key in derived:
+            return derived[key]
+
+        future = _IN_FLIGHT.get(flight_key)
+        leader = future is None
+
+        if leader:
+            future = Future()
+            _IN_FLIGHT[flight_key] = future
+            SINGLE_FLIGHT_STATS["executed"] += 1
+        else:
+            SINGLE_FLIGHT_STATS["coalesced"] += 1
+            by_op = SINGLE_FLIGHT_STATS["coalesced_by_operation"]
+            by_op[operation] = by_op.get(operation, 0) + 1
+
+    if not leader:
+        return future.result()
+
+    try:
+        result = compute()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        derived[key] = result
+        if max_entries is not None:
+            _evict_lru(derived, operation, model_version, max_entries)
+        future.set_result(result)
+        return result
+    finally:
+        with _FLIGHT_LOCK:
+            _IN_FLIGHT.pop(flight_key, None)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Tests import the backend modules the way the app does (from backend/)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Serve in-process: the app's process pool is not needed for /score
+os.environ.setdefault("CPU_WORKERS", "0")
@@ -0,0 +1,107 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from ml.explainability import get_tree_explainer, positive_class_shap
+from ml.predict import predict_churn, validate_record
+from ml.preprocessing_refined import build_inference_pipeline
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DATA_PATHS = [
+    os.path.join(BACKEND_DIR, "ml_data", "sample_customer_churn.csv"),
+    os.path.join(BACKEND_DIR, "ml_data", "sample_customer_churn_v2.csv")
+]
+MODEL_PATH = os.path.join(BACKEND_DIR, "ml_models", "final_churn_model.pkl")
+
+# Probabilities are averages over trees, so only summation order differs
+PARITY_TOLERANCE = 1e-9
+
+# Rows explained when checking float32 SHAP parity
+SHAP_PARITY_ROWS = 50
+
+
+@pytest.fixture(scope="module")
+def model():
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def json_records(df: pd.DataFrame) -> list:
+    # As a client would send them: NaN -> null, native JSON types
+    return json.loads(
+        df.drop(columns=["churn"], errors="ignore").to_json(orient="records")
+    )
+
+
+# -------------------------
+# /score vs predict_churn
+# -------------------------
+@pytest.mark.parametrize("data_path", DATA_PATHS, ids=os.path.basename)
+def test_score_matches_predict_churn(client, model, data_path):
+    df = pd.read_csv(data_path)
+    reference = predict_churn(df=df, model_pipeline=model)
+
+    for record, expected in zip(json_records(df), reference.itertuples()):
+        response = client.post("/score", json=record)
+        assert response.status_code == 200, response.text
+
+        data = response.json()["data"]
+        assert data["customer_id"] == expected.customer_id
+        assert abs(data["churn_probability"] - expected.churn_probability) <= PARITY_TOLERANCE
+        assert data["churn_label"] == expected.churn_label
+
+
+@pytest.mark.parametrize("field, value", [
+    ("customer_id", None),
+    ("customer_id", ""),
+    ("customer_id", True),
+    ("customer_id", 1.5),
+    ("tenure_months", True),
+    ("tenure_months", "12"),
+    ("contract_type", 1)
+])
+def test_score_rejects_invalid_types(client, field, value):
+    record = json_records(pd.read_csv(DATA_PATHS[1]).head(1))[0]
+    record[field] = value
+
+    with pytest.raises(ValueError):
+        validate_record(record)
+
+    assert client.post("/score", json=record).status_code == 400
+
+
+# -------------------------
+# float32 inference pipeline vs float64 model
+# -------------------------
+@pytest.mark.parametrize("data_path", DATA_PATHS, ids=os.path.basename)
+def test_float32_pipeline_matches_float64(model, data_path):
+    X = pd.read_csv(data_path).drop(columns=["customer_id", "churn"], errors="ignore")
+    float32_model = build_inference_pipeline(model)
+
+    X64 = model.named_steps["preprocessing"].transform(X)
+    X32 = float32_model.named_steps["preprocessing"].transform(X)
+    assert X32.dtype == np.float32
+
+    np.testing.assert_array_equal(
+        model.predict_proba(X)[:, 1],
+        float32_model.predict_proba(X)[:, 1]
+    )
+
+    explainer = get_tree_explainer(model.named_steps["classifier"])
+    np.testing.assert_array_equal(
+        positive_class_shap(explainer.shap_values(X64[:SHAP_PARITY_ROWS])),
+        positive_class_shap(explainer.shap_values(X32[:SHAP_PARITY_ROWS]))
+    )
@@ -0,0 +1,96 @@
+# workers.py
+#
+# CPU-bound stages executed inside the process pool (see concurrency.py).
+# Every stage names the (churn, segmentation) versions it runs against;
+# each worker loads a version once (model_registry.load_models) and keeps
+# it, so only the input dataframe and the (picklable) result cross the
+# process boundary. A model swap needs no pool restart.
+import json
+
+import numpy as np
+
+from model_registry import load_models
+
+from ml.predict import predict_churn
+from ml.predict_segment import predict_segments
+from ml.explainability import explain_customer, top_contributors, get_tree_explainer
+from ml.parallel_shap import init_shap_worker
+from ml.simulation import simulate_scenarios
+
+
+def init_worker(shared_versions=None):
+    # Preload the versions served when this worker starts (JSON set by
+    # concurrency.set_worker_versions) so its first task does not pay for it
+    if shared_versions is not None and shared_versions.value:
+        load_models(tuple(json.loads(shared_versions.value)))
+
+
+def warm_models(versions):
+    """
+    Load a version and build its explainer ahead of a model swap.
+    """
+    classifier = load_models(versions)["churn"].named_steps["classifier"]
+    get_tree_explainer(classifier)
+
+
+def with_models(versions, fn, *args):
+    """
+    Run a ml/parallel_shap.py chunk against the given churn version.
+    """
+    init_shap_worker(load_models(versions)["churn"].named_steps["classifier"])
+    return fn(*args)
+
+
+def churn_predictions(versions, df):
+    return predict_churn(
+        df=df,
+        model_pipeline=load_models(versions)["churn"],
+        model_version=versions[0],
+        # Uploaded datasets are validated once in /upload-csv
+        validate=False
+    )
+
+
+def churn_features(versions, df):
+    X = df.drop(columns=["customer_id", "churn"], errors="ignore")
+    return load_models(versions)["churn"].named_steps["preprocessing"].transform(X)
+
+
+def segment_predictions(versions, df):
+    return predict_segments(
+        df=df,
+        model_artifact=load_models(versions)["segmentation"],
+        model_version=versions[1],
+        validate=False
+    )
+
+
+def customer_explanation(versions, customer_id, df, grouped=False):
+    return explain_customer(
+        customer_id=customer_id,
+        df=df,
+        model_pipeline=load_models(versions)["churn"],
+        grouped=grouped
+    )
+
+
+def row_contributors(versions, X_rows, top_n=3, method="shap", grouped=False):
+    return top_contributors(
+        X_rows,
+        load_models(versions)["churn"],
+        top_n=top_n,
+        method=method,
+        grouped=grouped
+    )
+
+
+def simulation(versions, spec, raw_rows, X_rows, scenarios):
+    # Only the selected rows are shipped; they are positions 0..n-1 here
+    return simulate_scenarios(
+        df=raw_rows,
+        rows=np.arange(len(raw_rows)),
+        X_encoded=X_rows,
+        scenarios=scenarios,
+        spec=spec,
+        classifier=load_models(versions)["churn"].named_steps["classifier"]
+    )